@@ -0,0 +1,203 @@
+"""
+Class analytics over the marks and attendance tables.
+
+Every report is computed in one pass over column buffers (subject and
+student codes plus the int columns). On the mock store those buffers are
+copied straight out of the columnar tables; other backends are read page by
+page and encoded into the same layout. Reports are cached per parameters
+until the table's version (app.table_versions) changes. Where those versions
+miss writes made by other processes (Supabase), a cached report is also
+recomputed after ANALYTICS_CACHE_TTL_SECONDS.
+"""
+import time
+from array import array
+from collections import OrderedDict
+from heapq import nsmallest
+
+from app.columnar_store import NULL_INT
+from app.config import settings
+from app.database import async_supabase, supabase
+from app.pagination import fetch_page
+from app.table_versions import table_versions
+
+PERCENTILES = (25, 50, 75, 90)
+
+for _table_name in ("marks", "attendance"):
+    table_versions.track(_table_name)
+
+_reports = OrderedDict()
+
+
+async def load_columns(table_name: str, text_columns: list, int_columns: list) -> dict:
+    """Column buffers: (codes, distinct values) for text columns, array("i") for int columns"""
+    reader = getattr(supabase, "columns", None)
+    if reader is not None:
+        columns = await async_supabase.run(reader, table_name, text_columns + int_columns)
+        if columns is not None:
+            return columns
+
+    lookups = {name: {} for name in text_columns}
+    columns = {name: (array("I"), []) for name in text_columns}
+    columns.update({name: array("i") for name in int_columns})
+    cursor = None
+    while True:
+        rows, cursor = await fetch_page(table_name, settings.STREAM_PAGE_SIZE, cursor, text_columns + int_columns)
+        for row in rows:
+            for name in text_columns:
+                value = row.get(name)
+                codes, values = columns[name]
+                code = lookups[name].get(value)
+                if code is None:
+                    code = lookups[name][value] = len(values)
+                    values.append(value)
+                codes.append(code)
+            for name in int_columns:
+                value = row.get(name)
+                columns[name].append(NULL_INT if value is None else value)
+        if cursor is None:
+            return columns
+
+
+def percentile(ordered: list, pct: float) -> float:
+    """Linear interpolation between closest ranks (Postgres percentile_cont)"""
+    rank = pct / 100 * (len(ordered) - 1)
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def marks_report(columns: dict, top_n: int) -> dict:
+    """Overall, per-subject and per-student figures from one loop over the column buffers.
+
+    A single pure-Python loop over the array buffers and codes, rather than a
+    vectorized pass: numpy is not a dependency. Rows without a mark or with
+    total_marks <= 0 are skipped; the overall figures and student averages
+    count every other row, the subject stats only rows that have a subject.
+    """
+    subject_codes, subjects = columns["subject"]
+    student_codes, students = columns["student_id"]
+    by_subject = [[] for _ in subjects]
+    by_student = {}
+    records = 0
+    percent_sum = 0.0
+    for subject, student, obtained, total in zip(subject_codes, student_codes,
+                                                 columns["marks_obtained"], columns["total_marks"]):
+        if total <= 0 or obtained == NULL_INT:
+            continue
+        percent = obtained * 100 / total
+        records += 1
+        percent_sum += percent
+        by_subject[subject].append(percent)
+        totals = by_student.get(student)
+        if totals is None:
+            by_student[student] = [percent, 1]
+        else:
+            totals[0] += percent
+            totals[1] += 1
+
+    subject_stats = []
+    for subject, percents in sorted(zip(subjects, by_subject), key=lambda item: str(item[0])):
+        if subject is None or not percents:
+            continue
+        percents.sort()
+        subject_stats.append({
+            "subject": subject,
+            "records": len(percents),
+            "average_percent": round(sum(percents) / len(percents), 2),
+            "min_percent": round(percents[0], 2),
+            "max_percent": round(percents[-1], 2),
+            "percentiles": {f"p{pct}": round(percentile(percents, pct), 2) for pct in PERCENTILES},
+        })
+
+    ranked = ((students[code], total / count, count) for code, (total, count) in by_student.items()
+              if students[code] is not None)
+    top = nsmallest(top_n, ranked, key=lambda item: (-item[1], str(item[0])))
+    return {
+        "records": records,
+        "average_percent": round(percent_sum / records, 2) if records else None,
+        "subjects": subject_stats,
+        "top_students": [
+            {"student_id": str(student), "average_percent": round(average, 2), "subjects": count}
+            for student, average, count in top
+        ],
+    }
+
+
+def attendance_report(columns: dict, threshold: float, bins: int, limit: int) -> dict:
+    subject_codes, subjects = columns["subject"]
+    student_codes, students = columns["student_id"]
+    width = 100 / bins
+    by_subject = [[0, 0.0, [0] * bins, 0] for _ in subjects]
+    by_student = {}
+    for subject, student, present, total in zip(subject_codes, student_codes,
+                                                columns["present_days"], columns["total_days"]):
+        if total <= 0 or present == NULL_INT:
+            continue
+        percent = present * 100 / total
+        stats = by_subject[subject]
+        stats[0] += 1
+        stats[1] += percent
+        stats[2][min(max(int(percent // width), 0), bins - 1)] += 1
+        if percent < threshold:
+            stats[3] += 1
+        days = by_student.get(student)
+        if days is None:
+            by_student[student] = [present, total]
+        else:
+            days[0] += present
+            days[1] += total
+
+    subject_stats = [
+        {
+            "subject": subject,
+            "records": count,
+            "average_percent": round(percent_sum / count, 2),
+            "distribution": distribution,
+            "below_threshold": below,
+        }
+        for subject, (count, percent_sum, distribution, below) in sorted(zip(subjects, by_subject),
+                                                                          key=lambda item: str(item[0]))
+        if subject is not None and count
+    ]
+    below = ((students[code], present * 100 / total) for code, (present, total) in by_student.items()
+             if students[code] is not None and present * 100 / total < threshold)
+    return {
+        "records": sum(stats["records"] for stats in subject_stats),
+        "threshold": threshold,
+        "bin_edges": [round(width * edge, 2) for edge in range(bins + 1)],
+        "subjects": subject_stats,
+        "below_threshold": [
+            {"student_id": str(student), "percent": round(percent, 2)}
+            for student, percent in nsmallest(limit, below, key=lambda item: (item[1], str(item[0])))
+        ],
+    }
+
+
+async def _cached(name: str, params: tuple, table_name: str, compute):
+    key = (name, params, *await table_versions.current((table_name,)))
+    entry = _reports.get(key)
+    if entry is not None and (table_versions.complete or entry[1] > time.monotonic()):
+        _reports.move_to_end(key)
+        return entry[0]
+    report = await compute()
+    _reports[key] = (report, time.monotonic() + settings.ANALYTICS_CACHE_TTL_SECONDS)
+    _reports.move_to_end(key)
+    while len(_reports) > settings.ANALYTICS_CACHE_SIZE:
+        _reports.popitem(last=False)
+    return report
+
+
+async def marks_analytics(top_n: int) -> dict:
+    async def compute():
+        columns = await load_columns("marks", ["subject", "student_id"], ["marks_obtained", "total_marks"])
+        return await async_supabase.run(marks_report, columns, top_n)
+
+    return await _cached("marks", (top_n,), "marks", compute)
+
+
+async def attendance_analytics(threshold: float, bins: int, limit: int) -> dict:
+    async def compute():
+        columns = await load_columns("attendance", ["subject", "student_id"], ["present_days", "total_days"])
+        return await async_supabase.run(attendance_report, columns, threshold, bins, limit)
+
+    return await _cached("attendance", (threshold, bins, limit), "attendance", compute)
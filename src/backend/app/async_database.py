@@ -0,0 +1,60 @@
+"""
+Async facade over the synchronous data-layer clients.
+
+Queries are built with the usual table().select().eq()... chain; only
+execute() changes: it is awaited and runs in a worker thread, so a slow
+query no longer blocks the event loop. At most max_concurrency queries run
+at once per event loop (0 runs them inline, as before).
+"""
+import asyncio
+from weakref import WeakKeyDictionary
+from anyio import CapacityLimiter, to_thread
+
+
+class AsyncQuery:
+    """Wraps a sync query builder; chained calls stay wrapped, execute() is awaitable"""
+
+    def __init__(self, client, builder):
+        self._client = client
+        self._builder = builder
+
+    def __getattr__(self, name):
+        attribute = getattr(self._builder, name)
+        if not callable(attribute):
+            return attribute
+
+        def chained(*args, **kwargs):
+            result = attribute(*args, **kwargs)
+            if hasattr(result, "execute"):
+                return AsyncQuery(self._client, result)
+            return result
+
+        return chained
+
+    async def execute(self):
+        return await self._client.run(self._builder.execute)
+
+
+class AsyncClient:
+    def __init__(self, client, max_concurrency: int):
+        self.client = client
+        self.max_concurrency = max_concurrency
+        self._limiters = WeakKeyDictionary()
+
+    def table(self, table_name: str) -> AsyncQuery:
+        return AsyncQuery(self, self.client.table(table_name))
+
+    def _limiter(self) -> CapacityLimiter:
+        loop = asyncio.get_running_loop()
+        limiter = self._limiters.get(loop)
+        if limiter is None:
+            limiter = self._limiters[loop] = CapacityLimiter(self.max_concurrency)
+        elif limiter.total_tokens != self.max_concurrency:
+            limiter.total_tokens = self.max_concurrency
+        return limiter
+
+    async def run(self, func, *args):
+        """Run a blocking data-layer call in the worker pool"""
+        if self.max_concurrency <= 0:
+            return func(*args)
+        return await to_thread.run_sync(func, *args, limiter=self._limiter())
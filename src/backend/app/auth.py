@@ -1,32 +1,22 @@
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from typing import Optional
+import hashlib
+import threading
+import time
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from app.config import settings
-from app.database import supabase
+from app.database import async_supabase
+from app.table_events import subscribe
+from app.table_versions import table_versions
 from uuid import UUID
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    # Demo mode: use simple comparison if password looks like plaintext
-    if not hashed_password.startswith('$2b$'):
-        return plain_password == hashed_password
-    # Bcrypt has a 72 byte limit, truncate if necessary
-    try:
-        return pwd_context.verify(plain_password[:72], hashed_password)
-    except:
-        # Fallback for bcrypt issues
-        return False
-
-
-def get_password_hash(password: str) -> str:
-    # Bcrypt has a 72 byte limit, truncate if necessary
-    return pwd_context.hash(password[:72])
+STREAM_TICKET_PURPOSE = "stream"
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -40,9 +30,74 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
+class VerifiedTokenCache:
+    """Bounded LRU cache of already-verified JWT payloads.
+
+    Keys are SHA-256 digests of the token string, and entries are served
+    only until the token's exp, so an expired token always goes back through
+    full verification (and is rejected there).
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.entries = OrderedDict()  # digest -> (payload, exp)
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, key: bytes) -> Optional[dict]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[1] > time.time():
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return dict(entry[0])
+            if entry is not None:
+                del self.entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: bytes, payload: dict):
+        exp = payload.get("exp")
+        if self.max_size <= 0 or not isinstance(exp, (int, float)):
+            return
+        with self.lock:
+            self.entries[key] = (dict(payload), exp)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+token_cache = VerifiedTokenCache(settings.JWT_DECODE_CACHE_SIZE)
+
+
 def decode_token(token: str) -> dict:
+    key = token_cache.key(token)
+    payload = token_cache.get(key)
+    if payload is not None:
+        return payload
     try:
         payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+        token_cache.put(key, payload)
         return payload
     except JWTError:
         raise HTTPException(
@@ -52,22 +107,147 @@ def decode_token(token: str) -> dict:
         )
 
 
+class PrincipalCache:
+    """Bounded LRU cache of authenticated users, keyed by bearer token.
+
+    Entries live for at most ttl_seconds and never past the token's own exp.
+    They are dropped as soon as this process updates or deletes the user row.
+    Writes made by other processes are caught by the users table version
+    stored with each entry, where that version is shared (SQLite); on
+    Supabase they go unseen until the entry expires, so app.auth then uses
+    the much shorter PRINCIPAL_CACHE_UNTRACKED_TTL_SECONDS.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: int):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.entries = OrderedDict()  # token -> (user_id, user, expires_at, users version)
+        self.tokens_by_user = {}
+        self.lock = threading.Lock()
+
+    def get(self, token: str, version=None) -> Optional[dict]:
+        with self.lock:
+            entry = self.entries.get(token)
+            if entry is None:
+                return None
+            if entry[2] <= time.time() or entry[3] != version:
+                self._drop(token)
+                return None
+            self.entries.move_to_end(token)
+            return entry[1]
+
+    def put(self, token: str, user: dict, exp: Optional[float] = None, version=None):
+        if self.max_size <= 0:
+            return
+        expires_at = time.time() + self.ttl_seconds
+        if exp is not None:
+            expires_at = min(expires_at, exp)
+        user_id = str(user["id"])
+        with self.lock:
+            self._drop(token)
+            self.entries[token] = (user_id, user, expires_at, version)
+            self.tokens_by_user.setdefault(user_id, set()).add(token)
+            while len(self.entries) > self.max_size:
+                self._drop(next(iter(self.entries)))
+
+    def invalidate_user(self, user_id: str):
+        with self.lock:
+            for token in list(self.tokens_by_user.get(str(user_id), ())):
+                self._drop(token)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.tokens_by_user.clear()
+
+    def _drop(self, token: str):
+        entry = self.entries.pop(token, None)
+        if entry is None:
+            return
+        tokens = self.tokens_by_user.get(entry[0])
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self.tokens_by_user[entry[0]]
+
+
+principal_cache = PrincipalCache(
+    settings.PRINCIPAL_CACHE_SIZE,
+    settings.PRINCIPAL_CACHE_TTL_SECONDS if table_versions.complete else settings.PRINCIPAL_CACHE_UNTRACKED_TTL_SECONDS,
+)
+
+
+def _invalidate_principals(operation: str, records: list[dict]):
+    if operation in ("update", "delete", "upsert"):
+        if not records or any("id" not in record for record in records):
+            # The write did not return the ids it touched, so any cached user may be stale
+            principal_cache.clear()
+            return
+        for record in records:
+            principal_cache.invalidate_user(record.get("id"))
+
+
+subscribe("users", _invalidate_principals)
+
+
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    token = credentials.credentials
+    return await authenticate(credentials.credentials)
+
+
+def create_stream_ticket(user_id: str) -> str:
+    """A short-lived token that only opens push connections, for the query string of EventSource URLs"""
+    return create_access_token({"sub": user_id, "purpose": STREAM_TICKET_PURPOSE},
+                               timedelta(seconds=settings.STREAM_TICKET_EXPIRE_SECONDS))
+
+
+async def get_stream_user(credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+                          ticket: Optional[str] = None):
+    # EventSource cannot send headers, so push connections may pass a stream ticket as ?ticket=
+    # instead; the bearer token itself never goes in a URL, where logs and history would keep it
+    if credentials is not None:
+        return await authenticate(credentials.credentials)
+    if not ticket:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    return await authenticate(ticket, STREAM_TICKET_PURPOSE)
+
+
+async def authenticate(token: str, purpose: Optional[str] = None) -> dict:
+    # Only access tokens are cached, so a cached principal never stands in for a ticket or vice versa
+    version = None
+    if purpose is None:
+        if table_versions.shared:
+            # Another process may have changed or deleted the user since the entry was cached
+            version = tuple(await table_versions.current(("users",)))
+        cached_user = principal_cache.get(token, version)
+        if cached_user is not None:
+            return cached_user
+
     payload = decode_token(token)
     user_id: str = payload.get("sub")
-    if user_id is None:
+    if user_id is None or payload.get("purpose") != purpose:
         raise HTTPException(status_code=401, detail="Invalid authentication credentials")
     
     # Fetch user from Supabase
-    response = supabase.table("users").select("*").eq("id", user_id).execute()
+    response = await async_supabase.table("users").select("*").eq("id", user_id).execute()
     if not response.data:
         raise HTTPException(status_code=401, detail="User not found")
     
-    return response.data[0]
+    user = response.data[0]
+    if purpose is None:
+        principal_cache.put(token, user, payload.get("exp"), version)
+    return user
+
+
+_role_checkers = {}
 
 
 def require_role(allowed_roles: list[str]):
+    # Hand out one checker per role set: routes declare the dependency both in
+    # dependencies=[...] and as a parameter, and FastAPI only dedupes identical callables
+    key = tuple(sorted(allowed_roles))
+    if key in _role_checkers:
+        return _role_checkers[key]
+
     async def role_checker(current_user: dict = Depends(get_current_user)):
         if current_user["role"] not in allowed_roles:
             raise HTTPException(
@@ -75,4 +255,6 @@ def require_role(allowed_roles: list[str]):
                 detail="You don't have permission to access this resource"
             )
         return current_user
+
+    _role_checkers[key] = role_checker
     return role_checker
@@ -0,0 +1,236 @@
+"""
+Streaming bulk upserts from CSV or NDJSON uploads.
+
+The request body is parsed line by line as it arrives, rows are validated in
+batches against the create model, and each batch is written with a single
+upsert keyed on the table's unique columns. Rows that fail to parse,
+validate or save are reported by line number; the other rows are still
+written. A CSV record is reported under its first line, since quoted fields
+may span lines.
+"""
+import codecs
+import csv
+import json
+from collections import deque
+
+from fastapi import HTTPException, Request
+from postgrest.exceptions import APIError
+from pydantic import ValidationError
+
+from app.config import settings
+from app.database import async_supabase
+from app.responses import list_adapter
+
+FORMATS = {
+    "text/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+}
+
+
+async def iter_lines(stream):
+    """(line number, text) for each line of a byte stream, decoded incrementally"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    number = 0
+    try:
+        async for chunk in stream:
+            pending += decoder.decode(chunk)
+            *lines, pending = pending.split("\n")
+            for line in lines:
+                number += 1
+                yield number, line.rstrip("\r")
+        pending += decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail=f"Upload is not valid UTF-8 (after line {number})")
+    if pending:
+        yield number + 1, pending.rstrip("\r")
+
+
+class LineFeed:
+    """Lines queued from the upload stream, read by one csv.reader as they arrive"""
+
+    def __init__(self):
+        self.lines = deque()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if not self.lines:
+            raise StopIteration
+        return self.lines.popleft()
+
+
+async def iter_csv(lines):
+    """(first line number, values, error) for each CSV record"""
+    feed = LineFeed()
+    reader = csv.reader(feed)
+    first = None
+    quoted = False
+    async for number, line in lines:
+        if first is None:
+            if not line.strip():
+                continue
+            first = number
+        # The reader needs the line ending to keep newlines inside quoted fields
+        feed.lines.append(line + "\n")
+        # Escaped quotes come in pairs, so an odd count leaves a quoted field open
+        if line.count('"') % 2:
+            quoted = not quoted
+        if quoted:
+            continue
+        try:
+            yield first, next(reader), None
+        except csv.Error as error:
+            feed.lines.clear()
+            yield first, None, str(error)
+        first = None
+    if first is not None:
+        yield first, None, "unterminated quoted field"
+
+
+async def iter_records(lines, upload_format: str, fields: list):
+    """(line number, record, error) for each non-blank line (CSV: record)"""
+    if upload_format == "ndjson":
+        async for number, line in lines:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as error:
+                yield number, None, f"invalid JSON: {error}"
+                continue
+            if isinstance(record, dict):
+                yield number, record, None
+            else:
+                yield number, None, "expected a JSON object"
+        return
+
+    header = None
+    async for number, values, error in iter_csv(lines):
+        if error is not None:
+            if header is None:
+                raise HTTPException(status_code=400, detail=f"CSV header is invalid: {error}")
+            yield number, None, error
+            continue
+        if header is None:
+            header = [name.strip() for name in values]
+            missing = [field for field in fields if field not in header]
+            if missing:
+                raise HTTPException(status_code=400, detail=f"CSV header is missing: {', '.join(missing)}")
+            continue
+        if len(values) != len(header):
+            yield number, None, f"expected {len(header)} fields, got {len(values)}"
+        else:
+            yield number, dict(zip(header, values)), None
+
+
+def validate_batch(model, batch: list):
+    """Validate (line, record) pairs at once; returns the valid models and per-line errors"""
+    adapter = list_adapter(model)
+    records = [record for _, record in batch]
+    try:
+        return list(zip((line for line, _ in batch), adapter.validate_python(records))), {}
+    except ValidationError as error:
+        failed = {}
+        for detail in error.errors():
+            position, *location = detail["loc"]
+            field = ".".join(map(str, location))
+            failed.setdefault(batch[position][0], []).append(f"{field}: {detail['msg']}" if field else detail["msg"])
+    valid = [(line, record) for line, record in batch if line not in failed]
+    if not valid:
+        return [], failed
+    return list(zip((line for line, _ in valid), adapter.validate_python([record for _, record in valid]))), failed
+
+
+class BulkUpsert:
+    def __init__(self, table_name: str, model, on_conflict: tuple):
+        self.table_name = table_name
+        self.model = model
+        self.on_conflict = on_conflict
+        self.received = 0
+        self.upserted = 0
+        self.errors = {}
+        # student_id of every saved row, in upload order without repeats
+        self.student_ids = {}
+
+    def fail(self, line: int, messages: list):
+        self.errors.setdefault(line, []).extend(messages)
+
+    async def flush(self, batch: list):
+        valid, failed = validate_batch(self.model, batch)
+        for line, messages in failed.items():
+            self.fail(line, messages)
+        # A row repeated in one upload: the last one wins, as it would row by row
+        rows = {}
+        for line, item in valid:
+            row = item.model_dump(mode="json")
+            rows[tuple(row[column] for column in self.on_conflict)] = (line, row)
+        if not rows:
+            return
+        try:
+            await self.upsert([row for _, row in rows.values()])
+        except APIError:
+            # The database rejected a row, which fails the whole statement: retry
+            # the batch row by row so that only the rejected rows are reported
+            for line, row in rows.values():
+                try:
+                    await self.upsert([row])
+                except Exception as error:
+                    self.fail(line, [f"not saved: {getattr(error, 'message', None) or error}"])
+                else:
+                    self.saved([row])
+            return
+        except Exception as error:
+            for line, _ in rows.values():
+                self.fail(line, [f"not saved: {error}"])
+            return
+        self.saved([row for _, row in rows.values()])
+
+    def saved(self, rows: list):
+        self.upserted += len(rows)
+        for row in rows:
+            if row.get("student_id") is not None:
+                self.student_ids[row["student_id"]] = None
+
+    async def upsert(self, rows: list):
+        await async_supabase.table(self.table_name).upsert(
+            rows, on_conflict=",".join(self.on_conflict), returning="minimal"
+        ).execute()
+
+    def report(self) -> dict:
+        lines = sorted(self.errors)
+        return {
+            "received": self.received,
+            "upserted": self.upserted,
+            "failed": len(lines),
+            "errors": [{"line": line, "errors": self.errors[line]} for line in lines[:settings.BULK_UPLOAD_MAX_ERRORS]],
+            "errors_truncated": len(lines) > settings.BULK_UPLOAD_MAX_ERRORS,
+        }
+
+
+async def bulk_upsert(request: Request, table_name: str, model, on_conflict: tuple) -> tuple[dict, list]:
+    """Stream a CSV/NDJSON request body into table_name, upserting on on_conflict.
+
+    Returns the upload report and the student_ids of the saved rows.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    upload_format = FORMATS.get(content_type)
+    if upload_format is None:
+        raise HTTPException(status_code=415, detail=f"Upload must be one of: {', '.join(FORMATS)}")
+
+    upload = BulkUpsert(table_name, model, on_conflict)
+    batch = []
+    async for line, record, error in iter_records(iter_lines(request.stream()), upload_format, list(model.model_fields)):
+        upload.received += 1
+        if error is not None:
+            upload.fail(line, [error])
+            continue
+        batch.append((line, record))
+        if len(batch) >= settings.BULK_UPLOAD_BATCH_SIZE:
+            await upload.flush(batch)
+            batch = []
+    if batch:
+        await upload.flush(batch)
+    return upload.report(), list(upload.student_ids)
@@ -0,0 +1,522 @@
+"""
+Columnar storage for the fixed-schema numeric tables (marks, attendance).
+
+Instead of one dict per row, every column lives in a compact buffer:
+
+- id: the UUID as two unsigned 64-bit halves (array "Q")
+- text columns (student_id, subject, created_at): dictionary-encoded, each
+  row holds an int code (array "I") into the table's distinct values
+- int columns: array "i" (32-bit, like Postgres INTEGER, and rejecting what
+  it rejects: values outside its range, or that are not ints, including
+  bools). The range is one value narrower than INTEGER's: -2**31 is
+  reserved for NULL, so storing it fails with 22003 like an overflow
+  (out of reach of marks and attendance, which are never negative)
+
+ColumnarTable implements the store interface MockTable uses (best_plan,
+candidates, ordered_candidates, insert, update, delete), so queries run
+unchanged; rows are only materialized as dicts when they are returned.
+Every value of a write is encoded and checked before any buffer changes, so
+a rejected write leaves the table as it was.
+"""
+import os
+import sys
+import uuid
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from itertools import chain
+
+from app.query_filters import FILTERS, integer_out_of_range, invalid_input, unique_violation
+
+# Marks NULL in int columns, so it is not a storable value; the column buffers
+# app.analytics builds for other backends use it for NULL too
+NULL_INT = -2 ** 31
+INT_MAX = 2 ** 31 - 1
+MASK64 = (1 << 64) - 1
+
+
+def uuid_to_int(value):
+    """128-bit value of a UUID in canonical (lowercase, hyphenated) form, else None.
+
+    Only canonical strings sort the same way as their integers, so anything
+    else is left to the generic (string) comparison.
+    """
+    if isinstance(value, uuid.UUID):
+        return value.int
+    if not isinstance(value, str) or len(value) != 36:
+        return None
+    try:
+        number = int(value.replace("-", ""), 16)
+    except ValueError:
+        return None
+    # The round trip rejects uppercase, misplaced hyphens and int() leniency (signs, "_")
+    return number if int_to_uuid(number) == value else None
+
+
+def int_to_uuid(value):
+    h = f"{value:032x}"
+    return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+
+
+def new_uuid_ints(count):
+    """count random version 4 UUIDs as ints, from a single urandom call"""
+    raw = os.urandom(16 * count)
+    return [uuid.UUID(bytes=raw[start:start + 16], version=4).int for start in range(0, 16 * count, 16)]
+
+
+def _array_bytes(values):
+    return sys.getsizeof(values)
+
+
+class UuidColumn:
+    def __init__(self):
+        self.hi = array("Q")
+        self.lo = array("Q")
+
+    def append(self, value):
+        self.hi.append(value >> 64)
+        self.lo.append(value & MASK64)
+
+    def extend(self, values):
+        self.hi.extend(value >> 64 for value in values)
+        self.lo.extend(value & MASK64 for value in values)
+
+    def int_at(self, position):
+        return (self.hi[position] << 64) | self.lo[position]
+
+    def get(self, position):
+        return int_to_uuid(self.int_at(position))
+
+    def set(self, position, value):
+        self.hi[position] = value >> 64
+        self.lo[position] = value & MASK64
+
+    def take(self, positions):
+        self.hi = array("Q", (self.hi[position] for position in positions))
+        self.lo = array("Q", (self.lo[position] for position in positions))
+
+    def nbytes(self):
+        return _array_bytes(self.hi) + _array_bytes(self.lo)
+
+
+class TextColumn:
+    """Dictionary-encoded column: distinct values are stored once"""
+
+    def __init__(self):
+        self.codes = array("I")
+        self.values = []
+        self.lookup = {}
+
+    def encode(self, value):
+        code = self.lookup.get(value)
+        if code is None:
+            code = self.lookup[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def code(self, value):
+        try:
+            return self.lookup.get(value)
+        except TypeError:
+            return None
+
+    def append(self, value):
+        self.codes.append(self.encode(value))
+
+    def encode_all(self, values):
+        return array("I", map(self.encode, values))
+
+    def extend_encoded(self, codes):
+        self.codes.extend(codes)
+
+    def get(self, position):
+        return self.values[self.codes[position]]
+
+    def set(self, position, value):
+        self.codes[position] = self.encode(value)
+
+    def take(self, positions):
+        self.codes = array("I", (self.codes[position] for position in positions))
+
+    def nbytes(self):
+        return (_array_bytes(self.codes) + sys.getsizeof(self.values) + sys.getsizeof(self.lookup)
+                + sum(sys.getsizeof(value) for value in self.values))
+
+
+class IntColumn:
+    def __init__(self):
+        self.data = array("i")
+
+    @staticmethod
+    def encode(value):
+        if value is None:
+            return NULL_INT
+        # bool is an int subclass, but Postgres refuses true/false for an integer
+        if not isinstance(value, int) or isinstance(value, bool):
+            raise invalid_input("integer", value)
+        if not NULL_INT < value <= INT_MAX:
+            raise integer_out_of_range()
+        return value
+
+    def append(self, value):
+        self.data.append(self.encode(value))
+
+    def encode_all(self, values):
+        return array("i", map(self.encode, values))
+
+    def extend_encoded(self, data):
+        self.data.extend(data)
+
+    def get(self, position):
+        value = self.data[position]
+        return None if value == NULL_INT else value
+
+    def set(self, position, value):
+        self.data[position] = self.encode(value)
+
+    def take(self, positions):
+        self.data = array("i", (self.data[position] for position in positions))
+
+    def nbytes(self):
+        return _array_bytes(self.data)
+
+
+COLUMN_TYPES = {"text": TextColumn, "int": IntColumn}
+
+
+class ColumnarTable:
+    """A table stored column by column, with posting lists for indexed text columns"""
+
+    def __init__(self, table_name, schema, indexed=(), unique=()):
+        self.table_name = table_name
+        # Unique constraints; each is looked up through the posting list of its first indexed column
+        self.unique = [("id",)] + [tuple(columns) for columns in unique]
+        self.ids = UuidColumn()
+        self.columns = {name: COLUMN_TYPES[kind]() for name, kind in schema.items()}
+        # Columns outside the schema, kept per row position (normally empty)
+        self.extras = {}
+        self.postings = {name: {} for name in indexed}
+        # Row positions in id order, rebuilt lazily after bulk changes
+        self.order = array("I")
+        self.order_dirty = False
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        return (self.row(position) for position in range(self.count))
+
+    def row(self, position):
+        record = {"id": self.ids.get(position)}
+        for name, column in self.columns.items():
+            record[name] = column.get(position)
+        extra = self.extras.get(position)
+        if extra:
+            record.update(extra)
+        return record
+
+    def value(self, position, column):
+        if column == "id":
+            return self.ids.get(position)
+        if column in self.columns:
+            return self.columns[column].get(position)
+        return self.extras.get(position, {}).get(column)
+
+    def column_values(self, column):
+        """A copy of an int column's buffer, or of a text column's codes and distinct values"""
+        data = self.columns[column]
+        if isinstance(data, IntColumn):
+            return array("i", data.data)
+        return array("I", data.codes), list(data.values)
+
+    # Id order
+
+    def _sorted_ids(self):
+        if self.order_dirty:
+            self.order = array("I", sorted(range(self.count), key=self.ids.int_at))
+            self.order_dirty = False
+        return self.order
+
+    def position(self, row_id):
+        """Row position of an id, or None"""
+        target = uuid_to_int(row_id)
+        if target is None:
+            return None
+        order = self._sorted_ids()
+        index = bisect_left(order, target, key=self.ids.int_at)
+        if index < len(order) and self.ids.int_at(order[index]) == target:
+            return order[index]
+        return None
+
+    def _id_bounds(self, filters):
+        """Slice of the id order covering the id range filters, or None if they can't be used"""
+        lower = upper = None
+        for op, column, value in filters:
+            if column != "id" or op not in ("eq", "gt", "gte", "lt", "lte"):
+                continue
+            bound = uuid_to_int(value)
+            if bound is None:
+                return None
+            if op in ("eq", "gt", "gte"):
+                lower = bound if lower is None else max(lower, bound)
+            if op in ("eq", "lt", "lte"):
+                upper = bound if upper is None else min(upper, bound)
+        order = self._sorted_ids()
+        start = 0 if lower is None else bisect_left(order, lower, key=self.ids.int_at)
+        stop = len(order) if upper is None else bisect_right(order, upper, key=self.ids.int_at)
+        return start, max(start, stop)
+
+    # Query planning
+
+    def _predicates(self, filters):
+        """Per-position checks for the filters, or None if some filter can never match"""
+        checks = []
+        for op, column, expected in filters:
+            data = self.columns.get(column)
+            if isinstance(data, TextColumn) and op in ("eq", "in"):
+                values = [expected] if op == "eq" else expected
+                codes = {code for code in map(data.code, values) if code is not None}
+                if not codes:
+                    return None
+                checks.append(lambda position, codes=codes, data=data: data.codes[position] in codes)
+            else:
+                matches = FILTERS[op]
+                checks.append(lambda position, matches=matches, column=column, expected=expected:
+                              matches(self.value(position, column), expected))
+        return checks
+
+    def _rows(self, positions, filters):
+        checks = self._predicates(filters)
+        if checks is None:
+            return iter(())
+        return (self.row(position) for position in positions if all(check(position) for check in checks))
+
+    def best_plan(self, filters):
+        plans = []
+        for op, column, value in filters:
+            if op not in ("eq", "in"):
+                continue
+            values = [value] if op == "eq" else value
+            if column == "id":
+                positions = [self.position(row_id) for row_id in values]
+                positions = sorted({position for position in positions if position is not None})
+                plans.append((len(positions), lambda positions=positions: positions))
+            elif column in self.postings:
+                data = self.columns[column]
+                lists = [self.postings[column].get(data.code(item), ()) for item in values]
+                plans.append((sum(map(len, lists)), lambda lists=lists: chain.from_iterable(lists)))
+
+        if any(column == "id" and op in ("gt", "gte", "lt", "lte") for op, column, _ in filters):
+            bounds = self._id_bounds(filters)
+            if bounds is not None:
+                start, stop = bounds
+                plans.append((stop - start, lambda: self.order[start:stop]))
+
+        if plans:
+            size, positions = min(plans, key=lambda plan: plan[0])
+        else:
+            size, positions = self.count, lambda: range(self.count)
+        return size, lambda: self._rows(positions(), filters)
+
+    def candidates(self, filters):
+        return self.best_plan(filters)[1]()
+
+    def ordered_candidates(self, filters, column, desc=False):
+        """Rows in id order (only id has an ordered index here)"""
+        if column != "id":
+            return None
+        bounds = self._id_bounds(filters)
+        if bounds is None:
+            return None
+        start, stop = bounds
+        positions = range(stop - 1, start - 1, -1) if desc else range(start, stop)
+        order = self.order
+        return self._rows((order[index] for index in positions), filters)
+
+    # Unique constraints
+
+    def unique_columns(self, columns):
+        """The unique constraint over exactly these columns (in its own order), or None"""
+        for constraint in self.unique:
+            if set(constraint) == set(columns):
+                return constraint
+        return None
+
+    def _find_position(self, columns, key):
+        """Position of the row holding key in the unique constraint over columns, or None"""
+        values = dict(zip(columns, key))
+        if tuple(columns) == ("id",):
+            return self.position(values["id"])
+        codes = {}
+        for name, value in values.items():
+            data = self.columns.get(name)
+            if isinstance(data, TextColumn):
+                codes[name] = data.code(value)
+                if codes[name] is None:
+                    return None
+        indexed = [name for name in columns if name in self.postings]
+        positions = self.postings[indexed[0]].get(codes[indexed[0]], ()) if indexed else range(self.count)
+        for position in positions:
+            if all(self.columns[name].codes[position] == codes[name] if name in codes
+                   else self.value(position, name) == values[name] for name in columns):
+                return position
+        return None
+
+    def find(self, columns, key):
+        """The row holding key in the unique constraint over columns, or None"""
+        position = self._find_position(columns, key)
+        return None if position is None else self.row(position)
+
+    def check_unique(self, records, replacing=(), constraints=None):
+        """Raise a unique violation if records would duplicate a key.
+
+        replacing holds the positions of the existing rows that records are rewriting.
+        """
+        for columns in self.unique if constraints is None else constraints:
+            seen = set()
+            for record in records:
+                key = tuple(record.get(name) for name in columns)
+                if None in key:
+                    continue
+                position = self._find_position(columns, key)
+                if key in seen or (position is not None and position not in replacing):
+                    raise unique_violation(self.table_name, columns, key)
+                seen.add(key)
+
+    # Writes
+
+    def check_values(self, records):
+        """Raise what Postgres would for a value its column cannot hold, before anything is written"""
+        for record in records:
+            if "id" in record and uuid_to_int(record["id"]) is None:
+                raise invalid_input("uuid", record["id"])
+            for name, value in record.items():
+                column = self.columns.get(name)
+                if isinstance(column, IntColumn):
+                    column.encode(value)
+
+    def insert(self, records, validate=True, returning=True):
+        """Insert a batch of rows, generating ids and one shared created_at for the batch.
+
+        validate=False skips the unique checks, for rows known to be valid (log
+        replay); returning=False skips building the inserted rows.
+        """
+        records = list(records)
+        generated = iter(new_uuid_ints(sum(1 for record in records if "id" not in record)))
+        row_ids = []
+        for record in records:
+            if "id" in record:
+                row_id = uuid_to_int(record["id"])
+                if row_id is None:
+                    raise invalid_input("uuid", record["id"])
+                row_ids.append(row_id)
+            else:
+                row_ids.append(next(generated))
+        if validate:
+            self.check_unique(records)
+
+        # Column by column: one pass over the batch per buffer. Every column is
+        # encoded before any buffer grows, so a rejected value changes nothing
+        start = self.count
+        defaults = {"created_at": datetime.now().isoformat()}
+        encoded = {name: column.encode_all([record.get(name, defaults.get(name)) for record in records])
+                   for name, column in self.columns.items()}
+        self.ids.extend(row_ids)
+        for name, column in self.columns.items():
+            column.extend_encoded(encoded[name])
+        known = self.columns.keys() | {"id"}
+        for offset, record in enumerate(records):
+            if not record.keys() <= known:
+                self.extras[start + offset] = {key: value for key, value in record.items() if key not in known}
+        self.count += len(records)
+        positions = range(start, self.count)
+        for name, postings in self.postings.items():
+            codes = self.columns[name].codes
+            for position in positions:
+                bucket = postings.get(codes[position])
+                if bucket is None:
+                    bucket = postings[codes[position]] = array("I")
+                bucket.append(position)
+
+        if not self.order_dirty and len(positions) <= 64:
+            for position in positions:
+                index = bisect_right(self.order, self.ids.int_at(position), key=self.ids.int_at)
+                self.order.insert(index, position)
+        else:
+            self.order_dirty = True
+        return [self.row(position) for position in positions] if returning else []
+
+    def update(self, records, data):
+        self.check_values([data])
+        positions = [self.position(record.get("id")) for record in records]
+        positions = [position for position in positions if position is not None]
+        constraints = [columns for columns in self.unique if any(name in data for name in columns)]
+        if constraints:
+            self.check_unique([dict(self.row(position), **data) for position in positions], set(positions),
+                              constraints)
+        for position in positions:
+            for name, value in data.items():
+                if name == "id":
+                    row_id = uuid_to_int(value)
+                    if row_id != self.ids.int_at(position):
+                        self.ids.set(position, row_id)
+                        self.order_dirty = True
+                elif name in self.columns:
+                    column = self.columns[name]
+                    postings = self.postings.get(name)
+                    if postings is None:
+                        column.set(position, value)
+                        continue
+                    old_code = column.codes[position]
+                    column.set(position, value)
+                    new_code = column.codes[position]
+                    if new_code != old_code:
+                        postings[old_code].remove(position)
+                        if not postings[old_code]:
+                            del postings[old_code]
+                        postings.setdefault(new_code, array("I")).append(position)
+                else:
+                    self.extras.setdefault(position, {})[name] = value
+        return [self.row(position) for position in positions]
+
+    def delete(self, records):
+        doomed = {self.position(record.get("id")) for record in records}
+        doomed.discard(None)
+        if not doomed:
+            return []
+        deleted = [self.row(position) for position in sorted(doomed)]
+        keep = [position for position in range(self.count) if position not in doomed]
+        self.ids.take(keep)
+        for column in self.columns.values():
+            column.take(keep)
+        self.extras = {new: self.extras[old] for new, old in enumerate(keep) if old in self.extras}
+        self.count = len(keep)
+        self.reindex()
+        return deleted
+
+    def reindex(self):
+        """Rebuild the value lookups, posting lists and id order after the buffers were replaced"""
+        for column in self.columns.values():
+            if isinstance(column, TextColumn):
+                column.lookup = {value: code for code, value in enumerate(column.values)}
+        for name, postings in self.postings.items():
+            postings.clear()
+            codes = self.columns[name].codes
+            for position in range(self.count):
+                bucket = postings.get(codes[position])
+                if bucket is None:
+                    bucket = postings[codes[position]] = array("I")
+                bucket.append(position)
+        self.order_dirty = True
+
+    def memory_usage(self):
+        """Approximate bytes held per component"""
+        usage = {"id": self.ids.nbytes()}
+        for name, column in self.columns.items():
+            usage[name] = column.nbytes()
+        for name, postings in self.postings.items():
+            usage[f"index:{name}"] = sys.getsizeof(postings) + sum(map(sys.getsizeof, postings.values()))
+        usage["index:id"] = sys.getsizeof(self.order)
+        usage["total"] = sum(usage.values())
+        return usage
@@ -0,0 +1,40 @@
+"""
+Conditional GET for polled endpoints.
+
+The ETag is derived from the versions of the tables an endpoint reads (see
+app.table_versions), the caller and the query string, so it can be checked
+before the endpoint runs any query. A matching If-None-Match is answered with
+304 Not Modified.
+"""
+import hashlib
+
+from fastapi import Depends, HTTPException, Request, Response
+
+from app.auth import get_current_user
+from app.config import settings
+from app.table_versions import table_versions
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
+
+
+def conditional_get(*tables: str):
+    """Dependency factory: tag the response with an ETag over tables, 304 if unchanged"""
+    for table_name in tables:
+        table_versions.track(table_name)
+
+    async def check(request: Request, response: Response, current_user: dict = Depends(get_current_user)):
+        if not settings.CONDITIONAL_GET:
+            return
+        user_id = str(current_user["id"])
+        parts = [user_id, request.url.query] + await table_versions.current(tables, user_id)
+        etag = '"' + hashlib.sha256("|".join(parts).encode()).hexdigest()[:32] + '"'
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and _matches(if_none_match, etag):
+            raise HTTPException(status_code=304, headers=headers)
+        response.headers.update(headers)
+
+    return check
@@ -6,9 +6,72 @@ class Settings(BaseSettings):
     SUPABASE_URL: str = "http://demo.local"
     SUPABASE_KEY: str = "demo_key"
     SUPABASE_SERVICE_KEY: str = "demo_service_key"
+    DATABASE_BACKEND: str = "mock"  # "mock", "sqlite" or "supabase"
+    MOCK_COLUMNAR_STORAGE: bool = True  # keep mock marks/attendance in columnar buffers
+    MOCK_PERSISTENCE_DIR: str = ""  # write-ahead log + snapshots for the mock database; empty keeps it in memory
+    MOCK_WAL_SYNC: str = "group"  # "group" (writes wait for fsync) or "interval", see app/mock_persistence.py
+    MOCK_WAL_FLUSH_INTERVAL_MS: int = 10
+    MOCK_WAL_MAX_BYTES: int = 64 * 1024 * 1024  # snapshot and start a new log past this size
+    SQLITE_PATH: str = "campus.db"  # shared by every worker process, see app/sqlite_database.py
+    SQLITE_SYNCHRONOUS: str = "NORMAL"  # NORMAL is durable across crashes of the app in WAL mode; FULL also across power loss
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000  # how long a write waits for another process's write
+    SQLITE_STATEMENT_CACHE_SIZE: int = 256  # prepared statements kept per connection
+    SUPABASE_POOL_MAX_CONNECTIONS: int = 100
+    SUPABASE_POOL_MAX_KEEPALIVE: int = 20
+    SUPABASE_KEEPALIVE_EXPIRY_SECONDS: float = 30.0
+    SUPABASE_HTTP2: bool = True
+    SUPABASE_TIMEOUT_SECONDS: float = 10.0
     JWT_SECRET_KEY: str = "demo_jwt_secret_key_for_development_only_12345"
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    STREAM_TICKET_EXPIRE_SECONDS: int = 60  # tickets for ?ticket= on the notification stream
+    # False mounts the plaintext demo auth router; True mounts app/routers/auth.py (bcrypt), which replaces
+    # plaintext passwords with hashes on login, for good: switching back then locks those users out
+    AUTH_PASSWORD_HASHING: bool = False
+    BCRYPT_ROUNDS: int = 12  # existing hashes are rehashed on login when this changes
+    PASSWORD_HASH_EXECUTOR: str = "thread"  # "thread" or "process"
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_PENDING: int = 64  # queued hashes beyond the workers; more get 503
+    DB_MAX_CONCURRENCY: int = 16
+    BATCH_LOAD_MAX_KEYS: int = 200
+    PAGE_SIZE_DEFAULT: int = 100
+    PAGE_SIZE_MAX: int = 1000
+    STREAM_PAGE_SIZE: int = 1000
+    # ETags come from write counters: SQLite's are shared by every process, the mock's are in-process,
+    # and on Supabase (no shared counters) this is forced off
+    CONDITIONAL_GET: bool = True
+    RESPONSE_CACHE_BACKEND: str = "memory"  # "memory", "redis" (needs the redis package) or "none"
+    RESPONSE_CACHE_TTL_SECONDS: int = 300
+    RESPONSE_CACHE_MAX_ENTRIES: int = 1024
+    RESPONSE_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    REDIS_URL: str = "redis://localhost:6379/0"
+    ANALYTICS_CACHE_SIZE: int = 64
+    ANALYTICS_CACHE_TTL_SECONDS: int = 60  # Supabase only: other workers' writes are not counted there
+    RESPONSE_MODE: str = "validated"  # "standard", "validated" or "trusted", see app/responses.py
+    JWT_DECODE_CACHE_SIZE: int = 4096
+    PRINCIPAL_CACHE_SIZE: int = 10000
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 60
+    PRINCIPAL_CACHE_UNTRACKED_TTL_SECONDS: int = 5  # on Supabase, where user changes made by other workers go unseen
+    ASSIGNMENT_FANOUT_BATCH_SIZE: int = 5000
+    BULK_UPLOAD_BATCH_SIZE: int = 2000
+    BULK_UPLOAD_MAX_ERRORS: int = 1000
+    ASSIGNMENT_FANOUT_BACKGROUND_THRESHOLD: int = 2000
+    REMINDER_INSERT_BATCH_SIZE: int = 5000
+    # "leader": every API process schedules jobs, only the holder of SCHEDULER_LOCK_PATH runs them;
+    # "off": no jobs in the API, run python -m app.worker instead
+    SCHEDULER_MODE: str = "leader"
+    SCHEDULER_LOCK_PATH: str = "scheduler.lock"  # must be on a filesystem shared by the competing processes
+    SCHEDULER_TIMEZONE: str = ""  # empty uses the host's timezone
+    SCHEDULER_WORKERS: int = 2
+    SCHEDULER_JOB_TIMEOUT_SECONDS: float = 600.0
+    SCHEDULER_MISFIRE_GRACE_SECONDS: int = 3600  # a run delayed by up to this much still happens
+    REMINDER_HOUR: int = 9
+    REMINDER_MINUTE: int = 0
+    METRICS_ENABLED: bool = True  # request/query instrumentation and the /metrics endpoint
+    SLOW_QUERY_LOG_MS: float = 0  # log data-layer queries at least this slow to "app.slow_query"; 0 disables
+    NOTIFICATION_QUEUE_SIZE: int = 100  # undelivered events per push connection before it is told to resync
+    NOTIFICATION_HEARTBEAT_SECONDS: float = 15.0
+    NOTIFICATION_POLL_SECONDS: float = 1.0  # SQLite: how often push connections check for other processes' inserts
 
     class Config:
         env_file = ".env"
@@ -1,4 +1,46 @@
-# Using mock database for demo (no Supabase required)
-from app.mock_database import supabase, supabase_admin
+from functools import partial
 
-print("⚠️  Using MOCK DATABASE - Data will not persist!")
+from app.async_database import AsyncClient
+from app.config import settings
+from app.table_versions import table_versions
+
+if settings.DATABASE_BACKEND == "supabase":
+    from app.supabase_database import SupabaseDatabase
+
+    supabase = SupabaseDatabase(settings.SUPABASE_URL, settings.SUPABASE_KEY)
+    supabase_admin = SupabaseDatabase(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_KEY)
+    table_versions.complete = False
+    if settings.CONDITIONAL_GET:
+        # Versions are counted per process, and other workers (or the dashboard) write to the same tables
+        print("⚠️  CONDITIONAL_GET is off: ETags cannot see writes made outside this process on Supabase")
+        settings.CONDITIONAL_GET = False
+elif settings.DATABASE_BACKEND == "sqlite":
+    from app.sqlite_database import SqliteDatabase
+
+    # No row-level security to bypass, so the admin client is the same one
+    supabase = supabase_admin = SqliteDatabase(settings.SQLITE_PATH)
+    print(f"🗄️  Using SQLITE DATABASE at {settings.SQLITE_PATH}")
+else:
+    # Using mock database for demo (no Supabase required)
+    from app.mock_database import supabase, supabase_admin
+
+    if not settings.MOCK_PERSISTENCE_DIR:
+        print("⚠️  Using MOCK DATABASE - Data will not persist!")
+
+# Awaitable view of the same client for async request handlers
+async_supabase = AsyncClient(supabase, settings.DB_MAX_CONCURRENCY)
+
+# A backend that counts writes itself gives versions every process agrees on
+if hasattr(supabase, "table_versions"):
+    table_versions.reader = partial(async_supabase.run, supabase.table_versions)
+
+
+def connect_database():
+    """Build the database clients (and their connection pools) for this worker"""
+    supabase.connect()
+
+
+def close_database():
+    """Release pooled connections held by the database clients"""
+    supabase.close()
+    supabase_admin.close()
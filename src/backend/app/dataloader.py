@@ -0,0 +1,133 @@
+"""
+Batch loading for N+1 style lookups.
+
+Key lookups against the same table and column are coalesced into a single
+in_() query, and the rows are handed back per key. BatchLoader does this for
+async handlers (all load() calls issued in the same event-loop tick share a
+query); load_grouped() is the synchronous form used by scheduled jobs.
+"""
+import asyncio
+from functools import partial
+from app.config import settings
+from app.database import async_supabase
+
+
+def _select_columns(columns: str, key_column: str) -> str:
+    names = [name.strip() for name in columns.split(",")]
+    if "*" in names or key_column in names:
+        return columns
+    return ",".join(names + [key_column])
+
+
+def _group(rows: list[dict], key_column: str) -> dict:
+    grouped = {}
+    for row in rows:
+        grouped.setdefault(row.get(key_column), []).append(row)
+    return grouped
+
+
+def _chunks(keys: list, size: int):
+    # Keep in_() lists short enough for PostgREST's URL length limit
+    size = max(size, 1)
+    for start in range(0, len(keys), size):
+        yield keys[start:start + size]
+
+
+def _batch_query(client, table_name: str, key_column: str, keys: list, columns: str, filters: dict):
+    query = client.table(table_name).select(_select_columns(columns, key_column)).in_(key_column, keys)
+    for column, value in (filters or {}).items():
+        query = query.eq(column, value)
+    return query
+
+
+def load_grouped(client, table_name: str, key_column: str, keys, columns: str = "*", filters: dict = None) -> dict:
+    """Fetch the rows for many keys with one in_() query per chunk, grouped by key"""
+    keys = list(dict.fromkeys(keys))
+    grouped = {key: [] for key in keys}
+    for chunk in _chunks(keys, settings.BATCH_LOAD_MAX_KEYS):
+        response = _batch_query(client, table_name, key_column, chunk, columns, filters).execute()
+        for key, rows in _group(response.data, key_column).items():
+            grouped.setdefault(key, []).extend(rows)
+    return grouped
+
+
+class BatchLoader:
+    """Coalesces load() calls made in the same event-loop tick into one query"""
+
+    def __init__(self, client, table_name: str, key_column: str, columns: str = "*", filters: dict = None):
+        self.client = client
+        self.table_name = table_name
+        self.key_column = key_column
+        self.columns = columns
+        self.filters = filters or {}
+        self.cache = {}
+        self.pending = {}
+        self._task = None
+
+    async def load(self, key) -> list[dict]:
+        """Rows whose key_column equals key"""
+        if key in self.cache:
+            return self.cache[key]
+        future = self.pending.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            if not self.pending:
+                # The task starts on the next tick, after this tick's load() calls have joined the batch
+                self._task = loop.create_task(self._dispatch())
+                self._task.add_done_callback(partial(self._dispatched, self.pending))
+            future = self.pending[key] = loop.create_future()
+        return await future
+
+    async def load_many(self, keys) -> list[dict]:
+        """Rows for all keys, flattened in key order"""
+        results = await asyncio.gather(*(self.load(key) for key in dict.fromkeys(keys)))
+        return [row for rows in results for row in rows]
+
+    async def _dispatch(self):
+        batch, self.pending = self.pending, {}
+        grouped = {}
+        for chunk in _chunks(list(batch), settings.BATCH_LOAD_MAX_KEYS):
+            query = _batch_query(self.client, self.table_name, self.key_column, chunk, self.columns, self.filters)
+            response = await query.execute()
+            for key, rows in _group(response.data, self.key_column).items():
+                grouped.setdefault(key, []).extend(rows)
+        for key, future in batch.items():
+            rows = self.cache[key] = grouped.get(key, [])
+            if not future.done():
+                future.set_result(rows)
+
+    def _dispatched(self, batch: dict, task: asyncio.Task):
+        """Fail the batch's waiters if its query raised or the task was cancelled"""
+        if self.pending is batch:
+            # Cancelled before it started: later loads need a new batch
+            self.pending = {}
+        if self._task is task:
+            self._task = None
+        error = None if task.cancelled() else task.exception()
+        for future in batch.values():
+            if future.done():
+                continue
+            if error is None:
+                future.cancel()
+            else:
+                future.set_exception(error)
+
+
+class Loaders:
+    """Per-request registry, so every lookup on a table/column shares one loader"""
+
+    def __init__(self, client=async_supabase):
+        self.client = client
+        self.loaders = {}
+
+    def get(self, table_name: str, key_column: str, columns: str = "*", **filters) -> BatchLoader:
+        key = (table_name, key_column, columns, tuple(sorted(filters.items())))
+        loader = self.loaders.get(key)
+        if loader is None:
+            loader = self.loaders[key] = BatchLoader(self.client, table_name, key_column, columns, filters)
+        return loader
+
+
+def get_loaders() -> Loaders:
+    """FastAPI dependency: a fresh set of loaders for each request"""
+    return Loaders()
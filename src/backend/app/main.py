@@ -1,7 +1,15 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers import auth_simple as auth, admin, class_teacher, teacher, student
+from fastapi.responses import JSONResponse, PlainTextResponse
+from app.routers import auth as auth_hashed, auth_simple, admin, class_teacher, teacher, student
 from app.scheduler import start_scheduler, shutdown_scheduler
+from app.database import connect_database, close_database
+from app.metrics import MetricsMiddleware, render as render_metrics
+from app.pagination import NEXT_CURSOR_HEADER
+from app.responses import FastJSONResponse
+from app.response_cache import response_cache
+from app.config import settings
+from postgrest.exceptions import APIError
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -10,7 +18,8 @@ logger = logging.getLogger(__name__)
 app = FastAPI(
     title="Smart Campus Connect API",
     description="Role-based college management platform API",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=FastJSONResponse if settings.RESPONSE_MODE != "standard" else JSONResponse
 )
 
 # CORS middleware
@@ -20,9 +29,13 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag"],
 )
+# Outermost, so its latency covers CORS handling too
+app.add_middleware(MetricsMiddleware)
 
 # Include routers
+auth = auth_hashed if settings.AUTH_PASSWORD_HASHING else auth_simple
 app.include_router(auth.router)
 app.include_router(admin.router)
 app.include_router(class_teacher.router)
@@ -30,10 +43,25 @@ app.include_router(teacher.router)
 app.include_router(student.router)
 
 
+@app.exception_handler(APIError)
+async def database_error_handler(request: Request, error: APIError):
+    """Rejected data is the client's error, with the status PostgREST gives it; anything else is ours"""
+    code = str(error.code or "")
+    if code in ("23505", "23503"):
+        status_code = 409
+    elif code.startswith(("22", "23")):
+        status_code = 400
+    else:
+        logger.error(f"Database error on {request.method} {request.url.path}: {error.message}")
+        return JSONResponse(status_code=500, content={"detail": "Database error"})
+    return JSONResponse(status_code=status_code, content={"detail": error.message})
+
+
 @app.on_event("startup")
 async def startup_event():
     """Start background tasks on application startup"""
     logger.info("Starting Smart Campus Connect API...")
+    connect_database()
     start_scheduler()
 
 
@@ -42,6 +70,8 @@ async def shutdown_event():
     """Clean up on application shutdown"""
     logger.info("Shutting down Smart Campus Connect API...")
     shutdown_scheduler()
+    await response_cache.close()
+    close_database()
 
 
 @app.get("/")
@@ -56,3 +86,10 @@ async def root():
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
+
+
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        """Prometheus scrape endpoint"""
+        return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
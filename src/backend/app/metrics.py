@@ -0,0 +1,261 @@
+"""
+Request and data-layer instrumentation, exposed at /metrics in the Prometheus
+text format.
+
+MetricsMiddleware times every request by route template (not raw path, so
+ids do not explode the label space) and counts in-flight requests and
+response bytes. Each backend's execute() calls record_query(), which feeds
+per-table query metrics and the totals of the request it runs in (a context
+variable, which anyio carries into the worker threads), so N+1 patterns
+show up as a high queries-per-request histogram and full scans as rows
+scanned far above rows returned. Queries slower than SLOW_QUERY_LOG_MS are
+logged to the "app.slow_query" logger.
+
+Metrics are kept per process; with several workers each scrape sees the
+worker that answered it.
+"""
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from app.config import settings
+
+slow_query_logger = logging.getLogger("app.slow_query")
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (100, 1000, 10_000, 100_000, 1_000_000, 10_000_000)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 500)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def header(self) -> list:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> list:
+        with self.lock:
+            values = list(self.values.items())
+        return self.header() + [f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"
+                                for labels, value in values]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount=1):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def inc(self, *labels, amount=1):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets) + (float("inf"),)
+
+    def observe(self, value, *labels):
+        with self.lock:
+            state = self.values.get(labels)
+            if state is None:
+                # Per bucket counts (not cumulative), then the sum
+                state = self.values[labels] = [0] * len(self.buckets) + [0]
+            for position, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[position] += 1
+                    break
+            state[-1] += value
+
+    def render(self) -> list:
+        with self.lock:
+            values = [(labels, list(state)) for labels, state in self.values.items()]
+        lines = self.header()
+        for labels, state in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(float(state[-1]))}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+REGISTRY = []
+# Callables returning extra exposition lines at scrape time (e.g. the scheduler's job counters)
+COLLECTORS = []
+
+http_requests = Counter("http_requests_total", "Requests by route template and status", ("method", "route", "status"))
+http_latency = Histogram("http_request_duration_seconds", "Request latency, until the last body byte is sent",
+                         ("method", "route"))
+http_in_flight = Gauge("http_requests_in_flight", "Requests being handled (including open streams)")
+http_response_size = Histogram("http_response_size_bytes", "Response body size", ("method", "route"), SIZE_BUCKETS)
+request_queries = Histogram("http_request_db_queries", "Data-layer queries made while handling one request",
+                            ("method", "route"), COUNT_BUCKETS)
+request_db_time = Histogram("http_request_db_seconds", "Time spent in data-layer queries for one request",
+                            ("method", "route"))
+request_rows_scanned = Counter("http_request_db_rows_scanned_total", "Rows examined by the queries of a route",
+                               ("method", "route"))
+request_rows_returned = Counter("http_request_db_rows_returned_total", "Rows returned by the queries of a route",
+                                ("method", "route"))
+db_queries = Counter("db_queries_total", "Data-layer queries", ("table", "operation"))
+db_latency = Histogram("db_query_duration_seconds", "Data-layer query latency", ("table", "operation"))
+db_rows_scanned = Counter("db_rows_scanned_total", "Rows examined by queries, where the backend can tell",
+                          ("table", "operation"))
+db_rows_returned = Counter("db_rows_returned_total", "Rows returned (or written) by queries", ("table", "operation"))
+db_slow_queries = Counter("db_slow_queries_total", "Queries slower than SLOW_QUERY_LOG_MS", ("table", "operation"))
+
+
+class RequestStats:
+    """Data-layer totals of one request; updated from worker threads"""
+
+    __slots__ = ("queries", "seconds", "rows_scanned", "rows_returned", "lock")
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+        self.rows_scanned = 0
+        self.rows_returned = 0
+        self.lock = threading.Lock()
+
+
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+
+def describe_query(query_filters: list, ordering: list, row_limit: Optional[int]) -> str:
+    """A query's shape for the slow-query log: filtered columns and operators, never values"""
+    parts = [f"{op}({column})" for op, column, _ in query_filters]
+    parts += [f"order({column}{' desc' if desc else ''})" for column, desc in ordering]
+    if row_limit is not None:
+        parts.append(f"limit({row_limit})")
+    return " ".join(parts)
+
+
+def record_query(table_name: str, operation: Optional[str], seconds: float, rows_returned: int,
+                 rows_scanned: Optional[int] = None, description=""):
+    """Report one executed query.
+
+    rows_scanned is None when the backend cannot tell; description may be a
+    callable, only evaluated when the query is slow enough to be logged.
+    """
+    if not settings.METRICS_ENABLED:
+        return
+    operation = operation or "none"
+    db_queries.inc(table_name, operation)
+    db_latency.observe(seconds, table_name, operation)
+    db_rows_returned.inc(table_name, operation, amount=rows_returned)
+    if rows_scanned is not None:
+        db_rows_scanned.inc(table_name, operation, amount=rows_scanned)
+    stats = current_request.get()
+    if stats is not None:
+        with stats.lock:
+            stats.queries += 1
+            stats.seconds += seconds
+            stats.rows_returned += rows_returned
+            stats.rows_scanned += rows_scanned or 0
+    if settings.SLOW_QUERY_LOG_MS and seconds * 1000 >= settings.SLOW_QUERY_LOG_MS:
+        db_slow_queries.inc(table_name, operation)
+        if callable(description):
+            description = description()
+        slow_query_logger.warning(
+            f"{seconds * 1000:.1f} ms {operation} on {table_name}: {description or '-'} "
+            f"(rows scanned {'?' if rows_scanned is None else rows_scanned}, returned {rows_returned})"
+        )
+
+
+def exposition(name: str, kind: str, documentation: str, samples: list) -> list:
+    """Exposition lines for a metric read at scrape time; samples are (labels dict, value) pairs"""
+    lines = [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"]
+    for labels, value in samples:
+        lines.append(f"{name}{_labels(labels.keys(), labels.values())} {_number(value)}")
+    return lines
+
+
+def render() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines += metric.render()
+    for collector in COLLECTORS:
+        lines += collector()
+    return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """ASGI middleware (not BaseHTTPMiddleware, which would buffer streaming responses)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = 500
+        size = 0
+
+        async def send_and_measure(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        http_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_and_measure)
+        finally:
+            http_in_flight.dec()
+            current_request.reset(token)
+            # The router has stored the matched route in scope; unmatched paths share one label
+            route = scope.get("route")
+            labels = (scope["method"], getattr(route, "path", "unmatched"))
+            http_requests.inc(*labels, str(status))
+            http_latency.observe(time.perf_counter() - started, *labels)
+            http_response_size.observe(size, *labels)
+            request_queries.observe(stats.queries, *labels)
+            request_db_time.observe(stats.seconds, *labels)
+            request_rows_scanned.inc(*labels, amount=stats.rows_scanned)
+            request_rows_returned.inc(*labels, amount=stats.rows_returned)
@@ -1,8 +1,31 @@
 """
 Mock database for demo purposes - stores data in memory
 """
+from bisect import bisect_left, bisect_right
 from datetime import datetime
+from functools import partial
+from heapq import nsmallest
+from itertools import islice
+from operator import itemgetter
 from uuid import uuid4
+import atexit
+import os
+import threading
+import time
+from postgrest.exceptions import APIError
+from app.columnar_store import ColumnarTable
+from app.config import settings
+from app.metrics import describe_query, record_query
+from app.query_filters import FILTERS, sort_key, unique_violation
+from app.table_events import notify
+
+# Fixed-schema numeric tables kept column by column (see app/columnar_store.py)
+COLUMNAR_TABLES = {
+    "attendance": {"student_id": "text", "subject": "text", "present_days": "int", "total_days": "int",
+                   "created_at": "text"},
+    "marks": {"student_id": "text", "subject": "text", "marks_obtained": "int", "total_marks": "int",
+              "created_at": "text"},
+}
 
 # In-memory storage
 mock_data = {
@@ -13,93 +36,594 @@ mock_data = {
     "attendance": [],
     "marks": [],
     "notifications": [],
+    "class_access": [],
+    "teacher_assignments": [],
+}
+
+# Unique constraints from docs/database/schema.sql, each backed by a unique index.
+# The "id" primary key is unique on every table.
+UNIQUE_COLUMNS = {
+    "users": [("email",)],
+    "student_assignments": [("assignment_id", "student_id")],
+    "attendance": [("student_id", "subject")],
+    "marks": [("student_id", "subject")],
+    "teacher_assignments": [("teacher_id", "subject")],
+}
+
+# Secondary indexes, mirroring the ones declared in docs/database/schema.sql
+INDEXED_COLUMNS = {
+    "users": [("role",)],
+    "resources": [("uploaded_by",)],
+    "assignments": [("created_by",)],
+    "student_assignments": [("student_id",), ("assignment_id",)],
+    "attendance": [("student_id",)],
+    "marks": [("student_id",)],
+    "notifications": [("student_id",), ("assignment_id",), ("read",)],
+}
+
+# Ordered indexes for columns queried with range filters
+SORTED_COLUMNS = {
+    "assignments": ["due_date"],
+    "attendance": ["id"],
+    "marks": ["id"],
 }
 
+
+def empty_table(table_name):
+    """Storage for an empty table: columnar buffers or a list of dict rows"""
+    if settings.MOCK_COLUMNAR_STORAGE and table_name in COLUMNAR_TABLES:
+        return ColumnarTable(table_name, COLUMNAR_TABLES[table_name], indexed=["student_id"],
+                             unique=UNIQUE_COLUMNS.get(table_name, []))
+    return []
+
+
+for table_name in COLUMNAR_TABLES:
+    mock_data[table_name] = empty_table(table_name)
+
+
+def new_ids(count):
+    """Generate count random (version 4) UUID strings from a single urandom call"""
+    digits = os.urandom(16 * count).hex()
+    ids = []
+    for start in range(0, 32 * count, 32):
+        h = digits[start:start + 32]
+        ids.append(f"{h[:8]}-{h[8:12]}-4{h[13:16]}-{'89ab'[int(h[16], 16) & 3]}{h[17:20]}-{h[20:32]}")
+    return ids
+
+
 class MockResponse:
     def __init__(self, data):
         self.data = data
 
+
+class HashIndex:
+    """Maps a tuple of column values to the records holding those values"""
+
+    def __init__(self, columns):
+        self.columns = columns
+        self.buckets = {}
+
+    def key(self, record):
+        return tuple(record.get(column) for column in self.columns)
+
+    def add(self, record):
+        self.buckets.setdefault(self.key(record), {})[id(record)] = record
+
+    def add_many(self, records):
+        buckets = self.buckets
+        for record in records:
+            key = self.key(record)
+            bucket = buckets.get(key)
+            if bucket is None:
+                bucket = buckets[key] = {}
+            bucket[id(record)] = record
+
+    def remove(self, record, key=None):
+        key = self.key(record) if key is None else key
+        bucket = self.buckets.get(key)
+        if bucket is not None:
+            bucket.pop(id(record), None)
+            if not bucket:
+                del self.buckets[key]
+
+    def size(self, key):
+        return len(self.buckets.get(key, ()))
+
+    def lookup(self, key):
+        return list(self.buckets.get(key, {}).values())
+
+    def lookup_many(self, keys):
+        found = {}
+        for key in keys:
+            found.update(self.buckets.get(key, {}))
+        return list(found.values())
+
+
+class UniqueIndex(HashIndex):
+    """HashIndex over a unique constraint: at most one row per non-NULL key"""
+
+    def find(self, key):
+        bucket = self.buckets.get(key)
+        return next(iter(bucket.values())) if bucket else None
+
+
+class SortedIndex:
+    """Keeps records ordered by one column so eq/gte/lte become bisect range scans"""
+
+    def __init__(self, column):
+        self.columns = (column,)
+        self.keys = []
+        self.records = []
+
+    def key(self, record):
+        return record.get(self.columns[0])
+
+    def add(self, record):
+        key = self.key(record)
+        if key is None:
+            # NULLs never satisfy eq/gte/lte, so they are left out of the index
+            return
+        position = bisect_right(self.keys, key)
+        self.keys.insert(position, key)
+        self.records.insert(position, record)
+
+    def add_many(self, records):
+        if len(records) < 32:
+            for record in records:
+                self.add(record)
+            return
+        # Large batches: one stable sort beats many list insertions
+        pairs = list(zip(self.keys, self.records))
+        pairs.extend((self.key(record), record) for record in records if self.key(record) is not None)
+        pairs.sort(key=itemgetter(0))
+        self.keys = [key for key, _ in pairs]
+        self.records = [record for _, record in pairs]
+
+    def remove(self, record, key=None):
+        key = self.key(record) if key is None else key
+        if key is None:
+            return
+        for position in range(bisect_left(self.keys, key), bisect_right(self.keys, key)):
+            if self.records[position] is record:
+                del self.keys[position]
+                del self.records[position]
+                return
+
+    def bounds(self, lower=None, upper=None):
+        start = 0 if lower is None else bisect_left(self.keys, lower)
+        stop = len(self.keys) if upper is None else bisect_right(self.keys, upper)
+        return start, max(start, stop)
+
+    def scan(self, start, stop):
+        return self.records[start:stop]
+
+    def iterate(self, start, stop, desc=False):
+        positions = range(stop - 1, start - 1, -1) if desc else range(start, stop)
+        return (self.records[position] for position in positions)
+
+
+class MockStore:
+    """The rows of one table together with the indexes kept in sync with them"""
+
+    def __init__(self, table_name):
+        self.table_name = table_name
+        self.rows = mock_data[table_name]
+        self.indexes = {}
+        for columns in [("id",)] + UNIQUE_COLUMNS.get(table_name, []):
+            self.indexes[columns] = UniqueIndex(columns)
+        for columns in INDEXED_COLUMNS.get(table_name, []):
+            self.indexes[columns] = HashIndex(columns)
+        self.sorted_indexes = {column: SortedIndex(column) for column in SORTED_COLUMNS.get(table_name, [])}
+        for record in self.rows:
+            self._index(record)
+
+    def all_indexes(self):
+        return list(self.indexes.values()) + list(self.sorted_indexes.values())
+
+    def constraints(self):
+        return [index for index in self.indexes.values() if isinstance(index, UniqueIndex)]
+
+    def unique_columns(self, columns):
+        """The unique constraint over exactly these columns (in its own order), or None"""
+        for index in self.constraints():
+            if set(index.columns) == set(columns):
+                return index.columns
+        return None
+
+    def find(self, columns, key):
+        """The row holding key in the unique constraint over columns, or None"""
+        values = dict(zip(columns, key))
+        index = self.indexes[self.unique_columns(columns)]
+        return index.find(tuple(values[column] for column in index.columns))
+
+    def check_unique(self, records, replacing=(), constraints=None):
+        """Raise a unique violation if records would duplicate a key.
+
+        replacing holds id() of the existing rows that records are rewriting.
+        """
+        for index in self.constraints() if constraints is None else constraints:
+            seen = set()
+            for record in records:
+                key = index.key(record)
+                if None in key:
+                    continue
+                bucket = index.buckets.get(key, ())
+                if key in seen or any(row_id not in replacing for row_id in bucket):
+                    raise unique_violation(self.table_name, index.columns, key)
+                seen.add(key)
+
+    def check_values(self, records):
+        """Dict rows are untyped: any value can be stored"""
+
+    def _index(self, record):
+        for index in self.all_indexes():
+            index.add(record)
+
+    def candidates(self, filters):
+        """Return the smallest row set the indexes can give for the filters.
+
+        Every usable index yields a plan with an estimated row count, which is
+        cheap to compute (bucket sizes, bisect bounds); the cheapest plan wins
+        and the remaining filters are checked against its rows.
+        """
+        return self.best_plan(filters)[1]()
+
+    @staticmethod
+    def _range(column, filters):
+        # Bounds on one column implied by the filters (gt/lt give inclusive, wider bounds)
+        lower = upper = None
+        for op, filter_column, value in filters:
+            if filter_column != column:
+                continue
+            if op in ("eq", "gt", "gte"):
+                lower = value if lower is None else max(lower, value)
+            if op in ("eq", "lt", "lte"):
+                upper = value if upper is None else min(upper, value)
+        return lower, upper
+
+    def ordered_candidates(self, filters, column, desc=False):
+        """Rows already in column order from a sorted index, or None if there is none.
+
+        Lets ordered queries with a limit stop after the first matches instead
+        of sorting every candidate. Only used when the index holds every row
+        (it leaves out NULLs).
+        """
+        index = self.sorted_indexes.get(column)
+        if index is None or len(index.keys) != len(self.rows):
+            return None
+        start, stop = index.bounds(*self._range(column, filters))
+        return index.iterate(start, stop, desc)
+
+    def best_plan(self, filters):
+        plans = []
+
+        equalities = {}
+        for op, column, value in filters:
+            if op == "eq" and column not in equalities:
+                equalities[column] = value
+        for columns, index in self.indexes.items():
+            if all(column in equalities for column in columns):
+                key = tuple(equalities[column] for column in columns)
+                plans.append((index.size(key), partial(index.lookup, key)))
+
+        for op, column, values in filters:
+            index = self.indexes.get((column,))
+            if op == "in" and index is not None:
+                keys = [(value,) for value in values]
+                plans.append((sum(index.size(key) for key in keys), partial(index.lookup_many, keys)))
+
+        for column, index in self.sorted_indexes.items():
+            lower, upper = self._range(column, filters)
+            if lower is not None or upper is not None:
+                start, stop = index.bounds(lower, upper)
+                plans.append((stop - start, partial(index.scan, start, stop)))
+
+        if not plans:
+            return len(self.rows), lambda: self.rows
+        return min(plans, key=lambda plan: plan[0])
+
+    def insert(self, records, validate=True, returning=True):
+        """Insert a batch of rows, generating ids and one shared created_at for the batch.
+
+        validate=False skips the unique checks, for rows known to be valid (log
+        replay); returning=False skips building the inserted rows.
+        """
+        inserted = [dict(item) for item in records]
+        missing_ids = [record for record in inserted if "id" not in record]
+        for record, new_id in zip(missing_ids, new_ids(len(missing_ids))):
+            record["id"] = new_id
+        created_at = datetime.now().isoformat()
+        for record in inserted:
+            if "created_at" not in record:
+                record["created_at"] = created_at
+        if validate:
+            self.check_unique(inserted)
+        self.rows.extend(inserted)
+        for index in self.all_indexes():
+            index.add_many(inserted)
+        return inserted if returning else []
+
+    def update(self, records, data):
+        affected = [index for index in self.all_indexes() if any(c in data for c in index.columns)]
+        constraints = [index for index in affected if isinstance(index, UniqueIndex)]
+        if constraints:
+            self.check_unique([dict(record, **data) for record in records], {id(record) for record in records},
+                              constraints)
+        for record in records:
+            old_keys = [index.key(record) for index in affected]
+            record.update(data)
+            for index, old_key in zip(affected, old_keys):
+                if index.key(record) != old_key:
+                    index.remove(record, old_key)
+                    index.add(record)
+        return records
+
+    def delete(self, records):
+        if not records:
+            return records
+        doomed = {id(record) for record in records}
+        for record in records:
+            for index in self.all_indexes():
+                index.remove(record)
+        self.rows[:] = [record for record in self.rows if id(record) not in doomed]
+        return records
+
+
+stores = {}
+
+# Serializes access to the stores, whose rows and indexes are updated in several steps
+store_lock = threading.RLock()
+
+
+def upsert(store, records, on_conflict, ignore_duplicates=False):
+    """INSERT ... ON CONFLICT (on_conflict) DO UPDATE, or DO NOTHING with ignore_duplicates.
+
+    As in Postgres, on_conflict must match a unique constraint and one
+    statement may not update the same row twice. Every conflict is looked up
+    in the constraint's unique index, and the new rows are checked before
+    anything is written; execute() holds store_lock throughout, so no other
+    write can slip in between the lookup and the write.
+    """
+    columns = store.unique_columns(on_conflict)
+    if columns is None:
+        raise APIError({
+            "code": "42P10",
+            "message": "there is no unique or exclusion constraint matching the ON CONFLICT specification",
+        })
+    inserts = []
+    updates = []
+    seen = set()
+    for item in records:
+        key = tuple(item.get(column) for column in columns)
+        if None in key:
+            # NULLs never conflict
+            inserts.append(dict(item))
+            continue
+        if key in seen:
+            if ignore_duplicates:
+                continue
+            raise APIError({
+                "code": "21000",
+                "message": "ON CONFLICT DO UPDATE command cannot affect row a second time",
+                "hint": "Ensure that no rows proposed for insertion within the same command have duplicate constrained values.",
+            })
+        seen.add(key)
+        existing = store.find(columns, key)
+        if existing is None:
+            inserts.append(dict(item))
+        elif not ignore_duplicates:
+            updates.append((existing, item))
+    # Checked before the first write, so a rejected row leaves the whole statement undone
+    store.check_values(inserts + [item for _, item in updates])
+    store.check_unique(inserts)
+    updated = [row for existing, item in updates for row in store.update([existing], item)]
+    return updated + store.insert(inserts)
+
+
+def get_store(table_name):
+    if isinstance(mock_data[table_name], ColumnarTable):
+        return mock_data[table_name]
+    store = stores.get(table_name)
+    if store is None or store.rows is not mock_data[table_name]:
+        store = stores[table_name] = MockStore(table_name)
+    return store
+
+
 class MockTable:
+    """Lazy query builder; filters accumulate and are evaluated in one pass by execute()"""
+
     def __init__(self, table_name):
         self.table_name = table_name
+        self._reset()
+
+    def _reset(self):
+        self.operation = None
+        self.payload = None
+        self.returning = "representation"
+        self.on_conflict = ("id",)
+        self.ignore_duplicates = False
+        self.columns = None
         self.query_filters = []
-        self.query_data = None
-    
+        self.row_offset = 0
+        self.row_limit = None
+        self.ordering = []
+        self.rows_scanned = None
+
     def select(self, columns="*"):
-        self.query_data = mock_data[self.table_name].copy()
-        return self
-    
-    def insert(self, data):
-        if isinstance(data, list):
-            new_records = []
-            for item in data:
-                item["id"] = str(uuid4())
-                if "created_at" not in item:
-                    item["created_at"] = datetime.now().isoformat()
-                new_records.append(item)
-                mock_data[self.table_name].append(item)
-            return MockResponse(new_records)
-        else:
-            data["id"] = str(uuid4())
-            if "created_at" not in data:
-                data["created_at"] = datetime.now().isoformat()
-            mock_data[self.table_name].append(data)
-            return MockResponse([data])
-    
+        self.operation = "select"
+        names = [name.strip() for name in columns.split(",") if name.strip()]
+        self.columns = None if "*" in names else names
+        return self
+
+    def insert(self, data, returning="representation"):
+        self.operation = "insert"
+        self.payload = data if isinstance(data, list) else [data]
+        self.returning = returning
+        return self
+
+    def upsert(self, data, returning="representation", ignore_duplicates=False, on_conflict=""):
+        # Same semantics as supabase-py: on_conflict names the unique columns, default the primary key
+        self.operation = "upsert"
+        self.payload = data if isinstance(data, list) else [data]
+        self.returning = returning
+        self.ignore_duplicates = ignore_duplicates
+        if isinstance(on_conflict, str):
+            on_conflict = on_conflict.split(",")
+        self.on_conflict = tuple(column.strip() for column in on_conflict if column.strip()) or ("id",)
+        return self
+
     def update(self, data):
-        updated = []
-        for record in mock_data[self.table_name]:
-            matches = all(record.get(k) == v for k, v in self.query_filters)
-            if matches:
-                record.update(data)
-                updated.append(record)
-        return MockResponse(updated)
-    
+        self.operation = "update"
+        self.payload = data
+        return self
+
     def delete(self):
-        deleted = []
-        remaining = []
-        for record in mock_data[self.table_name]:
-            matches = all(record.get(k) == v for k, v in self.query_filters)
-            if matches:
-                deleted.append(record)
-            else:
-                remaining.append(record)
-        mock_data[self.table_name] = remaining
-        return MockResponse(deleted)
-    
+        self.operation = "delete"
+        return self
+
     def eq(self, column, value):
-        self.query_filters.append((column, value))
-        if self.query_data is not None:
-            self.query_data = [r for r in self.query_data if r.get(column) == value]
+        self.query_filters.append(("eq", column, value))
         return self
-    
+
     def in_(self, column, values):
-        if self.query_data is not None:
-            self.query_data = [r for r in self.query_data if r.get(column) in values]
+        try:
+            values = frozenset(values)
+        except TypeError:
+            values = list(values)
+        self.query_filters.append(("in", column, values))
         return self
-    
+
     def gte(self, column, value):
-        if self.query_data is not None:
-            self.query_data = [r for r in self.query_data if r.get(column, "") >= value]
+        self.query_filters.append(("gte", column, value))
         return self
-    
+
     def lte(self, column, value):
-        if self.query_data is not None:
-            self.query_data = [r for r in self.query_data if r.get(column, "") <= value]
+        self.query_filters.append(("lte", column, value))
+        return self
+
+    def neq(self, column, value):
+        self.query_filters.append(("neq", column, value))
+        return self
+
+    def gt(self, column, value):
+        self.query_filters.append(("gt", column, value))
+        return self
+
+    def lt(self, column, value):
+        self.query_filters.append(("lt", column, value))
+        return self
+
+    def order(self, column, desc=False):
+        # Repeated calls add tie-breaking sort keys
+        self.ordering.append((column, desc))
         return self
-    
+
+    def limit(self, size):
+        self.row_limit = size
+        return self
+
+    def range(self, start, end):
+        # Both bounds are inclusive, as in supabase-py
+        self.row_offset = start
+        self.row_limit = max(end - start + 1, 0)
+        return self
+
+    def _matching(self, store):
+        rows = None
+        estimated_rows, candidates = store.best_plan(self.query_filters)
+        # Rows the plan reads before the remaining filters (an upper bound for ordered scans with a limit)
+        self.rows_scanned = estimated_rows
+        if len(self.ordering) == 1 and self.row_limit is not None and estimated_rows > self.row_offset + self.row_limit:
+            rows = store.ordered_candidates(self.query_filters, *self.ordering[0])
+        presorted = rows is not None
+        if rows is None:
+            rows = candidates()
+        checks = [(FILTERS[op], column, value) for op, column, value in self.query_filters]
+        if checks:
+            rows = (r for r in rows if all(matches(r.get(column), value) for matches, column, value in checks))
+        if self.ordering and not presorted:
+            rows = self._sorted(rows)
+        if self.row_offset or self.row_limit is not None:
+            stop = None if self.row_limit is None else self.row_offset + self.row_limit
+            rows = islice(rows, self.row_offset, stop)
+        return rows
+
+    def _sorted(self, rows):
+        columns = [column for column, desc in self.ordering]
+        if self.row_limit is not None and not any(desc for column, desc in self.ordering):
+            # Only the first offset + limit rows are needed
+            return nsmallest(self.row_offset + self.row_limit, rows,
+                             key=lambda r: [sort_key(r.get(column)) for column in columns])
+        rows = list(rows)
+        for column, desc in reversed(self.ordering):
+            rows.sort(key=lambda r: sort_key(r.get(column)), reverse=desc)
+        return rows
+
     def execute(self):
-        if self.query_data is not None:
-            result = self.query_data
-            self.query_data = None
-            self.query_filters = []
-            return MockResponse(result)
-        return MockResponse([])
+        started = time.perf_counter()
+        with store_lock:
+            store = get_store(self.table_name)
+            if persistence is not None and self.operation != "select":
+                store = persistence.journal(self.table_name, store)
+            if self.operation == "insert":
+                result = store.insert(self.payload)
+            elif self.operation == "upsert":
+                result = upsert(store, self.payload, self.on_conflict, self.ignore_duplicates)
+            elif self.operation == "update":
+                result = store.update(list(self._matching(store)), self.payload)
+            elif self.operation == "delete":
+                result = store.delete(list(self._matching(store)))
+            elif self.operation == "select":
+                rows = self._matching(store)
+                if self.columns is None:
+                    result = list(rows)
+                else:
+                    result = [{column: r.get(column) for column in self.columns} for r in rows]
+            else:
+                result = []
+            if self.operation != "select" and result:
+                notify(self.table_name, self.operation, result)
+        if persistence is not None and self.operation != "select":
+            persistence.wait(store.lsn)
+        record_query(self.table_name, self.operation, time.perf_counter() - started, len(result),
+                     self.rows_scanned, partial(describe_query, self.query_filters, self.ordering, self.row_limit))
+        if self.returning == "minimal":
+            result = []
+        self._reset()
+        return MockResponse(result)
 
 class MockSupabase:
     def table(self, table_name):
         return MockTable(table_name)
 
+    def columns(self, table_name, names):
+        """Snapshot of a columnar table's buffers by column name, or None for dict-row tables"""
+        with store_lock:
+            table = mock_data.get(table_name)
+            if not isinstance(table, ColumnarTable):
+                return None
+            return {name: table.column_values(name) for name in names}
+
+    def connect(self):
+        return self
+
+    def close(self):
+        if persistence is not None:
+            persistence.close()
+
+# Optional durability: replay the saved tables before anything else is written
+persistence = None
+if settings.MOCK_PERSISTENCE_DIR:
+    from app.mock_persistence import Persistence
+
+    persistence = Persistence(settings.MOCK_PERSISTENCE_DIR, store_lock, mock_data, settings.MOCK_WAL_SYNC,
+                              settings.MOCK_WAL_FLUSH_INTERVAL_MS, settings.MOCK_WAL_MAX_BYTES)
+    recovered = persistence.recover(get_store)
+    print(f"💾 Mock database loaded from {settings.MOCK_PERSISTENCE_DIR} "
+          f"(snapshot lsn {recovered['snapshot_lsn']}, {recovered['replayed']} log records replayed "
+          f"in {recovered['seconds']:.2f}s)")
+    atexit.register(persistence.close)
+
 # Create mock instances
 supabase = MockSupabase()
 supabase_admin = MockSupabase()
@@ -117,7 +641,8 @@ demo_admin = {
     "department": "Administration",
     "created_at": datetime.now().isoformat()
 }
-mock_data["users"].append(demo_admin)
+if not supabase_admin.table("users").select("id").eq("email", demo_admin["email"]).execute().data:
+    supabase_admin.table("users").insert(demo_admin).execute()
 
 # Add demo student
 demo_student = {
@@ -129,7 +654,8 @@ demo_student = {
     "department": "Computer Science",
     "created_at": datetime.now().isoformat()
 }
-mock_data["users"].append(demo_student)
+if not supabase_admin.table("users").select("id").eq("email", demo_student["email"]).execute().data:
+    supabase_admin.table("users").insert(demo_student).execute()
 
 # Add demo teacher
 demo_teacher = {
@@ -141,7 +667,8 @@ demo_teacher = {
     "department": "Computer Science",
     "created_at": datetime.now().isoformat()
 }
-mock_data["users"].append(demo_teacher)
+if not supabase_admin.table("users").select("id").eq("email", demo_teacher["email"]).execute().data:
+    supabase_admin.table("users").insert(demo_teacher).execute()
 
 print("✅ Mock database initialized with demo users:")
 print(f"  • Admin: admin@demo.com / admin123")
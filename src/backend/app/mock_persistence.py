@@ -0,0 +1,422 @@
+"""
+Optional durability for the mock database: a write-ahead log plus snapshots.
+
+Every write is logged as its effect on the table (the rows inserted, the ids
+updated and their new values, the ids deleted), so replay never depends on
+generated ids or clocks. A log record is
+
+    <payload length: u32> <crc32: u32> <lsn: u64> <JSON payload>
+
+and a torn or corrupt record at the end of the log (a crash mid-write) ends
+the replay and is cut off.
+
+Writers queue their records for a single flusher thread. With
+MOCK_WAL_SYNC="group" a write returns once the flusher has written and
+fsync'ed it; writes that arrive while an fsync is in flight share the next
+one (group commit). With "interval" writes do not wait, and the flusher
+fsyncs every MOCK_WAL_FLUSH_INTERVAL_MS, so a crash can lose that interval.
+
+Once the log passes MOCK_WAL_MAX_BYTES the flusher writes a snapshot of every
+table and starts a new log segment. Columnar tables are saved as their raw
+buffers, so loading them is a copy out of the memory-mapped file; dict-row
+tables are saved as JSON.
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+from array import array
+from pathlib import Path
+
+from app.columnar_store import ColumnarTable, IntColumn
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory lock on the data directory
+    fcntl = None
+
+HEADER = struct.Struct("<IIQ")
+SNAPSHOT_MAGIC = b"SCCSNAP1"
+SNAPSHOT_FILE = "snapshot.bin"
+
+
+def _dumps(content) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=str)
+    return json.dumps(content, separators=(",", ":"), default=str).encode()
+
+
+def _loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(bytes(data))
+
+
+def _fsync_directory(directory: Path):
+    if os.name == "posix":
+        fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def encode_record(lsn: int, payload: bytes) -> bytes:
+    return HEADER.pack(len(payload), zlib.crc32(payload, lsn & 0xFFFFFFFF), lsn) + payload
+
+
+def read_records(data) -> tuple:
+    """The intact (lsn, payload) records of a log segment, and the offset where they end"""
+    view = memoryview(data)
+    records = []
+    offset = 0
+    while offset + HEADER.size <= len(view):
+        length, crc, lsn = HEADER.unpack_from(view, offset)
+        end = offset + HEADER.size + length
+        if end > len(view):
+            break
+        payload = view[offset + HEADER.size:end]
+        if zlib.crc32(payload, lsn & 0xFFFFFFFF) != crc:
+            break
+        records.append((lsn, payload))
+        offset = end
+    return records, offset
+
+
+class JournaledStore:
+    """Forwards to a table's store and logs every change it makes"""
+
+    def __init__(self, persistence, table_name, store):
+        self.persistence = persistence
+        self.table_name = table_name
+        self.store = store
+        self.lsn = 0
+
+    def __getattr__(self, name):
+        return getattr(self.store, name)
+
+    def _log(self, operation, data):
+        self.lsn = self.persistence.append(self.table_name, operation, data)
+
+    def insert(self, records, validate=True, returning=True):
+        # The log needs the generated ids, so the rows are always built here
+        rows = self.store.insert(records, validate)
+        if rows:
+            self._log("insert", rows)
+        return rows if returning else []
+
+    def update(self, records, data):
+        ids = [record["id"] for record in records]
+        rows = self.store.update(records, data)
+        if rows:
+            self._log("update", [ids, data])
+        return rows
+
+    def delete(self, records):
+        rows = self.store.delete(records)
+        if rows:
+            self._log("delete", [row["id"] for row in rows])
+        return rows
+
+
+class Persistence:
+    def __init__(self, directory, lock, tables: dict, sync: str = "group",
+                 flush_interval_ms: int = 10, max_log_bytes: int = 64 * 1024 * 1024):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.lock = lock
+        self.tables = tables
+        self.sync = sync
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_log_bytes = max_log_bytes
+        self.condition = threading.Condition()
+        self.pending = []
+        self.lsn = 0
+        self.durable_lsn = 0
+        self.error = None
+        self.log = None
+        self.log_bytes = 0
+        self.closing = False
+        self.thread = None
+        self.stats = {"records": 0, "flushes": 0, "checkpoints": 0}
+        self._lock_file = None
+        self._lock_directory()
+
+    def _lock_directory(self):
+        self._lock_file = open(self.directory / "LOCK", "a")
+        if fcntl is not None:
+            try:
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                self._lock_file.close()
+                raise RuntimeError(f"{self.directory} is in use by another process")
+
+    # Recovery
+
+    def segments(self):
+        """Log segments in order; each is named after its first lsn"""
+        return sorted(self.directory.glob("wal-*.log"), key=lambda path: int(path.stem[4:]))
+
+    def recover(self, get_store) -> dict:
+        """Load the snapshot and replay the log into the tables, then start logging"""
+        started = time.perf_counter()
+        snapshot_lsn = self.load_snapshot()
+        replayed = 0
+        segments = self.segments()
+        for number, path in enumerate(segments):
+            data = path.read_bytes()
+            records, end = read_records(data)
+            for lsn, payload in records:
+                self.lsn = max(self.lsn, lsn)
+                if lsn > snapshot_lsn:
+                    self.replay(get_store, _loads(payload))
+                    replayed += 1
+            if end < len(data):
+                if number != len(segments) - 1:
+                    raise RuntimeError(f"{path} is corrupt at byte {end}")
+                # A write torn by a crash: drop it
+                with open(path, "r+b") as log:
+                    log.truncate(end)
+        self.lsn = self.durable_lsn = max(self.lsn, snapshot_lsn)
+        self._open_segment(reuse=segments[-1] if segments else None)
+        self._start()
+        return {"snapshot_lsn": snapshot_lsn, "replayed": replayed, "seconds": time.perf_counter() - started}
+
+    def replay(self, get_store, entry):
+        table_name, operation, data = entry
+        store = get_store(table_name)
+        if operation == "insert":
+            store.insert(data, validate=False, returning=False)
+            return
+        ids = data[0] if operation == "update" else data
+        rows = [row for row in (store.find(("id",), (row_id,)) for row_id in ids) if row is not None]
+        if operation == "update":
+            store.update(rows, data[1])
+        else:
+            store.delete(rows)
+
+    def load_snapshot(self) -> int:
+        path = self.directory / SNAPSHOT_FILE
+        if not path.exists():
+            return 0
+        with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            try:
+                if bytes(view[:8]) != SNAPSHOT_MAGIC:
+                    raise RuntimeError(f"{path} is not a snapshot")
+                (manifest_length,) = struct.unpack_from("<Q", view, 8)
+                manifest = _loads(view[16:16 + manifest_length])
+                base = 16 + manifest_length
+                swap = manifest["byteorder"] != sys.byteorder
+
+                def buffer(typecode, span):
+                    values = array(typecode)
+                    values.frombytes(view[base + span[0]:base + span[0] + span[1]])
+                    if swap:
+                        values.byteswap()
+                    return values
+
+                for table_name, saved in manifest["tables"].items():
+                    if "rows" in saved:
+                        start, length = saved["rows"]
+                        rows = _loads(view[base + start:base + start + length])
+                        if isinstance(self.tables.get(table_name), ColumnarTable):
+                            # Saved before MOCK_COLUMNAR_STORAGE was turned on
+                            self.tables[table_name].insert(rows, validate=False)
+                        else:
+                            self.tables[table_name] = rows
+                        continue
+                    table = self.tables.get(table_name)
+                    if not isinstance(table, ColumnarTable):
+                        schema = {name: "int" if "data" in column else "text"
+                                  for name, column in saved["columns"].items()}
+                        table = ColumnarTable(table_name, schema)
+                    table.count = saved["count"]
+                    table.ids.hi = buffer("Q", saved["id"][0])
+                    table.ids.lo = buffer("Q", saved["id"][1])
+                    for name, column in saved["columns"].items():
+                        data = table.columns[name]
+                        if isinstance(data, IntColumn):
+                            data.data = buffer("i", column["data"])
+                        else:
+                            data.codes = buffer("I", column["codes"])
+                            data.values = column["values"]
+                    table.extras = {position: extra for position, extra in saved["extras"]}
+                    table.reindex()
+                    if table is not self.tables.get(table_name):
+                        # Saved with MOCK_COLUMNAR_STORAGE on, loaded with it off
+                        self.tables[table_name] = list(table)
+            finally:
+                view.release()
+        return manifest["lsn"]
+
+    # Logging
+
+    def journal(self, table_name, store):
+        return JournaledStore(self, table_name, store)
+
+    def _start(self):
+        if self._lock_file is None:
+            self._lock_directory()
+        if self.log is None:
+            self._open_segment(reuse=(self.segments() or [None])[-1])
+        self.closing = False
+        self.thread = threading.Thread(target=self._run, name="mock-wal", daemon=True)
+        self.thread.start()
+
+    def append(self, table_name, operation, data) -> int:
+        """Queue a record; called with the store lock held, so lsn order is apply order"""
+        payload = _dumps([table_name, operation, data])
+        with self.condition:
+            if self.error is not None:
+                raise RuntimeError("mock database log is not writable") from self.error
+            if self.thread is None:
+                # Written to after close() (e.g. a second app lifespan in tests)
+                self._start()
+            self.lsn += 1
+            self.pending.append(encode_record(self.lsn, payload))
+            self.condition.notify_all()
+            return self.lsn
+
+    def wait(self, lsn: int):
+        """Block until lsn is on disk ("group" sync); called after releasing the store lock"""
+        if self.sync != "group":
+            return
+        with self.condition:
+            while self.durable_lsn < lsn and self.error is None:
+                self.condition.wait()
+            if self.durable_lsn < lsn:
+                raise RuntimeError("mock database log write failed") from self.error
+
+    def _open_segment(self, reuse=None):
+        if self.log is not None:
+            self.log.close()
+        path = reuse or self.directory / f"wal-{self.lsn + 1}.log"
+        self.log = open(path, "ab")
+        self.log_bytes = self.log.tell()
+        _fsync_directory(self.directory)
+
+    def _flush(self):
+        """Write and fsync everything queued so far"""
+        with self.condition:
+            records, self.pending = self.pending, []
+            lsn = self.lsn
+        if not records:
+            return
+        data = b"".join(records)
+        self.log.write(data)
+        self.log.flush()
+        os.fsync(self.log.fileno())
+        self.log_bytes += len(data)
+        with self.condition:
+            self.durable_lsn = lsn
+            self.stats["records"] += len(records)
+            self.stats["flushes"] += 1
+            self.condition.notify_all()
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while not self.pending and not self.closing:
+                    self.condition.wait()
+                closing = self.closing
+            if self.sync == "interval" and not closing:
+                time.sleep(self.flush_interval)
+            try:
+                self._flush()
+                if self.log_bytes >= self.max_log_bytes:
+                    self.checkpoint()
+            except Exception as error:
+                with self.condition:
+                    self.error = error
+                    self.condition.notify_all()
+                return
+            if closing:
+                return
+
+    # Snapshots
+
+    def checkpoint(self):
+        """Snapshot every table, then drop the log segments it covers"""
+        with self.lock:
+            # Nothing is appended while the lock is held: flush the tail of the
+            # log, capture the tables at that lsn and continue in a new segment
+            self._flush()
+            lsn = self.lsn
+            chunks, manifest = self._capture()
+            old_segments = self.segments()
+            self._open_segment()
+        manifest["lsn"] = lsn
+        header = _dumps(manifest)
+        path = self.directory / SNAPSHOT_FILE
+        temporary = path.with_suffix(".tmp")
+        with open(temporary, "wb") as file:
+            file.write(SNAPSHOT_MAGIC + struct.pack("<Q", len(header)) + header)
+            for chunk in chunks:
+                file.write(chunk)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary, path)
+        _fsync_directory(self.directory)
+        for segment in old_segments:
+            segment.unlink()
+        self.stats["checkpoints"] += 1
+
+    def _capture(self):
+        """Byte chunks and a manifest describing every table (store lock held)"""
+        chunks = []
+        offset = 0
+
+        def add(data):
+            nonlocal offset
+            chunks.append(data)
+            offset += len(data)
+            return [offset - len(data), len(data)]
+
+        tables = {}
+        for table_name, table in self.tables.items():
+            if not isinstance(table, ColumnarTable):
+                tables[table_name] = {"rows": add(_dumps(table))}
+                continue
+            columns = {}
+            for name, column in table.columns.items():
+                if isinstance(column, IntColumn):
+                    columns[name] = {"data": add(column.data.tobytes())}
+                else:
+                    columns[name] = {"codes": add(column.codes.tobytes()), "values": list(column.values)}
+            tables[table_name] = {
+                "count": table.count,
+                "id": [add(table.ids.hi.tobytes()), add(table.ids.lo.tobytes())],
+                "columns": columns,
+                "extras": sorted(table.extras.items()),
+            }
+        return chunks, {"byteorder": sys.byteorder, "tables": tables}
+
+    def close(self, checkpoint: bool = True):
+        """Flush the log and stop the flusher; a final checkpoint makes the next start a snapshot load"""
+        with self.condition:
+            thread = self.thread
+            if thread is None:
+                return
+            self.closing = True
+            self.condition.notify_all()
+        thread.join()
+        with self.condition:
+            self.thread = None
+        if self.error is None:
+            self._flush()
+            if checkpoint and self.log_bytes:
+                self.checkpoint()
+        self.log.close()
+        self.log = None
+        self._lock_file.close()
+        self._lock_file = None
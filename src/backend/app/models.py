@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional, Literal
+from pydantic import BaseModel, EmailStr, Field
+from typing import Dict, List, Optional, Literal
 from datetime import datetime, date
 from uuid import UUID
 
@@ -32,6 +32,11 @@ class Token(BaseModel):
     user: UserResponse
 
 
+class StreamTicket(BaseModel):
+    ticket: str
+    expires_in: int
+
+
 # Resource Models
 class ResourceCreate(BaseModel):
     title: str
@@ -111,6 +116,79 @@ class MarksResponse(BaseModel):
     total_marks: int
 
 
+# Bulk Upload Models
+class BulkUploadError(BaseModel):
+    line: int
+    errors: List[str]
+
+
+class BulkUploadResult(BaseModel):
+    received: int
+    upserted: int
+    failed: int
+    errors: List[BulkUploadError]
+    errors_truncated: bool
+
+
+# Analytics Models
+class SubjectMarksStats(BaseModel):
+    subject: str
+    records: int
+    average_percent: float
+    min_percent: float
+    max_percent: float
+    percentiles: Dict[str, float]
+
+
+class StudentAverage(BaseModel):
+    student_id: str
+    average_percent: float
+    subjects: int
+
+
+class MarksAnalytics(BaseModel):
+    records: int
+    average_percent: Optional[float]
+    subjects: List[SubjectMarksStats]
+    top_students: List[StudentAverage]
+
+
+class SubjectAttendanceStats(BaseModel):
+    subject: str
+    records: int
+    average_percent: float
+    distribution: List[int]
+    below_threshold: int
+
+
+class StudentAttendance(BaseModel):
+    student_id: str
+    percent: float
+
+
+class AttendanceAnalytics(BaseModel):
+    records: int
+    threshold: float
+    bin_edges: List[float]
+    subjects: List[SubjectAttendanceStats]
+    below_threshold: List[StudentAttendance]
+
+
+# Notification Models
+class NotificationResponse(BaseModel):
+    id: UUID
+    student_id: UUID
+    assignment_id: Optional[UUID] = None
+    message: str
+    read: bool = False
+    created_at: datetime
+
+
+class NotificationMarkRead(BaseModel):
+    ids: Optional[List[UUID]] = Field(None, max_length=1000)
+    all: bool = False
+
+
 # Access Grant
 class GrantAccess(BaseModel):
     class_teacher_id: UUID
@@ -0,0 +1,193 @@
+"""
+Push delivery of student notifications.
+
+Every insert into the notifications table (the reminder job, teacher
+handlers) is fanned out by the hub to the open push connections of the
+students concerned, so a student keeps one Server-Sent Events stream open
+instead of polling the inbox.
+
+On SQLite the hub follows the table itself (SqliteDatabase.feed) every
+NOTIFICATION_POLL_SECONDS while connections are open, so inserts made by any
+worker process are pushed. Other backends report inserts through
+app.table_events, which only sees writes made through this process.
+
+Each connection has a bounded queue. If a client falls that far behind, its
+backlog is dropped and it gets a "resync" event telling it to reload the
+inbox; the inbox stays the source of truth.
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+from datetime import datetime
+from functools import partial
+from typing import Optional
+
+from app.config import settings
+from app.database import async_supabase, supabase
+from app.table_events import subscribe
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    def __init__(self, student_id: str, loop, queue_size: int):
+        self.student_id = student_id
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.overflowed = False
+
+    def put(self, rows: list):
+        # Runs on the subscriber's event loop
+        for row in rows:
+            try:
+                self.queue.put_nowait(row)
+            except asyncio.QueueFull:
+                self.overflowed = True
+                return
+
+    def resync(self):
+        # Runs on the subscriber's event loop; the queued None wakes the stream up
+        self.overflowed = True
+        try:
+            self.queue.put_nowait(None)
+        except asyncio.QueueFull:
+            pass
+
+
+class NotificationHub:
+    """Fans notification rows out to the push connections of their students"""
+
+    def __init__(self, queue_size: int, feed=None, poll_seconds: float = 1.0):
+        self.queue_size = queue_size
+        # feed(cursor) -> (next cursor, inserted rows or None if some may be missed), see SqliteDatabase.feed
+        self.feed = feed
+        self.poll_seconds = poll_seconds
+        self.subscriptions = {}  # student_id -> set of Subscription
+        self.lock = threading.Lock()
+        self.published = 0
+        self.poller = None
+
+    def subscribe(self, student_id: str) -> Subscription:
+        subscription = Subscription(student_id, asyncio.get_running_loop(), self.queue_size)
+        with self.lock:
+            self.subscriptions.setdefault(student_id, set()).add(subscription)
+            if self.feed is not None and self.poller is None:
+                self.poller = threading.Thread(target=self.poll, name="notification-feed", daemon=True)
+                self.poller.start()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self.lock:
+            subscriptions = self.subscriptions.get(subscription.student_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self.subscriptions[subscription.student_id]
+
+    def connections(self) -> int:
+        with self.lock:
+            return sum(len(subscriptions) for subscriptions in self.subscriptions.values())
+
+    def publish(self, rows: list):
+        """Deliver rows to their students' connections; safe to call from any thread"""
+        by_student = {}
+        for row in rows:
+            by_student.setdefault(str(row.get("student_id")), []).append(row)
+        with self.lock:
+            targets = [(subscription, student_rows) for student_id, student_rows in by_student.items()
+                       for subscription in self.subscriptions.get(student_id, ())]
+            self.published += len(rows)
+        for subscription, student_rows in targets:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, student_rows)
+            except RuntimeError:
+                # The connection's event loop has been closed
+                self.unsubscribe(subscription)
+
+    def resync(self):
+        """Tell every connection to reload its inbox"""
+        with self.lock:
+            targets = [subscription for subscriptions in self.subscriptions.values() for subscription in subscriptions]
+        for subscription in targets:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.resync)
+            except RuntimeError:
+                self.unsubscribe(subscription)
+
+    def poll(self):
+        """Publish the rows the feed reports, until the last connection closes"""
+        cursor = None
+        while True:
+            with self.lock:
+                if not self.subscriptions:
+                    self.poller = None
+                    return
+            try:
+                # The first read only finds the last row, so a connection gets what is inserted after it opened
+                cursor, rows = self.feed(cursor)
+            except Exception:
+                logger.exception("Reading new notifications failed")
+                rows = []
+            if rows is None:
+                self.resync()
+            elif rows:
+                self.publish(rows)
+            time.sleep(self.poll_seconds)
+
+    def on_write(self, operation: str, records: list):
+        if operation in ("insert", "upsert"):
+            self.publish(records)
+
+
+_feed = getattr(supabase, "feed", None)
+hub = NotificationHub(settings.NOTIFICATION_QUEUE_SIZE, _feed and partial(_feed, "notifications"),
+                      settings.NOTIFICATION_POLL_SECONDS)
+if hub.feed is None:
+    subscribe("notifications", hub.on_write)
+
+
+async def notify_students(student_ids: list, message: str, assignment_id: Optional[str] = None):
+    """Create one notification per student; connected students get it pushed through the hub"""
+    if not student_ids:
+        return
+    created_at = datetime.now().isoformat()
+    rows = [
+        {"student_id": student_id, "assignment_id": assignment_id, "message": message, "read": False,
+         "created_at": created_at}
+        for student_id in student_ids
+    ]
+    await async_supabase.table("notifications").insert(rows, returning="minimal").execute()
+
+
+def _event(name: str, data, event_id: Optional[str] = None) -> bytes:
+    lines = [f"event: {name}"]
+    if event_id:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {json.dumps(data, default=str)}")
+    return ("\n".join(lines) + "\n\n").encode()
+
+
+async def event_stream(student_id: str):
+    """SSE body for one student: unread count, then notifications as they are created"""
+    subscription = hub.subscribe(student_id)
+    try:
+        unread = await async_supabase.table("notifications").select("id").eq("student_id", student_id).eq("read", False).execute()
+        yield b"retry: 5000\n\n" + _event("unread", {"count": len(unread.data)})
+        while True:
+            try:
+                row = await asyncio.wait_for(subscription.queue.get(), settings.NOTIFICATION_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                # Keeps proxies from closing an idle connection
+                yield b": ping\n\n"
+                continue
+            if subscription.overflowed:
+                while not subscription.queue.empty():
+                    subscription.queue.get_nowait()
+                subscription.overflowed = False
+                yield _event("resync", {})
+                continue
+            yield _event("notification", row, row.get("id"))
+    finally:
+        hub.unsubscribe(subscription)
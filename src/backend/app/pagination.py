@@ -0,0 +1,127 @@
+"""
+Keyset (cursor) pagination and NDJSON streaming for list endpoints.
+
+Pages are ordered by a table's keyset columns; the cursor is an opaque
+token holding the keyset values of the last row served. The condition
+"after (a, id)" is sent as two plain AND queries (ties on a with a larger
+id, then rows with a larger a), so it works on every backend.
+"""
+import base64
+import binascii
+import json
+from typing import Literal, Optional
+
+from fastapi import HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+
+from app.config import settings
+from app.database import async_supabase
+from app.responses import dumps, render_rows
+
+# marks and attendance have no created_at column in the schema, so they page by id
+ORDER_KEYS = {
+    "resources": ("created_at", "id"),
+    "marks": ("id",),
+    "attendance": ("id",),
+    "notifications": ("created_at", "id"),
+}
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class PageParams:
+    """Query parameters shared by paginated list endpoints"""
+
+    def __init__(
+        self,
+        limit: Optional[int] = Query(None, ge=1, le=settings.PAGE_SIZE_MAX),
+        cursor: Optional[str] = None,
+        format: Literal["json", "ndjson"] = "json",
+    ):
+        self.limit = limit
+        self.cursor = cursor
+        self.format = format
+
+
+def encode_cursor(row: dict, order_by: tuple) -> str:
+    raw = json.dumps([row.get(column) for column in order_by], separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, order_by: tuple) -> list:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, binascii.Error):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list) or len(values) != len(order_by):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+async def fetch_page(table_name: str, limit: int, cursor: Optional[str] = None, fields: Optional[list] = None,
+                     filters: Optional[dict] = None, descending: bool = False):
+    """Return one page of rows and the cursor of the next page (None on the last page)"""
+    order_by = ORDER_KEYS[table_name]
+    columns = "*" if fields is None else ",".join(dict.fromkeys(list(fields) + list(order_by)))
+
+    def query():
+        q = async_supabase.table(table_name).select(columns)
+        for column, value in (filters or {}).items():
+            q = q.eq(column, value)
+        return q
+
+    def ordered(q):
+        for column in order_by:
+            q = q.order(column, desc=descending)
+        return q
+
+    def after(q, column, value):
+        return q.lt(column, value) if descending else q.gt(column, value)
+
+    if cursor is None:
+        rows = (await ordered(query()).limit(limit).execute()).data
+    else:
+        values = decode_cursor(cursor, order_by)
+        rows = []
+        if len(order_by) > 1:
+            # Rows tied with the cursor row on the leading key
+            ties = after(query().eq(order_by[0], values[0]), order_by[1], values[1]).order(order_by[1], desc=descending)
+            rows = (await ties.limit(limit).execute()).data
+        if len(rows) < limit:
+            later = ordered(after(query(), order_by[0], values[0])).limit(limit - len(rows))
+            rows += (await later.execute()).data
+
+    next_cursor = encode_cursor(rows[-1], order_by) if rows and len(rows) == limit else None
+    return rows, next_cursor
+
+
+def stream_ndjson(table_name: str, fields: list, filters: Optional[dict] = None) -> StreamingResponse:
+    """Stream a whole table as NDJSON, one keyset page in memory at a time"""
+
+    async def lines():
+        cursor = None
+        while True:
+            rows, cursor = await fetch_page(table_name, settings.STREAM_PAGE_SIZE, cursor, fields, filters)
+            if rows:
+                yield b"".join(dumps({field: row.get(field) for field in fields}) + b"\n" for row in rows)
+            if cursor is None:
+                break
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+async def list_rows(table_name: str, model, page: PageParams, response: Response, filters: Optional[dict] = None):
+    """Serve a list endpoint: the whole table, one keyset page, or an NDJSON stream"""
+    fields = list(model.model_fields)
+    if page.format == "ndjson":
+        return stream_ndjson(table_name, fields, filters)
+    if page.limit is None and page.cursor is None:
+        query = async_supabase.table(table_name).select("*")
+        for column, value in (filters or {}).items():
+            query = query.eq(column, value)
+        return render_rows((await query.execute()).data, model, response)
+
+    rows, next_cursor = await fetch_page(table_name, page.limit or settings.PAGE_SIZE_DEFAULT, page.cursor, fields, filters)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return render_rows(rows, model, response)
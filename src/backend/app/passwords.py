@@ -0,0 +1,91 @@
+"""
+Password hashing off the event loop.
+
+bcrypt is slow on purpose (about 250 ms at 12 rounds), so async handlers
+await hash_password()/check_password(), which run it in a worker pool:
+threads by default (bcrypt releases the GIL), or processes with
+PASSWORD_HASH_EXECUTOR="process". At most PASSWORD_HASH_WORKERS hashes run
+at once and PASSWORD_HASH_MAX_PENDING more may wait; past that the request
+fails fast with 503, so a login burst cannot queue without bound and stall
+everything else.
+
+With upgrade=True, check_password() also returns a new hash when the stored
+one should be replaced (BCRYPT_ROUNDS changed, or a plaintext demo password),
+for login to store. Only a caller that stores it should ask, since making it
+costs as much as the check. Replacing a plaintext password is one-way: the
+plaintext router (AUTH_PASSWORD_HASHING=false) cannot check the hash, so
+those users cannot sign in there any more.
+
+This module only depends on the settings, so worker processes import it
+cheaply.
+"""
+import asyncio
+from typing import Optional, Tuple
+from weakref import WeakKeyDictionary
+
+from anyio import CapacityLimiter, to_process, to_thread
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+from app.config import settings
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
+
+BCRYPT_PREFIXES = ("$2a$", "$2b$", "$2y$")
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return verify_and_update(plain_password, hashed_password)[0]
+
+
+def get_password_hash(password: str) -> str:
+    # Bcrypt has a 72 byte limit, truncate if necessary
+    return pwd_context.hash(password[:72])
+
+
+def verify_and_update(plain_password: str, hashed_password: str,
+                      upgrade: bool = False) -> Tuple[bool, Optional[str]]:
+    """Whether the password matches, and with upgrade a new hash to store if the old one is outdated"""
+    if not hashed_password.startswith(BCRYPT_PREFIXES):
+        # Demo mode: plaintext passwords, upgraded to a hash once they match
+        if plain_password != hashed_password:
+            return False, None
+        return True, get_password_hash(plain_password) if upgrade else None
+    try:
+        if upgrade:
+            return pwd_context.verify_and_update(plain_password[:72], hashed_password)
+        return pwd_context.verify(plain_password[:72], hashed_password), None
+    except ValueError:
+        # Malformed hash
+        return False, None
+
+
+_limiters = WeakKeyDictionary()
+
+
+def _limiter() -> CapacityLimiter:
+    loop = asyncio.get_running_loop()
+    limiter = _limiters.get(loop)
+    if limiter is None:
+        limiter = _limiters[loop] = CapacityLimiter(settings.PASSWORD_HASH_WORKERS)
+    return limiter
+
+
+async def _run(func, *args):
+    limiter = _limiter()
+    if limiter.available_tokens == 0 and limiter.statistics().tasks_waiting >= settings.PASSWORD_HASH_MAX_PENDING:
+        raise HTTPException(status_code=503, detail="Too many sign-ins in progress, please retry",
+                            headers={"Retry-After": "1"})
+    if settings.PASSWORD_HASH_EXECUTOR == "process":
+        return await to_process.run_sync(func, *args, limiter=limiter)
+    return await to_thread.run_sync(func, *args, limiter=limiter)
+
+
+async def hash_password(password: str) -> str:
+    return await _run(get_password_hash, password)
+
+
+async def check_password(plain_password: str, hashed_password: str,
+                         upgrade: bool = False) -> Tuple[bool, Optional[str]]:
+    """verify_and_update() in the hashing pool"""
+    return await _run(verify_and_update, plain_password, hashed_password, upgrade)
@@ -0,0 +1,38 @@
+"""
+Filter operators, sort order and errors shared by the in-memory stores
+"""
+from postgrest.exceptions import APIError
+
+FILTERS = {
+    "eq": lambda value, expected: value == expected,
+    "neq": lambda value, expected: value is not None and value != expected,
+    "in": lambda value, expected: value in expected,
+    "gt": lambda value, expected: value is not None and value > expected,
+    "gte": lambda value, expected: value is not None and value >= expected,
+    "lt": lambda value, expected: value is not None and value < expected,
+    "lte": lambda value, expected: value is not None and value <= expected,
+}
+
+
+def sort_key(value):
+    # NULLs sort last in ascending order (and first in descending), as in Postgres
+    return (value is None, value)
+
+
+def unique_violation(table_name, columns, key):
+    """The error Postgres (through PostgREST) reports for a duplicate key"""
+    constraint = f"{table_name}_pkey" if tuple(columns) == ("id",) else f"{table_name}_{'_'.join(columns)}_key"
+    return APIError({
+        "code": "23505",
+        "message": f'duplicate key value violates unique constraint "{constraint}"',
+        "details": f"Key ({', '.join(columns)})=({', '.join(map(str, key))}) already exists.",
+    })
+
+
+def invalid_input(type_name, value):
+    """The error Postgres reports for a value that does not parse as the column's type"""
+    return APIError({"code": "22P02", "message": f'invalid input syntax for type {type_name}: "{value}"'})
+
+
+def integer_out_of_range():
+    return APIError({"code": "22003", "message": "integer out of range"})
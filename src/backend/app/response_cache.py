@@ -0,0 +1,189 @@
+"""
+Shared cache for rendered responses of hot, read-mostly endpoints.
+
+Entries are keyed by namespace, role, path and query string, so every user
+of a role shares one entry per page. Each namespace has a generation number
+that is part of the key; invalidate() bumps it, which retires every entry of
+that namespace at once (in Redis the old ones expire through their TTL).
+
+Backends:
+- MemoryBackend: in-process LRU bounded by entry count and bytes.
+- RedisBackend: any redis.asyncio-compatible client (get/set/incr), so
+  several workers share entries and invalidations. A fake client with the
+  same methods can stand in for Redis in tests.
+"""
+import json
+import time
+from collections import OrderedDict
+
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
+
+from app.config import settings
+from app.pagination import NEXT_CURSOR_HEADER
+from app.responses import list_adapter
+
+# Headers produced by the endpoint that belong to the cached representation
+CACHED_HEADERS = (NEXT_CURSOR_HEADER,)
+
+
+class MemoryBackend:
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.generations = {}
+        self.bytes = 0
+
+    async def get(self, key: str):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if entry[2] <= time.monotonic():
+            self._drop(key)
+            return None
+        self.entries.move_to_end(key)
+        return entry[0], entry[1]
+
+    async def set(self, key: str, body: bytes, headers: dict, ttl: int):
+        size = len(key) + len(body) + sum(len(k) + len(v) for k, v in headers.items())
+        if self.max_entries <= 0 or size > self.max_bytes:
+            return
+        self._drop(key)
+        self.entries[key] = (body, headers, time.monotonic() + ttl, size)
+        self.bytes += size
+        while len(self.entries) > self.max_entries or self.bytes > self.max_bytes:
+            self._drop(next(iter(self.entries)))
+
+    async def generation(self, namespace: str) -> int:
+        return self.generations.get(namespace, 0)
+
+    async def bump(self, namespace: str):
+        self.generations[namespace] = self.generations.get(namespace, 0) + 1
+        prefix = f"{namespace}:"
+        for key in [key for key in self.entries if key.startswith(prefix)]:
+            self._drop(key)
+
+    async def memory(self) -> dict:
+        return {"entries": len(self.entries), "bytes": self.bytes, "max_bytes": self.max_bytes}
+
+    async def close(self):
+        self.entries.clear()
+        self.bytes = 0
+
+    def _drop(self, key: str):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry[3]
+
+
+class RedisBackend:
+    def __init__(self, client, prefix: str = "scc:cache:"):
+        self.client = client
+        self.prefix = prefix
+
+    async def get(self, key: str):
+        raw = await self.client.get(self.prefix + key)
+        if raw is None:
+            return None
+        header_line, _, body = raw.partition(b"\n")
+        return body, json.loads(header_line)
+
+    async def set(self, key: str, body: bytes, headers: dict, ttl: int):
+        raw = json.dumps(headers).encode() + b"\n" + body
+        await self.client.set(self.prefix + key, raw, ex=ttl)
+
+    async def generation(self, namespace: str) -> int:
+        return int(await self.client.get(f"{self.prefix}gen:{namespace}") or 0)
+
+    async def bump(self, namespace: str):
+        await self.client.incr(f"{self.prefix}gen:{namespace}")
+
+    async def memory(self) -> dict:
+        try:
+            info = await self.client.info("memory")
+        except Exception:
+            return {}
+        return {"used_memory": info.get("used_memory")}
+
+    async def close(self):
+        close = getattr(self.client, "aclose", None) or getattr(self.client, "close", None)
+        if close is not None:
+            await close()
+
+
+class ResponseCache:
+    def __init__(self, backend, ttl_seconds: int):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+
+    async def key(self, namespace: str, role: str, request: Request) -> str:
+        generation = await self.backend.generation(namespace)
+        query = "&".join(sorted(f"{k}={v}" for k, v in request.query_params.multi_items()))
+        return f"{namespace}:{generation}:{role}:{request.url.path}?{query}"
+
+    async def serve(self, namespace: str, role: str, model, request: Request, response: Response, produce):
+        """Return the cached response for this request, or produce() it and cache it.
+
+        produce() is the endpoint's usual list path; streamed responses are
+        passed through uncached. Headers already set on the injected response
+        (e.g. ETag) are added to cache hits.
+        """
+        if self.backend is None:
+            return await produce()
+        key = await self.key(namespace, role, request)
+        entry = await self.backend.get(key)
+        if entry is not None:
+            self.hits += 1
+            body, cached_headers = entry
+            headers = {k: v for k, v in response.headers.items() if k != "content-length"}
+            headers.update(cached_headers)
+            return Response(body, media_type="application/json", headers=headers)
+
+        self.misses += 1
+        result = await produce()
+        if isinstance(result, StreamingResponse):
+            return result
+        if isinstance(result, Response):
+            body, source = result.body, result.headers
+        else:
+            adapter = list_adapter(model)
+            body, source = adapter.dump_json(adapter.validate_python(result)), response.headers
+        cached_headers = {name: source[name] for name in CACHED_HEADERS if name in source}
+        await self.backend.set(key, body, cached_headers, self.ttl_seconds)
+        return result
+
+    async def invalidate(self, namespace: str):
+        if self.backend is not None:
+            await self.backend.bump(namespace)
+
+    async def stats(self) -> dict:
+        total = self.hits + self.misses
+        stats = {
+            "backend": type(self.backend).__name__ if self.backend is not None else None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+        }
+        if self.backend is not None:
+            stats.update(await self.backend.memory())
+        return stats
+
+    async def close(self):
+        if self.backend is not None:
+            await self.backend.close()
+
+
+def create_backend():
+    if settings.RESPONSE_CACHE_BACKEND == "redis":
+        import redis.asyncio as redis
+
+        return RedisBackend(redis.Redis.from_url(settings.REDIS_URL))
+    if settings.RESPONSE_CACHE_BACKEND == "memory":
+        return MemoryBackend(settings.RESPONSE_CACHE_MAX_ENTRIES, settings.RESPONSE_CACHE_MAX_BYTES)
+    return None
+
+
+response_cache = ResponseCache(create_backend(), settings.RESPONSE_CACHE_TTL_SECONDS)
@@ -0,0 +1,67 @@
+"""
+Fast serialization for list responses.
+
+RESPONSE_MODE selects how rows returned by the data layer are rendered:
+
+- "standard": hand the rows back to FastAPI (response_model validation,
+  jsonable_encoder, then the json module), as before.
+- "validated": validate once with a cached TypeAdapter for List[Model] and
+  let pydantic-core write the JSON bytes directly.
+- "trusted": skip validation; rows from the store already have the right
+  shape, so they are only projected onto the model's fields and encoded.
+
+orjson is used for encoding when it is installed.
+"""
+import json
+from typing import List
+
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from app.config import settings
+
+try:
+    import orjson
+    from fastapi.responses import ORJSONResponse as FastJSONResponse
+except ImportError:
+    orjson = None
+    FastJSONResponse = JSONResponse
+
+
+def dumps(content) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, separators=(",", ":"), default=str).encode()
+
+
+_list_adapters = {}
+
+
+def list_adapter(model) -> TypeAdapter:
+    """TypeAdapter for List[model], built once per model"""
+    adapter = _list_adapters.get(model)
+    if adapter is None:
+        adapter = _list_adapters[model] = TypeAdapter(List[model])
+    return adapter
+
+
+def render_rows(rows: list, model, response: Response = None):
+    """Render data-layer rows for a List[model] endpoint according to RESPONSE_MODE.
+
+    Headers already set on the endpoint's injected response are carried over
+    when a new Response is built.
+    """
+    mode = settings.RESPONSE_MODE
+    if mode == "standard":
+        return rows
+    if mode == "trusted":
+        fields = tuple(model.model_fields)
+        body = dumps([{field: row.get(field) for field in fields} for row in rows])
+    else:
+        adapter = list_adapter(model)
+        body = adapter.dump_json(adapter.validate_python(rows))
+    headers = None
+    if response is not None:
+        headers = {key: value for key, value in response.headers.items() if key != "content-length"}
+    return Response(body, media_type="application/json", headers=headers)
@@ -1,7 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from app.models import ResourceCreate, ResourceResponse, GrantAccess
-from app.database import supabase
+from app.database import async_supabase
 from app.auth import require_role
+from app.pagination import PageParams, list_rows
+from app.response_cache import response_cache
 from uuid import UUID
 from typing import List
 
@@ -17,18 +19,19 @@ async def create_resource(resource: ResourceCreate, current_user: dict = Depends
         "uploaded_by": str(current_user["id"])
     }
     
-    response = supabase.table("resources").insert(resource_data).execute()
+    response = await async_supabase.table("resources").insert(resource_data).execute()
     
     if not response.data:
         raise HTTPException(status_code=500, detail="Failed to create resource")
     
+    await response_cache.invalidate("resources")
     return response.data[0]
 
 
 @router.get("/resources", response_model=List[ResourceResponse], dependencies=[Depends(require_role(["admin"]))])
-async def get_resources(current_user: dict = Depends(require_role(["admin"]))):
-    response = supabase.table("resources").select("*").execute()
-    return response.data
+async def get_resources(request: Request, response: Response, page: PageParams = Depends(), current_user: dict = Depends(require_role(["admin"]))):
+    return await response_cache.serve("resources", "admin", ResourceResponse, request, response,
+                                      lambda: list_rows("resources", ResourceResponse, page, response))
 
 
 @router.put("/resources/{resource_id}", response_model=ResourceResponse, dependencies=[Depends(require_role(["admin"]))])
@@ -39,28 +42,35 @@ async def update_resource(resource_id: UUID, resource: ResourceCreate, current_u
         "link": resource.link
     }
     
-    response = supabase.table("resources").update(resource_data).eq("id", str(resource_id)).execute()
+    response = await async_supabase.table("resources").update(resource_data).eq("id", str(resource_id)).execute()
     
     if not response.data:
         raise HTTPException(status_code=404, detail="Resource not found")
     
+    await response_cache.invalidate("resources")
     return response.data[0]
 
 
 @router.delete("/resources/{resource_id}", dependencies=[Depends(require_role(["admin"]))])
 async def delete_resource(resource_id: UUID, current_user: dict = Depends(require_role(["admin"]))):
-    response = supabase.table("resources").delete().eq("id", str(resource_id)).execute()
+    response = await async_supabase.table("resources").delete().eq("id", str(resource_id)).execute()
     
     if not response.data:
         raise HTTPException(status_code=404, detail="Resource not found")
     
+    await response_cache.invalidate("resources")
     return {"message": "Resource deleted successfully"}
 
 
+@router.get("/cache/stats", dependencies=[Depends(require_role(["admin"]))])
+async def get_cache_stats(current_user: dict = Depends(require_role(["admin"]))):
+    return await response_cache.stats()
+
+
 @router.post("/grant-access", dependencies=[Depends(require_role(["admin"]))])
 async def grant_access(access: GrantAccess, current_user: dict = Depends(require_role(["admin"]))):
     # Verify class teacher exists
-    teacher_response = supabase.table("users").select("*").eq("id", str(access.class_teacher_id)).eq("role", "class_teacher").execute()
+    teacher_response = await async_supabase.table("users").select("id").eq("id", str(access.class_teacher_id)).eq("role", "class_teacher").limit(1).execute()
     
     if not teacher_response.data:
         raise HTTPException(status_code=404, detail="Class teacher not found")
@@ -72,6 +82,6 @@ async def grant_access(access: GrantAccess, current_user: dict = Depends(require
         "granted_by": str(current_user["id"])
     }
     
-    response = supabase.table("class_access").insert(access_data).execute()
+    response = await async_supabase.table("class_access").insert(access_data).execute()
     
     return {"message": "Access granted successfully", "data": response.data[0]}
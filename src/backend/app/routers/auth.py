@@ -1,22 +1,27 @@
+import logging
+
 from fastapi import APIRouter, HTTPException, status
 from app.models import UserCreate, UserLogin, Token, UserResponse
-from app.database import supabase
-from app.auth import get_password_hash, verify_password, create_access_token
+from app.database import async_supabase
+from app.auth import create_access_token
+from app.passwords import hash_password, check_password
 from uuid import UUID
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
+logger = logging.getLogger(__name__)
+
 
 @router.post("/signup", response_model=Token)
 async def signup(user: UserCreate):
     try:
         # Check if user already exists
-        existing_user = supabase.table("users").select("*").eq("email", user.email).execute()
+        existing_user = await async_supabase.table("users").select("id").eq("email", user.email).limit(1).execute()
         if existing_user.data:
             raise HTTPException(status_code=400, detail="Email already registered")
         
         # Hash password
-        hashed_password = get_password_hash(user.password)
+        hashed_password = await hash_password(user.password)
         
         # Create user in Supabase
         user_data = {
@@ -27,7 +32,7 @@ async def signup(user: UserCreate):
             "department": user.department
         }
         
-        response = supabase.table("users").insert(user_data).execute()
+        response = await async_supabase.table("users").insert(user_data).execute()
         
         if not response.data:
             raise HTTPException(status_code=500, detail="Failed to create user")
@@ -56,7 +61,7 @@ async def signup(user: UserCreate):
 @router.post("/login", response_model=Token)
 async def login(credentials: UserLogin):
     # Find user by email
-    response = supabase.table("users").select("*").eq("email", credentials.email).execute()
+    response = await async_supabase.table("users").select("*").eq("email", credentials.email).execute()
     
     if not response.data:
         raise HTTPException(
@@ -67,12 +72,21 @@ async def login(credentials: UserLogin):
     user = response.data[0]
     
     # Verify password
-    if not verify_password(credentials.password, user["password"]):
+    # Asks for the new hash, as it is stored below (a plaintext demo password is replaced for good)
+    verified, new_hash = await check_password(credentials.password, user["password"], upgrade=True)
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
         )
     
+    # Rehash with the current parameters; a failure here must not block the login
+    if new_hash is not None:
+        try:
+            await async_supabase.table("users").update({"password": new_hash}).eq("id", user["id"]).eq("password", user["password"]).execute()
+        except Exception:
+            logger.exception("Password rehash failed for user %s", user["id"])
+    
     # Create access token
     access_token = create_access_token(data={"sub": str(user["id"])})
     
@@ -1,6 +1,6 @@
 from fastapi import APIRouter, HTTPException, status
 from app.models import UserCreate, UserLogin, Token, UserResponse
-from app.database import supabase
+from app.database import async_supabase
 from app.config import settings
 from jose import jwt
 from datetime import datetime, timedelta
@@ -18,7 +18,7 @@ def create_token(user_id: str) -> str:
 @router.post("/signup", response_model=Token)
 async def signup(user: UserCreate):
     # Check if user exists
-    existing = supabase.table("users").select("*").eq("email", user.email).execute()
+    existing = await async_supabase.table("users").select("id").eq("email", user.email).limit(1).execute()
     if existing.data:
         raise HTTPException(status_code=400, detail="Email already registered")
     
@@ -31,7 +31,7 @@ async def signup(user: UserCreate):
         "department": user.department
     }
     
-    response = supabase.table("users").insert(user_data).execute()
+    response = await async_supabase.table("users").insert(user_data).execute()
     if not response.data:
         raise HTTPException(status_code=500, detail="Failed to create user")
     
@@ -52,7 +52,7 @@ async def signup(user: UserCreate):
 @router.post("/login", response_model=Token)
 async def login(credentials: UserLogin):
     # Find user
-    response = supabase.table("users").select("*").eq("email", credentials.email).execute()
+    response = await async_supabase.table("users").select("*").eq("email", credentials.email).execute()
     
     if not response.data:
         raise HTTPException(status_code=401, detail="Incorrect email or password")
@@ -1,7 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException
-from app.models import TeacherAssign, AttendanceResponse, MarksResponse
-from app.database import supabase
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from app.models import TeacherAssign, AttendanceResponse, MarksResponse, MarksAnalytics, AttendanceAnalytics
+from app.analytics import marks_analytics, attendance_analytics
+from app.database import async_supabase
 from app.auth import require_role
+from app.pagination import PageParams, list_rows
+from app.responses import render_rows
 from uuid import UUID
 from typing import List
 
@@ -11,7 +14,7 @@ router = APIRouter(prefix="/class-teacher", tags=["Class Teacher"])
 @router.post("/teachers", dependencies=[Depends(require_role(["class_teacher"]))])
 async def add_teacher(teacher: TeacherAssign, current_user: dict = Depends(require_role(["class_teacher"]))):
     # Verify teacher exists
-    teacher_response = supabase.table("users").select("*").eq("id", str(teacher.teacher_id)).eq("role", "teacher").execute()
+    teacher_response = await async_supabase.table("users").select("id").eq("id", str(teacher.teacher_id)).eq("role", "teacher").limit(1).execute()
     
     if not teacher_response.data:
         raise HTTPException(status_code=404, detail="Teacher not found")
@@ -23,31 +26,46 @@ async def add_teacher(teacher: TeacherAssign, current_user: dict = Depends(requi
         "assigned_by": str(current_user["id"])
     }
     
-    response = supabase.table("teacher_assignments").insert(assignment_data).execute()
+    response = await async_supabase.table("teacher_assignments").insert(assignment_data).execute()
     
     return {"message": "Teacher assigned successfully", "data": response.data[0]}
 
 
 @router.get("/marks", response_model=List[MarksResponse], dependencies=[Depends(require_role(["class_teacher"]))])
-async def get_student_marks(current_user: dict = Depends(require_role(["class_teacher"]))):
-    # Get all marks for students in the class
-    response = supabase.table("marks").select("*").execute()
-    return response.data
+async def get_student_marks(response: Response, page: PageParams = Depends(), current_user: dict = Depends(require_role(["class_teacher"]))):
+    # Get all marks for students in the class, optionally paginated or streamed
+    return await list_rows("marks", MarksResponse, page, response)
 
 
 @router.get("/marks/{student_id}", response_model=List[MarksResponse], dependencies=[Depends(require_role(["class_teacher"]))])
 async def get_student_marks_by_id(student_id: UUID, current_user: dict = Depends(require_role(["class_teacher"]))):
-    response = supabase.table("marks").select("*").eq("student_id", str(student_id)).execute()
-    return response.data
+    response = await async_supabase.table("marks").select("*").eq("student_id", str(student_id)).execute()
+    return render_rows(response.data, MarksResponse)
 
 
 @router.get("/attendance", response_model=List[AttendanceResponse], dependencies=[Depends(require_role(["class_teacher"]))])
-async def get_student_attendance(current_user: dict = Depends(require_role(["class_teacher"]))):
-    response = supabase.table("attendance").select("*").execute()
-    return response.data
+async def get_student_attendance(response: Response, page: PageParams = Depends(), current_user: dict = Depends(require_role(["class_teacher"]))):
+    return await list_rows("attendance", AttendanceResponse, page, response)
 
 
 @router.get("/attendance/{student_id}", response_model=List[AttendanceResponse], dependencies=[Depends(require_role(["class_teacher"]))])
 async def get_student_attendance_by_id(student_id: UUID, current_user: dict = Depends(require_role(["class_teacher"]))):
-    response = supabase.table("attendance").select("*").eq("student_id", str(student_id)).execute()
-    return response.data
+    response = await async_supabase.table("attendance").select("*").eq("student_id", str(student_id)).execute()
+    return render_rows(response.data, AttendanceResponse)
+
+
+@router.get("/analytics/marks", response_model=MarksAnalytics, dependencies=[Depends(require_role(["class_teacher"]))])
+async def get_marks_analytics(top_n: int = Query(10, ge=1, le=100), current_user: dict = Depends(require_role(["class_teacher"]))):
+    # Per-subject averages and percentiles, plus the top students by average percentage
+    return await marks_analytics(top_n)
+
+
+@router.get("/analytics/attendance", response_model=AttendanceAnalytics, dependencies=[Depends(require_role(["class_teacher"]))])
+async def get_attendance_analytics(
+    threshold: float = Query(75, ge=0, le=100),
+    bins: int = Query(10, ge=1, le=100),
+    limit: int = Query(100, ge=1, le=1000),
+    current_user: dict = Depends(require_role(["class_teacher"]))
+):
+    # Attendance-percentage distribution per subject and the students below threshold
+    return await attendance_analytics(threshold, bins, limit)
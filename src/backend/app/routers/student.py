@@ -1,27 +1,32 @@
-from fastapi import APIRouter, Depends, HTTPException
-from app.models import AssignmentResponse, ResourceResponse, AttendanceResponse, MarksResponse
-from app.database import supabase
-from app.auth import require_role
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from app.config import settings
+from app.models import AssignmentResponse, ResourceResponse, AttendanceResponse, MarksResponse, NotificationResponse, NotificationMarkRead, StreamTicket
+from app.database import async_supabase
+from app.auth import create_stream_ticket, get_stream_user, require_role
+from app.conditional import conditional_get
+from app.dataloader import Loaders, get_loaders
+from app.notifications import event_stream
+from app.pagination import NEXT_CURSOR_HEADER, PageParams, fetch_page, list_rows
+from app.responses import render_rows
+from app.response_cache import response_cache
+from typing import List, Optional
 from datetime import datetime, timedelta
 
 router = APIRouter(prefix="/student", tags=["Student"])
 
 
-@router.get("/assignments", response_model=List[AssignmentResponse], dependencies=[Depends(require_role(["student"]))])
-async def get_student_assignments(current_user: dict = Depends(require_role(["student"]))):
+@router.get("/assignments", response_model=List[AssignmentResponse], dependencies=[Depends(require_role(["student"])), Depends(conditional_get("student_assignments", "assignments"))])
+async def get_student_assignments(response: Response, current_user: dict = Depends(require_role(["student"])), loaders: Loaders = Depends(get_loaders)):
     # Get all assignments for the student
-    student_assignments = supabase.table("student_assignments").select("assignment_id").eq("student_id", str(current_user["id"])).execute()
+    student_assignments = await loaders.get("student_assignments", "student_id", "assignment_id").load(str(current_user["id"]))
     
-    if not student_assignments.data:
+    if not student_assignments:
         return []
     
-    assignment_ids = [sa["assignment_id"] for sa in student_assignments.data]
-    
-    # Get assignment details
-    assignments = supabase.table("assignments").select("*").in_("id", assignment_ids).execute()
-    
-    return assignments.data
+    # Get assignment details, batched into one in_() lookup
+    assignments = await loaders.get("assignments", "id").load_many(sa["assignment_id"] for sa in student_assignments)
+    return render_rows(assignments, AssignmentResponse, response)
 
 
 @router.get("/assignments/upcoming", response_model=List[AssignmentResponse], dependencies=[Depends(require_role(["student"]))])
@@ -30,16 +35,16 @@ async def get_upcoming_assignments(current_user: dict = Depends(require_role(["s
     today = datetime.now().date()
     two_days_later = (datetime.now() + timedelta(days=2)).date()
     
-    student_assignments = supabase.table("student_assignments").select("assignment_id").eq("student_id", str(current_user["id"])).eq("submitted", False).execute()
+    student_assignments = await async_supabase.table("student_assignments").select("assignment_id").eq("student_id", str(current_user["id"])).eq("submitted", False).execute()
     
     if not student_assignments.data:
         return []
     
     assignment_ids = [sa["assignment_id"] for sa in student_assignments.data]
     
-    assignments = supabase.table("assignments").select("*").in_("id", assignment_ids).gte("due_date", today.isoformat()).lte("due_date", two_days_later.isoformat()).execute()
+    assignments = await async_supabase.table("assignments").select("*").in_("id", assignment_ids).gte("due_date", today.isoformat()).lte("due_date", two_days_later.isoformat()).execute()
     
-    return assignments.data
+    return render_rows(assignments.data, AssignmentResponse)
 
 
 @router.post("/assignments/{assignment_id}/submit", dependencies=[Depends(require_role(["student"]))])
@@ -49,7 +54,7 @@ async def submit_assignment(assignment_id: str, current_user: dict = Depends(req
         "submitted_date": datetime.now().isoformat()
     }
     
-    response = supabase.table("student_assignments").update(update_data).eq("assignment_id", assignment_id).eq("student_id", str(current_user["id"])).execute()
+    response = await async_supabase.table("student_assignments").update(update_data).eq("assignment_id", assignment_id).eq("student_id", str(current_user["id"])).execute()
     
     if not response.data:
         raise HTTPException(status_code=404, detail="Assignment not found")
@@ -57,19 +62,59 @@ async def submit_assignment(assignment_id: str, current_user: dict = Depends(req
     return {"message": "Assignment submitted successfully"}
 
 
-@router.get("/resources", response_model=List[ResourceResponse], dependencies=[Depends(require_role(["student"]))])
-async def get_resources(current_user: dict = Depends(require_role(["student"]))):
-    response = supabase.table("resources").select("*").execute()
-    return response.data
+@router.get("/resources", response_model=List[ResourceResponse], dependencies=[Depends(require_role(["student"])), Depends(conditional_get("resources"))])
+async def get_resources(request: Request, response: Response, page: PageParams = Depends(), current_user: dict = Depends(require_role(["student"]))):
+    return await response_cache.serve("resources", "student", ResourceResponse, request, response,
+                                      lambda: list_rows("resources", ResourceResponse, page, response))
+
+
+@router.get("/attendance", response_model=List[AttendanceResponse], dependencies=[Depends(require_role(["student"])), Depends(conditional_get("attendance"))])
+async def get_attendance(response: Response, current_user: dict = Depends(require_role(["student"]))):
+    result = await async_supabase.table("attendance").select("*").eq("student_id", str(current_user["id"])).execute()
+    return render_rows(result.data, AttendanceResponse, response)
+
+
+@router.get("/marks", response_model=List[MarksResponse], dependencies=[Depends(require_role(["student"])), Depends(conditional_get("marks"))])
+async def get_marks(response: Response, current_user: dict = Depends(require_role(["student"]))):
+    result = await async_supabase.table("marks").select("*").eq("student_id", str(current_user["id"])).execute()
+    return render_rows(result.data, MarksResponse, response)
+
+
+@router.get("/notifications", response_model=List[NotificationResponse], dependencies=[Depends(require_role(["student"])), Depends(conditional_get("notifications"))])
+async def get_notifications(response: Response, limit: int = Query(settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX), cursor: Optional[str] = None, unread_only: bool = False, current_user: dict = Depends(require_role(["student"]))):
+    # Newest first, one keyset page at a time; X-Next-Cursor links the next page
+    filters = {"student_id": str(current_user["id"])}
+    if unread_only:
+        filters["read"] = False
+    rows, next_cursor = await fetch_page("notifications", limit, cursor, list(NotificationResponse.model_fields), filters, descending=True)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return render_rows(rows, NotificationResponse, response)
+
+
+@router.post("/notifications/read", dependencies=[Depends(require_role(["student"]))])
+async def mark_notifications_read(selection: NotificationMarkRead, current_user: dict = Depends(require_role(["student"]))):
+    if not selection.all and not selection.ids:
+        raise HTTPException(status_code=400, detail="Pass ids, or all=true")
+    
+    query = async_supabase.table("notifications").update({"read": True}).eq("student_id", str(current_user["id"])).eq("read", False)
+    if not selection.all:
+        query = query.in_("id", [str(notification_id) for notification_id in selection.ids])
+    response = await query.execute()
+    
+    return {"message": "Notifications marked as read", "updated": len(response.data)}
 
 
-@router.get("/attendance", response_model=List[AttendanceResponse], dependencies=[Depends(require_role(["student"]))])
-async def get_attendance(current_user: dict = Depends(require_role(["student"]))):
-    response = supabase.table("attendance").select("*").eq("student_id", str(current_user["id"])).execute()
-    return response.data
+@router.post("/notifications/stream-ticket", response_model=StreamTicket)
+async def get_stream_ticket(current_user: dict = Depends(require_role(["student"]))):
+    return StreamTicket(ticket=create_stream_ticket(str(current_user["id"])),
+                        expires_in=settings.STREAM_TICKET_EXPIRE_SECONDS)
 
 
-@router.get("/marks", response_model=List[MarksResponse], dependencies=[Depends(require_role(["student"]))])
-async def get_marks(current_user: dict = Depends(require_role(["student"]))):
-    response = supabase.table("marks").select("*").eq("student_id", str(current_user["id"])).execute()
-    return response.data
+@router.get("/notifications/stream")
+async def stream_notifications(current_user: dict = Depends(get_stream_user)):
+    # Server-Sent Events; EventSource clients pass a stream ticket as ?ticket=
+    if current_user["role"] != "student":
+        raise HTTPException(status_code=403, detail="You don't have permission to access this resource")
+    return StreamingResponse(event_stream(str(current_user["id"])), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
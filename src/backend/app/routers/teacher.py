@@ -1,7 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException
-from app.models import AssignmentCreate, AssignmentUpdate, AssignmentResponse, AttendanceCreate, MarksCreate
-from app.database import supabase
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request
+from app.config import settings
+from app.models import AssignmentCreate, AssignmentUpdate, AssignmentResponse, AttendanceCreate, MarksCreate, BulkUploadResult
+from app.bulk_upload import bulk_upsert
+from app.database import async_supabase
 from app.auth import require_role
+from app.notifications import notify_students
+from app.responses import render_rows
 from uuid import UUID
 from typing import List
 from datetime import datetime, timedelta
@@ -9,8 +13,21 @@ from datetime import datetime, timedelta
 router = APIRouter(prefix="/teacher", tags=["Teacher"])
 
 
+async def create_student_assignments(assignment_id: str, student_ids: List[str], message: str):
+    """Create a pending student_assignments row and a notification per student, in bulk batches"""
+    batch_size = settings.ASSIGNMENT_FANOUT_BATCH_SIZE
+    for start in range(0, len(student_ids), batch_size):
+        batch = student_ids[start:start + batch_size]
+        rows = [
+            {"assignment_id": assignment_id, "student_id": student_id, "submitted": False}
+            for student_id in batch
+        ]
+        await async_supabase.table("student_assignments").insert(rows, returning="minimal").execute()
+        await notify_students(batch, message, assignment_id)
+
+
 @router.post("/assignments", response_model=AssignmentResponse, dependencies=[Depends(require_role(["teacher"]))])
-async def create_assignment(assignment: AssignmentCreate, current_user: dict = Depends(require_role(["teacher"]))):
+async def create_assignment(assignment: AssignmentCreate, background_tasks: BackgroundTasks, current_user: dict = Depends(require_role(["teacher"]))):
     assignment_data = {
         "title": assignment.title,
         "description": assignment.description,
@@ -19,7 +36,7 @@ async def create_assignment(assignment: AssignmentCreate, current_user: dict = D
         "created_by": str(current_user["id"])
     }
     
-    response = supabase.table("assignments").insert(assignment_data).execute()
+    response = await async_supabase.table("assignments").insert(assignment_data).execute()
     
     if not response.data:
         raise HTTPException(status_code=500, detail="Failed to create assignment")
@@ -27,31 +44,29 @@ async def create_assignment(assignment: AssignmentCreate, current_user: dict = D
     created_assignment = response.data[0]
     
     # Create student assignment records for all students
-    students_response = supabase.table("users").select("id").eq("role", "student").execute()
-    
-    if students_response.data:
-        student_assignments = [
-            {
-                "assignment_id": created_assignment["id"],
-                "student_id": str(student["id"]),
-                "submitted": False
-            }
-            for student in students_response.data
-        ]
-        supabase.table("student_assignments").insert(student_assignments).execute()
+    students_response = await async_supabase.table("users").select("id").eq("role", "student").execute()
+    
+    student_ids = [str(student["id"]) for student in students_response.data]
+    message = f"New assignment '{assignment.title}' is due on {assignment.due_date.isoformat()}"
+    
+    # Large cohorts are fanned out after the response has been sent
+    if len(student_ids) > settings.ASSIGNMENT_FANOUT_BACKGROUND_THRESHOLD:
+        background_tasks.add_task(create_student_assignments, created_assignment["id"], student_ids, message)
+    elif student_ids:
+        await create_student_assignments(created_assignment["id"], student_ids, message)
     
     return created_assignment
 
 
 @router.get("/assignments", response_model=List[AssignmentResponse], dependencies=[Depends(require_role(["teacher"]))])
 async def get_assignments(current_user: dict = Depends(require_role(["teacher"]))):
-    response = supabase.table("assignments").select("*").eq("created_by", str(current_user["id"])).execute()
-    return response.data
+    response = await async_supabase.table("assignments").select("*").eq("created_by", str(current_user["id"])).execute()
+    return render_rows(response.data, AssignmentResponse)
 
 
 @router.get("/assignments/{assignment_id}", response_model=AssignmentResponse, dependencies=[Depends(require_role(["teacher"]))])
 async def get_assignment(assignment_id: UUID, current_user: dict = Depends(require_role(["teacher"]))):
-    response = supabase.table("assignments").select("*").eq("id", str(assignment_id)).eq("created_by", str(current_user["id"])).execute()
+    response = await async_supabase.table("assignments").select("*").eq("id", str(assignment_id)).eq("created_by", str(current_user["id"])).execute()
     
     if not response.data:
         raise HTTPException(status_code=404, detail="Assignment not found")
@@ -71,7 +86,7 @@ async def update_assignment(assignment_id: UUID, assignment: AssignmentUpdate, c
     if assignment.meet_link is not None:
         update_data["meet_link"] = assignment.meet_link
     
-    response = supabase.table("assignments").update(update_data).eq("id", str(assignment_id)).eq("created_by", str(current_user["id"])).execute()
+    response = await async_supabase.table("assignments").update(update_data).eq("id", str(assignment_id)).eq("created_by", str(current_user["id"])).execute()
     
     if not response.data:
         raise HTTPException(status_code=404, detail="Assignment not found")
@@ -81,7 +96,7 @@ async def update_assignment(assignment_id: UUID, assignment: AssignmentUpdate, c
 
 @router.delete("/assignments/{assignment_id}", dependencies=[Depends(require_role(["teacher"]))])
 async def delete_assignment(assignment_id: UUID, current_user: dict = Depends(require_role(["teacher"]))):
-    response = supabase.table("assignments").delete().eq("id", str(assignment_id)).eq("created_by", str(current_user["id"])).execute()
+    response = await async_supabase.table("assignments").delete().eq("id", str(assignment_id)).eq("created_by", str(current_user["id"])).execute()
     
     if not response.data:
         raise HTTPException(status_code=404, detail="Assignment not found")
@@ -98,15 +113,9 @@ async def record_attendance(attendance: AttendanceCreate, current_user: dict = D
         "total_days": attendance.total_days
     }
     
-    # Check if record exists
-    existing = supabase.table("attendance").select("*").eq("student_id", str(attendance.student_id)).eq("subject", attendance.subject).execute()
-    
-    if existing.data:
-        # Update existing record
-        response = supabase.table("attendance").update(attendance_data).eq("student_id", str(attendance.student_id)).eq("subject", attendance.subject).execute()
-    else:
-        # Create new record
-        response = supabase.table("attendance").insert(attendance_data).execute()
+    # One record per student and subject: insert it, or update the existing one
+    response = await async_supabase.table("attendance").upsert(attendance_data, on_conflict="student_id,subject").execute()
+    await notify_students([attendance_data["student_id"]], f"Your attendance for {attendance.subject} was updated")
     
     return {"message": "Attendance recorded successfully", "data": response.data[0]}
 
@@ -120,14 +129,24 @@ async def record_marks(marks: MarksCreate, current_user: dict = Depends(require_
         "total_marks": marks.total_marks
     }
     
-    # Check if record exists
-    existing = supabase.table("marks").select("*").eq("student_id", str(marks.student_id)).eq("subject", marks.subject).execute()
-    
-    if existing.data:
-        # Update existing record
-        response = supabase.table("marks").update(marks_data).eq("student_id", str(marks.student_id)).eq("subject", marks.subject).execute()
-    else:
-        # Create new record
-        response = supabase.table("marks").insert(marks_data).execute()
+    # One record per student and subject: insert it, or update the existing one
+    response = await async_supabase.table("marks").upsert(marks_data, on_conflict="student_id,subject").execute()
+    await notify_students([marks_data["student_id"]], f"Your marks for {marks.subject} were updated")
     
     return {"message": "Marks recorded successfully", "data": response.data[0]}
+
+
+@router.post("/attendance/bulk", response_model=BulkUploadResult, dependencies=[Depends(require_role(["teacher"]))])
+async def bulk_record_attendance(request: Request, current_user: dict = Depends(require_role(["teacher"]))):
+    # CSV (text/csv, with a header row) or NDJSON (application/x-ndjson) body of AttendanceCreate rows
+    report, student_ids = await bulk_upsert(request, "attendance", AttendanceCreate, ("student_id", "subject"))
+    await notify_students(student_ids, "Your attendance was updated")
+    return report
+
+
+@router.post("/marks/bulk", response_model=BulkUploadResult, dependencies=[Depends(require_role(["teacher"]))])
+async def bulk_record_marks(request: Request, current_user: dict = Depends(require_role(["teacher"]))):
+    # CSV (text/csv, with a header row) or NDJSON (application/x-ndjson) body of MarksCreate rows
+    report, student_ids = await bulk_upsert(request, "marks", MarksCreate, ("student_id", "subject"))
+    await notify_students(student_ids, "Your marks were updated")
+    return report
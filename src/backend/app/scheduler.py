@@ -1,72 +1,313 @@
+"""
+Background jobs (the daily assignment reminders).
+
+Every API worker process may start the scheduler, but a job only runs in the
+process holding the leader lock (an advisory lock on SCHEDULER_LOCK_PATH, so
+it is released when that process exits and another one takes over at the
+next run). With SCHEDULER_MODE="off" the API runs no jobs and they are left
+to the separate worker, python -m app.worker.
+
+Jobs run on the scheduler's own bounded thread pool, never on request
+threads. A run that passes SCHEDULER_JOB_TIMEOUT_SECONDS stops at its next
+check_deadline() call; job_metrics() reports runs, outcomes and durations.
+"""
+from apscheduler.events import EVENT_JOB_MAX_INSTANCES, EVENT_JOB_MISSED
+from apscheduler.executors.pool import ThreadPoolExecutor
 from apscheduler.schedulers.background import BackgroundScheduler
-from apscheduler.triggers.interval import IntervalTrigger
+from apscheduler.triggers.cron import CronTrigger
 from datetime import datetime, timedelta
+from app.config import settings
 from app.database import supabase
+from app.dataloader import load_grouped
+from app.metrics import COLLECTORS, exposition
 import logging
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-scheduler = BackgroundScheduler()
+scheduler = BackgroundScheduler(
+    executors={"default": ThreadPoolExecutor(max(settings.SCHEDULER_WORKERS, 1))},
+    job_defaults={
+        # A run that is late (busy process, restart around 9 AM) still happens once, not once per missed slot
+        "coalesce": True,
+        "max_instances": 1,
+        "misfire_grace_time": settings.SCHEDULER_MISFIRE_GRACE_SECONDS,
+    },
+    timezone=settings.SCHEDULER_TIMEZONE or None,
+)
+
+
+class JobTimeout(Exception):
+    pass
+
+
+class LeaderLock:
+    """Non-blocking advisory lock on a file, held by at most one process on the host until it releases it or exits"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+        self._lock = threading.Lock()
+
+    @property
+    def held(self) -> bool:
+        return self._file is not None
+
+    def acquire(self) -> bool:
+        with self._lock:
+            if self._file is not None:
+                return True
+            lock_file = open(self.path, "a+")
+            try:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                else:
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+            except OSError:
+                lock_file.close()
+                return False
+            lock_file.seek(0)
+            lock_file.truncate()
+            lock_file.write(f"{os.getpid()}\n")
+            lock_file.flush()
+            self._file = lock_file
+            logger.info(f"Scheduler leadership acquired by process {os.getpid()}")
+            return True
+
+    def release(self):
+        with self._lock:
+            lock_file, self._file = self._file, None
+        if lock_file is not None:
+            # Closing the file drops the lock
+            lock_file.close()
+
+
+leader = LeaderLock(settings.SCHEDULER_LOCK_PATH)
+
+_metrics = {}
+_metrics_lock = threading.Lock()
+_current = threading.local()
+
+
+COUNTERS = ("runs", "succeeded", "failed", "timed_out", "skipped_not_leader", "missed", "overlapping")
+
+
+def _record(job_id: str, **values):
+    """Add to a job's counters and set its other metrics"""
+    with _metrics_lock:
+        metrics = _metrics.get(job_id)
+        if metrics is None:
+            metrics = _metrics[job_id] = dict.fromkeys(COUNTERS, 0)
+            metrics.update(last_started_at=None, last_duration_ms=None, last_error=None, last_result=None)
+        for name, value in values.items():
+            metrics[name] = metrics[name] + value if name in COUNTERS else value
+
+
+def job_metrics() -> dict:
+    """Counters and last run of every job, plus whether this process is the leader"""
+    with _metrics_lock:
+        jobs = {job_id: dict(metrics) for job_id, metrics in _metrics.items()}
+    if scheduler.running:
+        for job in scheduler.get_jobs():
+            next_run = job.next_run_time.isoformat() if job.next_run_time else None
+            jobs.setdefault(job.id, {})["next_run_at"] = next_run
+    return {"leader": leader.held, "running": scheduler.running, "jobs": jobs}
+
+
+def check_deadline():
+    """Raise JobTimeout if the job running in this thread is past its timeout (no-op outside jobs)"""
+    deadline = getattr(_current, "deadline", None)
+    if deadline is not None and time.monotonic() > deadline:
+        raise JobTimeout(f"job {_current.job_id} exceeded {settings.SCHEDULER_JOB_TIMEOUT_SECONDS}s")
+
+
+def run_job(job_id: str, func):
+    """Run one job if this process is the leader, recording its outcome"""
+    if not leader.acquire():
+        _record(job_id, skipped_not_leader=1)
+        return None
+    _current.job_id = job_id
+    _current.deadline = time.monotonic() + settings.SCHEDULER_JOB_TIMEOUT_SECONDS
+    started = time.perf_counter()
+    _record(job_id, runs=1, last_started_at=datetime.now().isoformat())
+    try:
+        result = func()
+    except JobTimeout as e:
+        logger.error(str(e))
+        _record(job_id, timed_out=1, last_error=str(e))
+        return None
+    except Exception as e:
+        logger.exception(f"Job {job_id} failed")
+        _record(job_id, failed=1, last_error=str(e))
+        return None
+    finally:
+        _current.deadline = None
+        _record(job_id, last_duration_ms=round((time.perf_counter() - started) * 1000, 1))
+    if isinstance(result, dict) and result.get("error"):
+        # check_assignment_reminders() reports its errors instead of raising
+        _record(job_id, failed=1, last_error=result["error"], last_result=result)
+    else:
+        _record(job_id, succeeded=1, last_error=None, last_result=result)
+    return result
+
+
+def _on_job_event(event):
+    if event.code == EVENT_JOB_MISSED:
+        logger.warning(f"Job {event.job_id} missed its run at {event.scheduled_run_time}")
+        _record(event.job_id, missed=1)
+    else:
+        logger.warning(f"Job {event.job_id} is still running, skipped the run at {event.scheduled_run_time}")
+        _record(event.job_id, overlapping=1)
+
+
+scheduler.add_listener(_on_job_event, EVENT_JOB_MISSED | EVENT_JOB_MAX_INSTANCES)
+
+
+def _exposition() -> list:
+    state = job_metrics()
+    jobs = [(job_id, metrics) for job_id, metrics in state["jobs"].items() if "runs" in metrics]
+    return (
+        exposition("scheduler_leader", "gauge", "1 if this process holds the scheduler leader lock",
+                   [({}, int(state["leader"]))])
+        + exposition("scheduler_job_events_total", "counter", "Job runs and their outcomes",
+                     [({"job": job_id, "event": name}, metrics[name]) for job_id, metrics in jobs for name in COUNTERS])
+        + exposition("scheduler_job_last_duration_seconds", "gauge", "Duration of the job's last run",
+                     [({"job": job_id}, metrics["last_duration_ms"] / 1000) for job_id, metrics in jobs
+                      if metrics["last_duration_ms"] is not None])
+    )
+
+
+COLLECTORS.append(_exposition)
 
 
 def check_assignment_reminders():
-    """Check for assignments due in 2 days and send reminders to students"""
+    """Check for assignments due in 2 days and send reminders to students.
+
+    Runs as a set-based pipeline: one query for the due assignments, one
+    batched lookup for their pending students, one for the reminders that
+    already exist, then chunked bulk inserts. Returns per-stage timings and
+    row counts for the run.
+    """
+    stats = {"assignments": 0, "pending": 0, "already_notified": 0, "created": 0}
+    started = time.perf_counter()
+    stage_started = started
+
+    def finish_stage(name):
+        nonlocal stage_started
+        now = time.perf_counter()
+        stats[f"{name}_ms"] = round((now - stage_started) * 1000, 1)
+        stage_started = now
+
     try:
-        today = datetime.now().date()
         two_days_from_now = (datetime.now() + timedelta(days=2)).date()
         
         # Get assignments due in 2 days
-        assignments = supabase.table("assignments").select("*").eq("due_date", two_days_from_now.isoformat()).execute()
+        assignments = supabase.table("assignments").select("id, title").eq("due_date", two_days_from_now.isoformat()).execute()
+        finish_stage("fetch_assignments")
+        check_deadline()
         
         if not assignments.data:
             logger.info("No assignments due in 2 days")
-            return
+            return stats
+        
+        stats["assignments"] = len(assignments.data)
+        assignment_ids = [assignment["id"] for assignment in assignments.data]
         
-        logger.info(f"Found {len(assignments.data)} assignments due in 2 days")
+        # Get students who haven't submitted, for every due assignment at once
+        pending = load_grouped(
+            supabase, "student_assignments", "assignment_id", assignment_ids,
+            columns="student_id", filters={"submitted": False}
+        )
+        finish_stage("fetch_pending")
+        check_deadline()
         
+        # Skip students already reminded about an assignment (e.g. after a restart); other
+        # notifications about the assignment, such as its announcement, do not count
+        existing = load_grouped(supabase, "notifications", "assignment_id", assignment_ids, columns="student_id,message")
+        notified = {(assignment_id, row["student_id"], row["message"]) for assignment_id, rows in existing.items() for row in rows}
+        finish_stage("dedupe")
+        
+        notifications = []
+        created_at = datetime.now().isoformat()
         for assignment in assignments.data:
-            # Get students who haven't submitted
-            student_assignments = supabase.table("student_assignments").select("student_id").eq("assignment_id", assignment["id"]).eq("submitted", False).execute()
-            
-            if student_assignments.data:
-                logger.info(f"Assignment '{assignment['title']}' has {len(student_assignments.data)} pending submissions")
-                
-                # Here you would typically send notifications
-                # This could be push notifications, emails, or in-app notifications
-                # For now, we'll just log the reminders
-                for sa in student_assignments.data:
-                    logger.info(f"Reminder: Student {sa['student_id']} - Assignment '{assignment['title']}' due in 2 days")
-                    
-                    # Create a notification record
-                    notification_data = {
-                        "student_id": sa["student_id"],
-                        "assignment_id": assignment["id"],
-                        "message": f"Assignment '{assignment['title']}' is due in 2 days!",
-                        "created_at": datetime.now().isoformat()
-                    }
-                    supabase.table("notifications").insert(notification_data).execute()
+            message = f"Assignment '{assignment['title']}' is due in 2 days!"
+            for sa in pending.get(assignment["id"], []):
+                stats["pending"] += 1
+                if (assignment["id"], sa["student_id"], message) in notified:
+                    stats["already_notified"] += 1
+                    continue
+                notifications.append({
+                    "student_id": sa["student_id"],
+                    "assignment_id": assignment["id"],
+                    "message": message,
+                    "read": False,
+                    "created_at": created_at
+                })
+        
+        batch_size = max(settings.REMINDER_INSERT_BATCH_SIZE, 1)
+        for start in range(0, len(notifications), batch_size):
+            check_deadline()
+            supabase.table("notifications").insert(notifications[start:start + batch_size], returning="minimal").execute()
+            stats["created"] += len(notifications[start:start + batch_size])
+        finish_stage("insert")
                     
+    except JobTimeout:
+        logger.info(f"Assignment reminders stopped early: {stats}")
+        raise
     except Exception as e:
         logger.error(f"Error checking assignment reminders: {str(e)}")
+        stats["error"] = str(e)
+    
+    stats["total_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    logger.info(f"Assignment reminders: {stats}")
+    return stats
+
+
+REMINDER_JOB_ID = "assignment_reminder_job"
 
 
-def start_scheduler():
-    """Start the background scheduler"""
-    # Run the reminder check every day at 9 AM
+def start_scheduler(mode: str = None):
+    """Start the background scheduler unless mode (default SCHEDULER_MODE) is off"""
+    mode = mode or settings.SCHEDULER_MODE
+    if mode == "off":
+        logger.info("Scheduler disabled in this process (SCHEDULER_MODE=off)")
+        return
+    if mode != "leader":
+        raise ValueError(f"Unknown SCHEDULER_MODE {mode!r}, expected 'leader' or 'off'")
+    # Run the reminder check every day at 9 AM (REMINDER_HOUR:REMINDER_MINUTE, scheduler timezone)
     scheduler.add_job(
-        check_assignment_reminders,
-        trigger=IntervalTrigger(hours=24),
-        id="assignment_reminder_job",
+        run_job,
+        # A trigger built without a timezone would use the host's, whatever SCHEDULER_TIMEZONE says
+        trigger=CronTrigger(hour=settings.REMINDER_HOUR, minute=settings.REMINDER_MINUTE,
+                            timezone=scheduler.timezone),
+        args=[REMINDER_JOB_ID, check_assignment_reminders],
+        id=REMINDER_JOB_ID,
         name="Check assignment reminders",
         replace_existing=True
     )
     
     scheduler.start()
-    logger.info("Scheduler started successfully")
+    logger.info(f"Scheduler started, next reminder check at {scheduler.get_job(REMINDER_JOB_ID).next_run_time}")
+
+
+def run_jobs_now() -> dict:
+    """Run every job once, right away (still only in the leader)"""
+    return {REMINDER_JOB_ID: run_job(REMINDER_JOB_ID, check_assignment_reminders)}
 
 
 def shutdown_scheduler():
-    """Shutdown the scheduler"""
-    scheduler.shutdown()
-    logger.info("Scheduler shut down")
+    """Shutdown the scheduler and hand leadership to another process"""
+    if scheduler.running:
+        scheduler.shutdown()
+        logger.info("Scheduler shut down")
+    leader.release()
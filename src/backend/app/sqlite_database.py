@@ -0,0 +1,632 @@
+"""
+SQLite backend: the mock database's query chain over a database file that
+every worker process can share.
+
+The tables and indexes are those of docs/database/schema.sql, translated to
+SQLite below (the backend image does not ship the docs). Each thread keeps
+its own connection, so sqlite3's prepared-statement cache is reused without
+locking; the file runs in WAL mode, so readers never wait for a writer.
+Writes inside one process queue on a lock before BEGIN IMMEDIATE, leaving
+busy_timeout to arbitrate between processes only.
+"""
+import json
+import threading
+import time
+import weakref
+from datetime import date, datetime
+from functools import partial
+from uuid import UUID, uuid4
+
+import sqlite3
+from postgrest.exceptions import APIError
+
+from app.config import settings
+from app.metrics import describe_query, record_query
+from app.table_events import notify
+from app.table_versions import SCOPE_COLUMNS
+
+# docs/database/schema.sql for SQLite: UUIDs, dates and timestamps are ISO
+# strings in TEXT columns (as in the mock), BOOLEAN columns hold 0/1 and are
+# returned as bools, ids and created_at are filled in by insert().
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id TEXT PRIMARY KEY NOT NULL,
+    email TEXT UNIQUE NOT NULL,
+    password TEXT NOT NULL,
+    role TEXT NOT NULL CHECK (role IN ('admin', 'class_teacher', 'teacher', 'student')),
+    name TEXT NOT NULL,
+    department TEXT,
+    created_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS resources (
+    id TEXT PRIMARY KEY NOT NULL,
+    title TEXT NOT NULL,
+    resource_type TEXT NOT NULL CHECK (resource_type IN ('pdf', 'video')),
+    link TEXT NOT NULL,
+    uploaded_by TEXT REFERENCES users(id) ON DELETE CASCADE,
+    created_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS assignments (
+    id TEXT PRIMARY KEY NOT NULL,
+    title TEXT NOT NULL,
+    description TEXT NOT NULL,
+    due_date TEXT NOT NULL,
+    meet_link TEXT,
+    created_by TEXT REFERENCES users(id) ON DELETE CASCADE,
+    created_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS student_assignments (
+    id TEXT PRIMARY KEY NOT NULL,
+    assignment_id TEXT REFERENCES assignments(id) ON DELETE CASCADE,
+    student_id TEXT REFERENCES users(id) ON DELETE CASCADE,
+    submitted BOOLEAN DEFAULT FALSE,
+    submitted_date TEXT,
+    UNIQUE(assignment_id, student_id)
+);
+
+CREATE TABLE IF NOT EXISTS attendance (
+    id TEXT PRIMARY KEY NOT NULL,
+    student_id TEXT REFERENCES users(id) ON DELETE CASCADE,
+    subject TEXT NOT NULL,
+    present_days INTEGER NOT NULL DEFAULT 0,
+    total_days INTEGER NOT NULL DEFAULT 0,
+    UNIQUE(student_id, subject)
+);
+
+CREATE TABLE IF NOT EXISTS marks (
+    id TEXT PRIMARY KEY NOT NULL,
+    student_id TEXT REFERENCES users(id) ON DELETE CASCADE,
+    subject TEXT NOT NULL,
+    marks_obtained INTEGER NOT NULL,
+    total_marks INTEGER NOT NULL,
+    UNIQUE(student_id, subject)
+);
+
+CREATE TABLE IF NOT EXISTS class_access (
+    id TEXT PRIMARY KEY NOT NULL,
+    class_teacher_id TEXT REFERENCES users(id) ON DELETE CASCADE,
+    class_name TEXT NOT NULL,
+    granted_by TEXT REFERENCES users(id) ON DELETE CASCADE,
+    created_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS teacher_assignments (
+    id TEXT PRIMARY KEY NOT NULL,
+    teacher_id TEXT REFERENCES users(id) ON DELETE CASCADE,
+    subject TEXT NOT NULL,
+    assigned_by TEXT REFERENCES users(id) ON DELETE CASCADE,
+    created_at TEXT,
+    UNIQUE(teacher_id, subject)
+);
+
+CREATE TABLE IF NOT EXISTS notifications (
+    id TEXT PRIMARY KEY NOT NULL,
+    student_id TEXT REFERENCES users(id) ON DELETE CASCADE,
+    assignment_id TEXT REFERENCES assignments(id) ON DELETE CASCADE,
+    message TEXT NOT NULL,
+    read BOOLEAN DEFAULT FALSE,
+    created_at TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_users_role ON users(role);
+CREATE INDEX IF NOT EXISTS idx_resources_uploaded_by ON resources(uploaded_by);
+CREATE INDEX IF NOT EXISTS idx_assignments_created_by ON assignments(created_by);
+CREATE INDEX IF NOT EXISTS idx_assignments_due_date ON assignments(due_date);
+CREATE INDEX IF NOT EXISTS idx_student_assignments_student_id ON student_assignments(student_id);
+CREATE INDEX IF NOT EXISTS idx_student_assignments_assignment_id ON student_assignments(assignment_id);
+CREATE INDEX IF NOT EXISTS idx_attendance_student_id ON attendance(student_id);
+CREATE INDEX IF NOT EXISTS idx_marks_student_id ON marks(student_id);
+CREATE INDEX IF NOT EXISTS idx_notifications_student_id ON notifications(student_id);
+CREATE INDEX IF NOT EXISTS idx_notifications_read ON notifications(read);
+
+-- Not in schema.sql: the keyset pages of app/pagination.py, the reminder job's
+-- dedupe lookup, and the cascades from deleted users/assignments
+CREATE INDEX IF NOT EXISTS idx_resources_created_at ON resources(created_at, id);
+CREATE INDEX IF NOT EXISTS idx_notifications_student_created_at ON notifications(student_id, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_notifications_assignment_id ON notifications(assignment_id);
+CREATE INDEX IF NOT EXISTS idx_class_access_class_teacher_id ON class_access(class_teacher_id);
+CREATE INDEX IF NOT EXISTS idx_class_access_granted_by ON class_access(granted_by);
+CREATE INDEX IF NOT EXISTS idx_teacher_assignments_assigned_by ON teacher_assignments(assigned_by);
+
+-- Not in schema.sql: write counters for app.table_versions, bumped by the
+-- triggers of VERSION_TRIGGER inside each write's transaction, so every process
+-- sees every write (cascades included). owner '' counts the whole table, the
+-- ('', '') row holds a random epoch that changes when the file is recreated.
+CREATE TABLE IF NOT EXISTS table_versions (
+    table_name TEXT NOT NULL,
+    owner TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    PRIMARY KEY (table_name, owner)
+) WITHOUT ROWID;
+INSERT OR IGNORE INTO table_versions VALUES ('', '', abs(random()));
+"""
+
+VERSION_TRIGGER = """
+CREATE TRIGGER IF NOT EXISTS "{table}_version_{event}" AFTER {event} ON "{table}" BEGIN
+{bumps}
+END;
+"""
+VERSION_BUMP = """    INSERT INTO table_versions SELECT '{table}', {owner}, 1 WHERE {owner} IS NOT NULL
+        ON CONFLICT (table_name, owner) DO UPDATE SET version = version + 1;"""
+
+
+def version_triggers(table_names) -> str:
+    """Triggers counting writes to each table, and per owning student in SCOPE_COLUMNS tables"""
+    script = []
+    for table_name in table_names:
+        column = SCOPE_COLUMNS.get(table_name)
+        for event, rows in (("INSERT", ("NEW",)), ("UPDATE", ("OLD", "NEW")), ("DELETE", ("OLD",))):
+            owners = ["''"] + ([f'{row}."{column}"' for row in rows] if column else [])
+            bumps = "\n".join(VERSION_BUMP.format(table=table_name, owner=owner) for owner in owners)
+            script.append(VERSION_TRIGGER.format(table=table_name, event=event, bumps=bumps))
+    return "".join(script)
+
+DEMO_PASSWORD = "admin123"
+
+# Same accounts as the mock database, created once per database file
+DEMO_USERS = [
+    {"email": "admin@demo.com", "password": DEMO_PASSWORD, "role": "admin", "name": "Demo Admin",
+     "department": "Administration"},
+    {"email": "student@demo.com", "password": DEMO_PASSWORD, "role": "student", "name": "Demo Student",
+     "department": "Computer Science"},
+    {"email": "teacher@demo.com", "password": DEMO_PASSWORD, "role": "teacher", "name": "Demo Teacher",
+     "department": "Computer Science"},
+]
+
+SYNCHRONOUS_MODES = {"OFF", "NORMAL", "FULL", "EXTRA"}
+
+OPERATORS = {"eq": "=", "neq": "<>", "gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+
+
+def _param(value):
+    """A filter or column value as sqlite3 takes it"""
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def _error(table_name: str, error: sqlite3.Error) -> Exception:
+    """The PostgREST error matching a SQLite constraint failure"""
+    message = str(error)
+    if message.startswith("UNIQUE constraint failed"):
+        columns = tuple(column.split(".", 1)[-1] for column in message.split(": ", 1)[1].split(", "))
+        constraint = f"{table_name}_pkey" if columns == ("id",) else f"{table_name}_{'_'.join(columns)}_key"
+        return APIError({"code": "23505", "message": f'duplicate key value violates unique constraint "{constraint}"',
+                         "details": f"Key ({', '.join(columns)}) already exists."})
+    if message.startswith("FOREIGN KEY constraint failed"):
+        return APIError({"code": "23503", "message": f'insert or update on table "{table_name}" violates foreign key constraint'})
+    if message.startswith("NOT NULL constraint failed"):
+        column = message.rsplit(".", 1)[-1]
+        return APIError({"code": "23502", "message": f'null value in column "{column}" of relation "{table_name}" violates not-null constraint'})
+    if message.startswith("CHECK constraint failed"):
+        return APIError({"code": "23514", "message": f'new row for relation "{table_name}" violates check constraint',
+                         "details": message})
+    if "does not match any PRIMARY KEY or UNIQUE constraint" in message:
+        return APIError({"code": "42P10",
+                         "message": "there is no unique or exclusion constraint matching the ON CONFLICT specification"})
+    return error
+
+
+def _explain(connection, describe, sql: str, params: list) -> str:
+    """describe() plus SQLite's plan for sql (SCAN: full table scan, SEARCH: index lookup)"""
+    shape = describe()
+    try:
+        plan = [row[3] for row in connection.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+    except sqlite3.Error:
+        return shape
+    return f"{shape} [{'; '.join(plan)}]"
+
+
+class TableInfo:
+    """Column names, defaults and boolean columns of one table, read back from SQLite"""
+
+    def __init__(self, name: str, pragma_rows: list, connection):
+        self.name = name
+        self.columns = [row[1] for row in pragma_rows]
+        self.booleans = {row[1] for row in pragma_rows if row[2].upper() == "BOOLEAN"}
+        self.not_null = {row[1] for row in pragma_rows if row[3]}
+        # Column defaults are literals in SCHEMA, so SQLite can evaluate them once here
+        self.defaults = {}
+        for row in pragma_rows:
+            value = None if row[4] is None else connection.execute(f"SELECT {row[4]}").fetchone()[0]
+            self.defaults[row[1]] = bool(value) if row[1] in self.booleans and value is not None else value
+        self.has_created_at = "created_at" in self.columns
+
+    def column(self, name: str) -> str:
+        """name as a quoted identifier; unknown columns are refused, so names never reach SQL unchecked"""
+        if name not in self.defaults:
+            raise APIError({"code": "42703", "message": f"column {self.name}.{name} does not exist"})
+        return f'"{name}"'
+
+    def order(self, name: str, desc: bool) -> str:
+        if name in self.not_null:
+            return f"{self.column(name)} {'DESC' if desc else 'ASC'}"
+        # Postgres puts NULLs last in ascending order and first in descending order, SQLite the
+        # other way round; NOT NULL columns skip the clause, which would stop indexes giving the order
+        return f"{self.column(name)} {'DESC NULLS FIRST' if desc else 'ASC NULLS LAST'}"
+
+    def rows(self, cursor) -> list[dict]:
+        names = [description[0] for description in cursor.description]
+        rows = [dict(zip(names, values)) for values in cursor.fetchall()]
+        booleans = [name for name in names if name in self.booleans]
+        for row in rows if booleans else ():
+            for name in booleans:
+                if row[name] is not None:
+                    row[name] = bool(row[name])
+        return rows
+
+
+class SqliteResponse:
+    def __init__(self, data):
+        self.data = data
+
+
+class SqliteTable:
+    """Query builder with MockTable's interface; execute() compiles it to one parameterized statement"""
+
+    def __init__(self, database: "SqliteDatabase", table_name: str):
+        self.database = database
+        self.table_name = table_name
+        self._reset()
+
+    def _reset(self):
+        self.operation = None
+        self.payload = None
+        self.returning = "representation"
+        self.on_conflict = ("id",)
+        self.ignore_duplicates = False
+        self.columns = None
+        self.query_filters = []
+        self.row_offset = 0
+        self.row_limit = None
+        self.ordering = []
+
+    def select(self, columns="*"):
+        self.operation = "select"
+        names = [name.strip() for name in columns.split(",") if name.strip()]
+        self.columns = None if "*" in names else names
+        return self
+
+    def insert(self, data, returning="representation"):
+        self.operation = "insert"
+        self.payload = data if isinstance(data, list) else [data]
+        self.returning = returning
+        return self
+
+    def upsert(self, data, returning="representation", ignore_duplicates=False, on_conflict=""):
+        self.operation = "upsert"
+        self.payload = data if isinstance(data, list) else [data]
+        self.returning = returning
+        self.ignore_duplicates = ignore_duplicates
+        if isinstance(on_conflict, str):
+            on_conflict = on_conflict.split(",")
+        self.on_conflict = tuple(column.strip() for column in on_conflict if column.strip()) or ("id",)
+        return self
+
+    def update(self, data):
+        self.operation = "update"
+        self.payload = data
+        return self
+
+    def delete(self):
+        self.operation = "delete"
+        return self
+
+    def eq(self, column, value):
+        self.query_filters.append(("eq", column, value))
+        return self
+
+    def in_(self, column, values):
+        self.query_filters.append(("in", column, list(values)))
+        return self
+
+    def gte(self, column, value):
+        self.query_filters.append(("gte", column, value))
+        return self
+
+    def lte(self, column, value):
+        self.query_filters.append(("lte", column, value))
+        return self
+
+    def neq(self, column, value):
+        self.query_filters.append(("neq", column, value))
+        return self
+
+    def gt(self, column, value):
+        self.query_filters.append(("gt", column, value))
+        return self
+
+    def lt(self, column, value):
+        self.query_filters.append(("lt", column, value))
+        return self
+
+    def order(self, column, desc=False):
+        self.ordering.append((column, desc))
+        return self
+
+    def limit(self, size):
+        self.row_limit = size
+        return self
+
+    def range(self, start, end):
+        # Both bounds are inclusive, as in supabase-py
+        self.row_offset = start
+        self.row_limit = max(end - start + 1, 0)
+        return self
+
+    def _where(self, info: TableInfo):
+        clauses = []
+        params = []
+        for op, column, value in self.query_filters:
+            if op == "in":
+                # One statement (and one cached plan) whatever the number of values
+                clauses.append(f"{info.column(column)} IN (SELECT value FROM json_each(?))")
+                params.append(json.dumps([_param(item) for item in value]))
+            else:
+                clauses.append(f"{info.column(column)} {OPERATORS[op]} ?")
+                params.append(_param(value))
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def _select(self, connection, info: TableInfo):
+        sql, params = self._select_statement(info)
+        return info.rows(connection.execute(sql, params))
+
+    def _select_statement(self, info: TableInfo):
+        columns = "*" if self.columns is None else ", ".join(info.column(column) for column in self.columns)
+        where, params = self._where(info)
+        sql = f'SELECT {columns} FROM "{info.name}"{where}'
+        if self.ordering:
+            sql += " ORDER BY " + ", ".join(info.order(column, desc) for column, desc in self.ordering)
+        if self.row_limit is not None or self.row_offset:
+            sql += " LIMIT ? OFFSET ?"
+            params += [-1 if self.row_limit is None else self.row_limit, self.row_offset]
+        return sql, params
+
+    def _prepare(self, info: TableInfo, records) -> list[dict]:
+        """Copies of records with ids and one shared created_at filled in, as MockStore.insert() does"""
+        rows = [dict(record) for record in records]
+        missing_ids = [row for row in rows if row.get("id") is None]
+        for row in missing_ids:
+            row["id"] = str(uuid4())
+        if info.has_created_at:
+            created_at = datetime.now().isoformat()
+            for row in rows:
+                if row.get("created_at") is None:
+                    row["created_at"] = created_at
+        return rows
+
+    @staticmethod
+    def _by_columns(rows: list[dict]) -> dict:
+        # executemany() needs one column list per statement
+        groups = {}
+        for row in rows:
+            groups.setdefault(tuple(row), []).append(row)
+        return groups
+
+    def _insert(self, connection, info: TableInfo) -> list[dict]:
+        rows = self._prepare(info, self.payload)
+        for columns, group in self._by_columns(rows).items():
+            names = ", ".join(info.column(column) for column in columns)
+            sql = f'INSERT INTO "{info.name}" ({names}) VALUES ({", ".join("?" * len(columns))})'
+            connection.executemany(sql, ([_param(row[column]) for column in columns] for row in group))
+        # The triggers only count writes, so the stored rows are the payload plus the column defaults
+        return [dict(info.defaults, **row) for row in rows]
+
+    def _upsert(self, connection, info: TableInfo) -> list[dict]:
+        conflict = ", ".join(info.column(column) for column in self.on_conflict)
+        records = []
+        seen = set()
+        for record in self.payload:
+            key = tuple(record.get(column) for column in self.on_conflict)
+            if None not in key and key in seen:
+                if self.ignore_duplicates:
+                    continue
+                raise APIError({
+                    "code": "21000",
+                    "message": "ON CONFLICT DO UPDATE command cannot affect row a second time",
+                    "hint": "Ensure that no rows proposed for insertion within the same command have duplicate constrained values.",
+                })
+            seen.add(key)
+            records.append(record)
+        result = []
+        # Only the columns sent are updated on a conflict, not the generated id/created_at
+        prepared = zip(records, self._prepare(info, records))
+        groups = {}
+        for record, row in prepared:
+            groups.setdefault((tuple(row), tuple(record)), []).append(row)
+        for (columns, sent), group in groups.items():
+            names = ", ".join(info.column(column) for column in columns)
+            updates = [column for column in sent if column not in self.on_conflict]
+            if self.ignore_duplicates or not updates:
+                action = "DO NOTHING"
+            else:
+                action = "DO UPDATE SET " + ", ".join(f"{info.column(column)} = excluded.{info.column(column)}"
+                                                      for column in updates)
+            sql = (f'INSERT INTO "{info.name}" ({names}) VALUES ({", ".join("?" * len(columns))}) '
+                   f"ON CONFLICT ({conflict}) {action} RETURNING *")
+            for row in group:
+                result += info.rows(connection.execute(sql, [_param(row[column]) for column in columns]))
+        return result
+
+    def _update(self, connection, info: TableInfo) -> list[dict]:
+        if not self.payload:
+            return self._select(connection, info)
+        assignments = ", ".join(f"{info.column(column)} = ?" for column in self.payload)
+        where, params = self._where(info)
+        sql = f'UPDATE "{info.name}" SET {assignments}{where} RETURNING *'
+        return info.rows(connection.execute(sql, [_param(value) for value in self.payload.values()] + params))
+
+    def _delete(self, connection, info: TableInfo) -> list[dict]:
+        where, params = self._where(info)
+        return info.rows(connection.execute(f'DELETE FROM "{info.name}"{where} RETURNING *', params))
+
+    def execute(self):
+        started = time.perf_counter()
+        operation = self.operation
+        info = self.database.table_info(self.table_name)
+        description = partial(describe_query, self.query_filters, self.ordering, self.row_limit)
+        try:
+            if operation == "select":
+                connection = self.database.connection()
+                sql, params = self._select_statement(info)
+                result = info.rows(connection.execute(sql, params))
+                description = partial(_explain, connection, description, sql, params)
+            elif operation in ("insert", "upsert", "update", "delete"):
+                result = self.database.write(getattr(self, f"_{operation}"), info)
+            else:
+                result = []
+        except (sqlite3.IntegrityError, sqlite3.OperationalError) as error:
+            mapped = _error(self.table_name, error)
+            if mapped is error:
+                raise
+            raise mapped from error
+        finally:
+            returning = self.returning
+            self._reset()
+        # SQLite does not report rows examined; the slow-query log shows the plan instead
+        record_query(self.table_name, operation, time.perf_counter() - started, len(result), None, description)
+        if operation != "select" and result:
+            notify(self.table_name, operation, result)
+        return SqliteResponse([] if returning == "minimal" else result)
+
+
+class _Connection:
+    """A thread's connection; held through a weak set so it closes with its thread"""
+
+    def __init__(self, connection: sqlite3.Connection, generation: int):
+        self.connection = connection
+        self.generation = generation
+
+
+class SqliteDatabase:
+    """Owns the database file, its schema and a connection per thread.
+
+    connect() creates the schema (idempotent, so every worker can run it) and
+    the demo users; close() closes every thread's connection, and threads
+    reopen one on their next query.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._tables = None
+        self._lock = threading.Lock()
+        self._connections_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._local = threading.local()
+        self._connections = weakref.WeakSet()
+        self._generation = 0
+
+    def _open(self) -> sqlite3.Connection:
+        synchronous = settings.SQLITE_SYNCHRONOUS.upper()
+        if synchronous not in SYNCHRONOUS_MODES:
+            raise ValueError(f"SQLITE_SYNCHRONOUS must be one of {sorted(SYNCHRONOUS_MODES)}")
+        # Autocommit: reads are single statements, writes open their own transaction
+        connection = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False,
+                                     cached_statements=settings.SQLITE_STATEMENT_CACHE_SIZE)
+        connection.execute(f"PRAGMA busy_timeout = {int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+        connection.execute(f"PRAGMA synchronous = {synchronous}")
+        connection.execute("PRAGMA foreign_keys = ON")
+        return connection
+
+    def connect(self) -> "SqliteDatabase":
+        if self._tables is None:
+            with self._lock:
+                if self._tables is None:
+                    connection = self._open()
+                    try:
+                        connection.execute("PRAGMA journal_mode = WAL")
+                        connection.executescript(SCHEMA)
+                        names = [row[0] for row in connection.execute(
+                            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")]
+                        connection.executescript(version_triggers(name for name in names if name != "table_versions"))
+                        self._tables = {name: TableInfo(name, connection.execute(f'PRAGMA table_info("{name}")').fetchall(),
+                                                        connection)
+                                        for name in names}
+                    finally:
+                        connection.close()
+                    self.table("users").upsert(DEMO_USERS, on_conflict="email", ignore_duplicates=True,
+                                               returning="minimal").execute()
+        return self
+
+    def connection(self) -> sqlite3.Connection:
+        """This thread's connection, opened on first use"""
+        holder = getattr(self._local, "holder", None)
+        if holder is None or holder.generation != self._generation:
+            holder = _Connection(self._open(), self._generation)
+            self._local.holder = holder
+            with self._connections_lock:
+                self._connections.add(holder)
+        return holder.connection
+
+    def table_info(self, table_name: str) -> TableInfo:
+        info = self.connect()._tables.get(table_name)
+        if info is None:
+            raise APIError({"code": "42P01", "message": f'relation "public.{table_name}" does not exist'})
+        return info
+
+    def table_versions(self, tables: list, owner=None) -> list[str]:
+        """The file's epoch, then the write count of each table (of owner's rows in scoped tables)"""
+        keys = [("", "")] + [(table_name, str(owner) if owner is not None and table_name in SCOPE_COLUMNS else "")
+                             for table_name in tables]
+        cursor = self.connect().connection().execute(
+            "SELECT table_name, owner, version FROM table_versions "
+            "WHERE table_name IN (SELECT value FROM json_each(?)) AND owner IN ('', ?)",
+            [json.dumps(["", *tables]), "" if owner is None else str(owner)])
+        versions = {(table_name, row_owner): version for table_name, row_owner, version in cursor}
+        return [str(versions.get(key, 0)) for key in keys]
+
+    def feed(self, table_name: str, cursor=None):
+        """(next cursor, rows inserted after cursor) for following a table's inserts from any process.
+
+        The cursor is the (rowid, id) of the last row seen; None starts from
+        the current last row. Rows are None when the cursor's row is gone,
+        since SQLite may then give its rowid to the next insert and rows can
+        have been missed.
+        """
+        info = self.table_info(table_name)
+        connection = self.connection()
+        if cursor is None:
+            last = connection.execute(f'SELECT rowid, id FROM "{info.name}" ORDER BY rowid DESC LIMIT 1').fetchone()
+            return (tuple(last) if last else (0, None)), []
+        rowid, row_id = cursor
+        rows = info.rows(connection.execute(f'SELECT rowid AS "_rowid", * FROM "{info.name}" WHERE rowid >= ? '
+                                            f"ORDER BY rowid", [rowid]))
+        if row_id is not None:
+            if not rows or rows[0]["_rowid"] != rowid or rows[0]["id"] != row_id:
+                return self.feed(table_name)[0], None
+            rows = rows[1:]
+        if not rows:
+            return cursor, []
+        cursor = (rows[-1]["_rowid"], rows[-1]["id"])
+        for row in rows:
+            del row["_rowid"]
+        return cursor, rows
+
+    def write(self, work, info: TableInfo):
+        """Run work(connection, info) in a write transaction, committed if it returns"""
+        connection = self.connection()
+        with self._write_lock:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                result = work(connection, info)
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+        return result
+
+    def table(self, table_name: str) -> SqliteTable:
+        return SqliteTable(self, table_name)
+
+    def close(self):
+        with self._connections_lock:
+            self._generation += 1
+            holders = list(self._connections)
+            self._connections = weakref.WeakSet()
+        for holder in holders:
+            holder.connection.close()
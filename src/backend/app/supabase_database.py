@@ -0,0 +1,165 @@
+"""
+Supabase backend: one client per worker process, sharing a keep-alive HTTP pool
+"""
+import threading
+import time
+from typing import Optional
+
+import httpx
+from postgrest import SyncPostgrestClient
+from postgrest.utils import SyncClient
+from supabase import Client
+from supabase.lib.client_options import ClientOptions
+
+from app.config import settings
+from app.metrics import record_query
+from app.table_events import notify
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class PooledPostgrestClient(SyncPostgrestClient):
+    """PostgREST client whose session uses the tuned connection pool"""
+
+    def __init__(self, base_url: str, *, headers: dict, schema: str, timeout, limits: httpx.Limits,
+                 http2: bool, transport: Optional[httpx.BaseTransport] = None):
+        self.limits = limits
+        self.http2 = http2
+        self.transport = transport
+        super().__init__(base_url, headers=headers, schema=schema, timeout=timeout)
+
+    def create_session(self, base_url: str, headers: dict, timeout) -> SyncClient:
+        return SyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=timeout,
+            limits=self.limits,
+            http2=self.http2,
+            transport=self.transport,
+        )
+
+
+class PooledSupabaseClient(Client):
+    """supabase-py client that builds its PostgREST client on the shared pool"""
+
+    def __init__(self, supabase_url: str, supabase_key: str, options: ClientOptions, limits: httpx.Limits,
+                 http2: bool, transport: Optional[httpx.BaseTransport] = None):
+        self.limits = limits
+        self.http2 = http2
+        self.transport = transport
+        super().__init__(supabase_url, supabase_key, options)
+
+    @property
+    def postgrest(self):
+        if self._postgrest is None:
+            self.options.headers.update(self._auth_token)
+            self._postgrest = PooledPostgrestClient(
+                self.rest_url,
+                headers=self.options.headers,
+                schema=self.options.schema,
+                timeout=self.options.postgrest_client_timeout,
+                limits=self.limits,
+                http2=self.http2,
+                transport=self.transport,
+            )
+        return self._postgrest
+
+
+class TableQuery:
+    """Passes a query chain through to supabase-py and reports writes to app.table_events.
+
+    Writes made with returning="minimal" come back without rows, so inserts
+    and upserts report the payload that was sent and updates/deletes report
+    an empty list (rows unknown).
+    """
+
+    WRITE_OPERATIONS = {"insert", "update", "delete", "upsert"}
+
+    def __init__(self, table_name: str, builder, operation: Optional[str] = None, payload=None,
+                 minimal: bool = False):
+        self._table_name = table_name
+        self._builder = builder
+        self._operation = operation
+        self._payload = payload
+        self._minimal = minimal
+
+    def __getattr__(self, name):
+        attribute = getattr(self._builder, name)
+        if not callable(attribute):
+            return attribute
+
+        def chained(*args, **kwargs):
+            result = attribute(*args, **kwargs)
+            if not hasattr(result, "execute"):
+                return result
+            if name in self.WRITE_OPERATIONS:
+                payload = args[0] if name in ("insert", "upsert") and args else None
+                minimal = str(kwargs.get("returning", "")).endswith("minimal")
+                return TableQuery(self._table_name, result, name, payload, minimal)
+            return TableQuery(self._table_name, result, self._operation, self._payload, self._minimal)
+
+        return chained
+
+    def execute(self):
+        started = time.perf_counter()
+        response = self._builder.execute()
+        # PostgREST does not report rows examined; the log shows which parameters were filtered on
+        params = getattr(self._builder, "params", None)
+        record_query(self._table_name, self._operation or "select", time.perf_counter() - started,
+                     len(response.data or []), None, " ".join(params.keys()) if params else "")
+        if self._operation and response.data:
+            notify(self._table_name, self._operation, response.data)
+        elif self._operation and self._minimal:
+            payload = self._payload or []
+            notify(self._table_name, self._operation, payload if isinstance(payload, list) else [payload])
+        return response
+
+
+class SupabaseDatabase:
+    """Owns the per-process Supabase client and its connection pool.
+
+    The client is built on first use (or by connect() at startup) and its
+    HTTP connections are reused by every request until close() is called.
+    Pass an httpx transport (e.g. httpx.MockTransport) to run against a fake
+    PostgREST in tests.
+    """
+
+    def __init__(self, url: str, key: str, transport: Optional[httpx.BaseTransport] = None):
+        self.url = url
+        self.key = key
+        self.transport = transport
+        self._client = None
+        self._lock = threading.Lock()
+
+    def connect(self) -> PooledSupabaseClient:
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    limits = httpx.Limits(
+                        max_connections=settings.SUPABASE_POOL_MAX_CONNECTIONS,
+                        max_keepalive_connections=settings.SUPABASE_POOL_MAX_KEEPALIVE,
+                        keepalive_expiry=settings.SUPABASE_KEEPALIVE_EXPIRY_SECONDS,
+                    )
+                    options = ClientOptions(postgrest_client_timeout=settings.SUPABASE_TIMEOUT_SECONDS)
+                    self._client = PooledSupabaseClient(
+                        self.url,
+                        self.key,
+                        options,
+                        limits=limits,
+                        http2=settings.SUPABASE_HTTP2 and HTTP2_AVAILABLE,
+                        transport=self.transport,
+                    )
+        return self._client
+
+    def table(self, table_name: str) -> TableQuery:
+        return TableQuery(table_name, self.connect().table(table_name))
+
+    def close(self):
+        with self._lock:
+            client, self._client = self._client, None
+        if client is not None and client._postgrest is not None:
+            client._postgrest.aclose()
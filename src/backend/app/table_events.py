@@ -0,0 +1,14 @@
+"""
+Write notifications from the data layer, used to keep in-process caches fresh
+"""
+listeners = {}
+
+
+def subscribe(table_name, callback):
+    """Call callback(operation, records) after every insert/update/delete on table_name"""
+    listeners.setdefault(table_name, []).append(callback)
+
+
+def notify(table_name, operation, records):
+    for callback in listeners.get(table_name, ()):
+        callback(operation, records)
@@ -0,0 +1,78 @@
+"""
+Version counters for tables, bumped on every write reported to app.table_events.
+
+Tables listed in SCOPE_COLUMNS also keep a counter per owning student, so a
+write to one student's marks does not change the version of everyone else's.
+These counters live in this process only; each process gets a fresh epoch so
+versions from a previous run or another worker never compare equal. A
+backend that counts writes itself (SQLite, see app/sqlite_database.py) is set
+as the reader, and current() then sees the writes of every process.
+"""
+import threading
+import uuid
+
+from app.table_events import subscribe
+
+# Tables whose rows belong to one student
+SCOPE_COLUMNS = {
+    "marks": "student_id",
+    "attendance": "student_id",
+    "student_assignments": "student_id",
+    "notifications": "student_id",
+}
+
+
+class TableVersions:
+    def __init__(self):
+        self.epoch = uuid.uuid4().hex[:12]
+        self.lock = threading.Lock()
+        self.tables = {}
+        self.unscoped = {}
+        self.scopes = {}
+        self.tracked = set()
+        # async reader(tables, owner) -> [epoch, version per table], set by app.database
+        self.reader = None
+        # False when writes can reach the tables without being counted (other workers on Supabase)
+        self.complete = True
+
+    @property
+    def shared(self) -> bool:
+        """True when versions come from the database, so writes by other processes count"""
+        return self.reader is not None
+
+    def track(self, table_name: str):
+        """Start counting writes to table_name (idempotent)"""
+        with self.lock:
+            if table_name in self.tracked:
+                return
+            self.tracked.add(table_name)
+        subscribe(table_name, lambda operation, records: self.bump(table_name, records))
+
+    def bump(self, table_name: str, records: list[dict]):
+        column = SCOPE_COLUMNS.get(table_name)
+        with self.lock:
+            self.tables[table_name] = self.tables.get(table_name, 0) + 1
+            if column is None:
+                return
+            owners = {record.get(column) for record in records}
+            if not records or None in owners:
+                # The written rows are unknown, so every student's rows may have changed
+                self.unscoped[table_name] = self.unscoped.get(table_name, 0) + 1
+            for owner in owners - {None}:
+                key = (table_name, str(owner))
+                self.scopes[key] = self.scopes.get(key, 0) + 1
+
+    def version(self, table_name: str, owner=None) -> str:
+        """Current version of a table, or of one student's rows in a scoped table"""
+        if owner is None or table_name not in SCOPE_COLUMNS:
+            return str(self.tables.get(table_name, 0))
+        return f"{self.unscoped.get(table_name, 0)}.{self.scopes.get((table_name, str(owner)), 0)}"
+
+    async def current(self, tables, owner=None) -> list[str]:
+        """The epoch, then the version of each table (of owner's rows in scoped tables)"""
+        if self.reader is not None:
+            return await self.reader(list(tables), owner)
+        return [self.epoch] + [self.version(table_name, owner) for table_name in tables]
+
+
+table_versions = TableVersions()
@@ -0,0 +1,51 @@
+"""
+Standalone job runner, for deployments that start the API with SCHEDULER_MODE=off:
+
+    python -m app.worker           # run the scheduled jobs until SIGTERM/SIGINT
+    python -m app.worker --once    # run every job now and exit (e.g. from cron)
+
+It competes for the same leader lock as the API processes, so a second
+worker, or an API left in "leader" mode on the same host, never runs a job
+twice.
+"""
+import argparse
+import logging
+import signal
+import threading
+
+from app.config import settings
+from app.database import close_database, connect_database
+from app.scheduler import job_metrics, run_jobs_now, shutdown_scheduler, start_scheduler
+
+logger = logging.getLogger("app.worker")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the scheduled jobs outside the API")
+    parser.add_argument("--once", action="store_true", help="run every job now and exit")
+    args = parser.parse_args()
+
+    if settings.DATABASE_BACKEND == "mock":
+        logger.warning("The mock database lives in this process only; the API will not see what the jobs write")
+    connect_database()
+    try:
+        if args.once:
+            for job_id, result in run_jobs_now().items():
+                if result is None and not job_metrics()["leader"]:
+                    logger.warning(f"{job_id} not run: another process holds {settings.SCHEDULER_LOCK_PATH}")
+            return
+
+        stop = threading.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: stop.set())
+        start_scheduler("leader")
+        # Wake up regularly so signals are handled on every platform
+        while not stop.wait(1.0):
+            pass
+    finally:
+        shutdown_scheduler()
+        close_database()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+# Benchmarks for the Smart Campus Connect backend (run from src/backend)
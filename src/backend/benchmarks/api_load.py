@@ -0,0 +1,446 @@
+"""
+Load test: a weighted mix of requests to every router, from concurrent clients.
+
+Seeds a synthetic college (benchmarks.college) on the configured backend
+(DATABASE_BACKEND), builds a request plan from --seed, and replays it with
+--concurrency closed-loop clients through an in-process ASGI client, so the
+numbers are the app's own cost without network overhead. The first
+--warmup requests are sent but not measured. Throughput and p50/p95/p99
+latency are reported per endpoint (route template); --output saves them as
+JSON and --compare prints the change against a saved run.
+
+    python -m benchmarks.api_load --students 2000 --requests 5000 --output before.json
+    python -m benchmarks.api_load --students 2000 --requests 5000 --compare before.json
+
+Writes use fresh subjects and emails, and deletes target rows prepared for
+them, so every request is expected to succeed; any 4xx/5xx is counted as an
+error. The notification stream (SSE) is left out: it holds its connection
+open. With DATABASE_BACKEND=sqlite, point SQLITE_PATH at a fresh file.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import time
+from datetime import date, datetime, timedelta
+from uuid import UUID
+
+# A lower cost than production keeps logins from dominating the mix (AUTH_PASSWORD_HASHING=true only)
+os.environ.setdefault("BCRYPT_ROUNDS", "10")
+
+import httpx
+
+from app.config import settings
+from app.database import connect_database, supabase
+from app.main import app
+from benchmarks.college import PASSWORD, CollegeSize, seed_college
+
+BULK_ROWS = 50
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+class Planner:
+    """Builds requests from the seeded college; every choice comes from one seeded RNG"""
+
+    def __init__(self, college, seed: int):
+        self.college = college
+        self.seed = seed
+        # A stream of its own, so new ids never repeat the college's
+        self.rng = random.Random(f"requests-{seed}")
+        self.count = 0
+        # Rows the delete requests remove, inserted before the run
+        self.disposable_resources = []
+        self.disposable_assignments = []
+
+    def new_id(self) -> str:
+        return str(UUID(int=self.rng.getrandbits(128), version=4))
+
+    def as_user(self, users: list) -> dict:
+        return self.college.headers(self.rng.choice(users))
+
+    def seeded_assignment(self):
+        assignment_id = self.rng.choice(list(self.college.assignments))
+        return assignment_id, self.college.headers(self.college.assignments[assignment_id])
+
+    def rows(self, fields) -> list:
+        student_ids = self.rng.sample(self.college.students, min(BULK_ROWS, len(self.college.students)))
+        subject = self.rng.choice(self.college.subjects)
+        return [{"student_id": student_id, "subject": subject, **fields()} for student_id in student_ids]
+
+    def prepare(self):
+        teacher_id = self.college.teachers[0]
+        if self.disposable_assignments:
+            supabase.table("assignments").insert([
+                {"id": assignment_id, "title": "Disposable", "description": "Deleted by the load test",
+                 "due_date": date.today().isoformat(), "meet_link": None, "created_by": teacher_id}
+                for assignment_id in self.disposable_assignments
+            ], returning="minimal").execute()
+        if self.disposable_resources:
+            supabase.table("resources").insert([
+                {"id": resource_id, "title": "Disposable", "resource_type": "pdf",
+                 "link": "https://example.edu/disposable", "uploaded_by": self.college.admins[0]}
+                for resource_id in self.disposable_resources
+            ], returning="minimal").execute()
+
+
+# Each builder returns (path, httpx request keyword arguments)
+
+def login(p: Planner):
+    user_id = p.rng.choice(p.college.students + p.college.teachers)
+    return "/auth/login", {"json": {"email": p.college.emails[user_id], "password": PASSWORD}}
+
+
+def signup(p: Planner):
+    return "/auth/signup", {"json": {"email": f"signup-{p.count}-s{p.seed}@bench.edu", "password": PASSWORD,
+                                     "role": "student", "name": f"Signup {p.count}"}}
+
+
+def admin_list_resources(p: Planner):
+    return "/admin/resources", {"headers": p.as_user(p.college.admins)}
+
+
+def admin_create_resource(p: Planner):
+    return "/admin/resources", {"headers": p.as_user(p.college.admins),
+                                "json": {"title": f"Handout {p.count}", "resource_type": "pdf",
+                                         "link": f"https://example.edu/handouts/{p.count}"}}
+
+
+def admin_update_resource(p: Planner):
+    return f"/admin/resources/{p.rng.choice(p.college.resources)}", {
+        "headers": p.as_user(p.college.admins),
+        "json": {"title": f"Revised notes {p.count}", "resource_type": "video", "link": "https://example.edu/v"},
+    }
+
+
+def admin_delete_resource(p: Planner):
+    resource_id = p.new_id()
+    p.disposable_resources.append(resource_id)
+    return f"/admin/resources/{resource_id}", {"headers": p.as_user(p.college.admins)}
+
+
+def admin_cache_stats(p: Planner):
+    return "/admin/cache/stats", {"headers": p.as_user(p.college.admins)}
+
+
+def admin_grant_access(p: Planner):
+    return "/admin/grant-access", {"headers": p.as_user(p.college.admins),
+                                   "json": {"class_teacher_id": p.rng.choice(p.college.class_teachers),
+                                            "class_name": f"Section {p.count}"}}
+
+
+def class_teacher_add_teacher(p: Planner):
+    return "/class-teacher/teachers", {"headers": p.as_user(p.college.class_teachers),
+                                       "json": {"teacher_id": p.rng.choice(p.college.teachers),
+                                                "subject": f"Elective {p.count}"}}
+
+
+def class_teacher_marks_page(p: Planner):
+    return "/class-teacher/marks", {"headers": p.as_user(p.college.class_teachers), "params": {"limit": 100}}
+
+
+def class_teacher_student_marks(p: Planner):
+    return f"/class-teacher/marks/{p.rng.choice(p.college.students)}", {"headers": p.as_user(p.college.class_teachers)}
+
+
+def class_teacher_attendance_page(p: Planner):
+    return "/class-teacher/attendance", {"headers": p.as_user(p.college.class_teachers), "params": {"limit": 100}}
+
+
+def class_teacher_student_attendance(p: Planner):
+    return (f"/class-teacher/attendance/{p.rng.choice(p.college.students)}",
+            {"headers": p.as_user(p.college.class_teachers)})
+
+
+def class_teacher_marks_analytics(p: Planner):
+    return "/class-teacher/analytics/marks", {"headers": p.as_user(p.college.class_teachers)}
+
+
+def class_teacher_attendance_analytics(p: Planner):
+    return "/class-teacher/analytics/attendance", {"headers": p.as_user(p.college.class_teachers)}
+
+
+def teacher_create_assignment(p: Planner):
+    due_date = date.today() + timedelta(days=p.rng.randint(1, 14))
+    return "/teacher/assignments", {"headers": p.as_user(p.college.teachers),
+                                    "json": {"title": f"Homework {p.count}", "description": "Exercises",
+                                             "due_date": due_date.isoformat()}}
+
+
+def teacher_list_assignments(p: Planner):
+    return "/teacher/assignments", {"headers": p.as_user(p.college.teachers)}
+
+
+def teacher_get_assignment(p: Planner):
+    assignment_id, headers = p.seeded_assignment()
+    return f"/teacher/assignments/{assignment_id}", {"headers": headers}
+
+
+def teacher_update_assignment(p: Planner):
+    assignment_id, headers = p.seeded_assignment()
+    return f"/teacher/assignments/{assignment_id}", {"headers": headers,
+                                                    "json": {"description": f"Revision {p.count}"}}
+
+
+def teacher_delete_assignment(p: Planner):
+    assignment_id = p.new_id()
+    p.disposable_assignments.append(assignment_id)
+    return f"/teacher/assignments/{assignment_id}", {"headers": p.college.headers(p.college.teachers[0])}
+
+
+def teacher_record_attendance(p: Planner):
+    return "/teacher/attendance", {"headers": p.as_user(p.college.teachers),
+                                   "json": {"student_id": p.rng.choice(p.college.students),
+                                            "subject": p.rng.choice(p.college.subjects),
+                                            "present_days": p.rng.randint(20, 45), "total_days": 45}}
+
+
+def teacher_record_marks(p: Planner):
+    return "/teacher/marks", {"headers": p.as_user(p.college.teachers),
+                              "json": {"student_id": p.rng.choice(p.college.students),
+                                       "subject": p.rng.choice(p.college.subjects),
+                                       "marks_obtained": p.rng.randint(20, 100), "total_marks": 100}}
+
+
+def teacher_bulk_attendance(p: Planner):
+    rows = p.rows(lambda: {"present_days": p.rng.randint(20, 45), "total_days": 45})
+    body = "student_id,subject,present_days,total_days\n" + "".join(
+        f"{row['student_id']},{row['subject']},{row['present_days']},{row['total_days']}\n" for row in rows)
+    return "/teacher/attendance/bulk", {"headers": {**p.as_user(p.college.teachers), "Content-Type": "text/csv"},
+                                        "content": body}
+
+
+def teacher_bulk_marks(p: Planner):
+    rows = p.rows(lambda: {"marks_obtained": p.rng.randint(20, 100), "total_marks": 100})
+    body = "".join(json.dumps(row) + "\n" for row in rows)
+    return "/teacher/marks/bulk", {"headers": {**p.as_user(p.college.teachers),
+                                               "Content-Type": "application/x-ndjson"},
+                                   "content": body}
+
+
+def student_assignments(p: Planner):
+    return "/student/assignments", {"headers": p.as_user(p.college.students)}
+
+
+def student_upcoming(p: Planner):
+    return "/student/assignments/upcoming", {"headers": p.as_user(p.college.students)}
+
+
+def student_submit(p: Planner):
+    return (f"/student/assignments/{p.rng.choice(list(p.college.assignments))}/submit",
+            {"headers": p.as_user(p.college.students)})
+
+
+def student_resources(p: Planner):
+    return "/student/resources", {"headers": p.as_user(p.college.students)}
+
+
+def student_attendance(p: Planner):
+    return "/student/attendance", {"headers": p.as_user(p.college.students)}
+
+
+def student_marks(p: Planner):
+    return "/student/marks", {"headers": p.as_user(p.college.students)}
+
+
+def student_notifications(p: Planner):
+    return "/student/notifications", {"headers": p.as_user(p.college.students)}
+
+
+def student_mark_read(p: Planner):
+    return "/student/notifications/read", {"headers": p.as_user(p.college.students), "json": {"all": True}}
+
+
+# (weight, method, route template, builder): mostly student and staff reads, as on a term day
+SCENARIOS = [
+    (2, "POST", "/auth/login", login),
+    (1, "POST", "/auth/signup", signup),
+    (2, "GET", "/admin/resources", admin_list_resources),
+    (1, "POST", "/admin/resources", admin_create_resource),
+    (1, "PUT", "/admin/resources/{resource_id}", admin_update_resource),
+    (1, "DELETE", "/admin/resources/{resource_id}", admin_delete_resource),
+    (1, "GET", "/admin/cache/stats", admin_cache_stats),
+    (1, "POST", "/admin/grant-access", admin_grant_access),
+    (1, "POST", "/class-teacher/teachers", class_teacher_add_teacher),
+    (2, "GET", "/class-teacher/marks", class_teacher_marks_page),
+    (3, "GET", "/class-teacher/marks/{student_id}", class_teacher_student_marks),
+    (2, "GET", "/class-teacher/attendance", class_teacher_attendance_page),
+    (3, "GET", "/class-teacher/attendance/{student_id}", class_teacher_student_attendance),
+    (1, "GET", "/class-teacher/analytics/marks", class_teacher_marks_analytics),
+    (1, "GET", "/class-teacher/analytics/attendance", class_teacher_attendance_analytics),
+    (1, "POST", "/teacher/assignments", teacher_create_assignment),
+    (3, "GET", "/teacher/assignments", teacher_list_assignments),
+    (3, "GET", "/teacher/assignments/{assignment_id}", teacher_get_assignment),
+    (1, "PUT", "/teacher/assignments/{assignment_id}", teacher_update_assignment),
+    (1, "DELETE", "/teacher/assignments/{assignment_id}", teacher_delete_assignment),
+    (2, "POST", "/teacher/attendance", teacher_record_attendance),
+    (2, "POST", "/teacher/marks", teacher_record_marks),
+    (1, "POST", "/teacher/attendance/bulk", teacher_bulk_attendance),
+    (1, "POST", "/teacher/marks/bulk", teacher_bulk_marks),
+    (6, "GET", "/student/assignments", student_assignments),
+    (3, "GET", "/student/assignments/upcoming", student_upcoming),
+    (2, "POST", "/student/assignments/{assignment_id}/submit", student_submit),
+    (5, "GET", "/student/resources", student_resources),
+    (6, "GET", "/student/attendance", student_attendance),
+    (6, "GET", "/student/marks", student_marks),
+    (4, "GET", "/student/notifications", student_notifications),
+    (1, "POST", "/student/notifications/read", student_mark_read),
+]
+
+
+def build_plan(planner: Planner, requests: int) -> list:
+    """(endpoint, method, path, kwargs) per request, in sending order"""
+    weights = [weight for weight, *_ in SCENARIOS]
+    plan = []
+    for _, method, route, builder in planner.rng.choices(SCENARIOS, weights=weights, k=requests):
+        planner.count += 1
+        path, kwargs = builder(planner)
+        plan.append((f"{method} {route}", method, path, kwargs))
+    return plan
+
+
+async def replay(plan: list, warmup: int, concurrency: int) -> tuple:
+    latencies = {}
+    errors = {}
+    # An unhandled exception becomes a 500 for that request instead of ending the run
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+
+        async def worker(requests, record: bool):
+            # The iterator is shared, so each client takes the next request as soon as it is free
+            for endpoint, method, path, kwargs in requests:
+                started = time.perf_counter()
+                response = await client.request(method, path, **kwargs)
+                elapsed = time.perf_counter() - started
+                if not record:
+                    continue
+                latencies.setdefault(endpoint, []).append(elapsed)
+                if response.status_code >= 400:
+                    first = endpoint not in errors
+                    errors[endpoint] = errors.get(endpoint, 0) + 1
+                    if first:
+                        print(f"error {endpoint}: {response.status_code} {response.text[:200]}")
+
+        warm = iter(plan[:warmup])
+        await asyncio.gather(*(worker(warm, False) for _ in range(concurrency)))
+        measured = iter(plan[warmup:])
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(measured, True) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return latencies, errors, elapsed
+
+
+def summarize(samples: list, errors: int, elapsed: float) -> dict:
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "rps": len(samples) / elapsed,
+        "mean_ms": sum(samples) / len(samples) * 1000,
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p95_ms": percentile(samples, 95) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_table(results: dict):
+    print(f"{'endpoint':52} {'requests':>8} {'errors':>6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for endpoint, result in [*sorted(results["endpoints"].items()), ("total", results["total"])]:
+        print(f"{endpoint:52} {result['requests']:8} {result['errors']:6} {result['rps']:8.1f} "
+              f"{result['p50_ms']:8.2f} {result['p95_ms']:8.2f} {result['p99_ms']:8.2f}")
+
+
+def print_comparison(results: dict, baseline: dict):
+    """Relative change per endpoint; for latencies negative is better, for req/s positive"""
+    for key in ("backend", "response_mode", "auth_password_hashing", "args"):
+        if results["meta"].get(key) != baseline["meta"].get(key):
+            print(f"note: {key} differs from the baseline ({baseline['meta'].get(key)})")
+    print(f"\nagainst {baseline['meta'].get('commit') or 'baseline'} ({baseline['meta']['started_at']})")
+    print(f"{'endpoint':52} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8}")
+
+    def change(new: float, old: float) -> str:
+        return f"{(new - old) / old * 100:+7.1f}%" if old else f"{'n/a':>8}"
+
+    endpoints = [(name, result, baseline["endpoints"].get(name)) for name, result in sorted(results["endpoints"].items())]
+    for endpoint, result, old in endpoints + [("total", results["total"], baseline["total"])]:
+        if old is None:
+            print(f"{endpoint:52} (not in baseline)")
+            continue
+        print(f"{endpoint:52} " + " ".join(change(result[key], old[key])
+                                           for key in ("rps", "p50_ms", "p95_ms", "p99_ms")))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    defaults = CollegeSize()
+    parser.add_argument("--students", type=int, default=defaults.students)
+    parser.add_argument("--teachers", type=int, default=defaults.teachers)
+    parser.add_argument("--subjects", type=int, default=defaults.subjects)
+    parser.add_argument("--assignments", type=int, default=defaults.assignments)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="save the results as JSON")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare against")
+    args = parser.parse_args()
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    connect_database()
+    first_email = f"student-0-s{args.seed}@bench.edu"
+    if supabase.table("users").select("id").eq("email", first_email).limit(1).execute().data:
+        parser.error(f"this database already holds a college seeded with --seed {args.seed}; "
+                     "use another seed or a fresh database")
+    size = CollegeSize(students=args.students, teachers=args.teachers, subjects=args.subjects,
+                       assignments=args.assignments)
+    started = time.perf_counter()
+    college = seed_college(size, args.seed)
+    print(f"seeded {args.students} students, {args.subjects} subjects on {settings.DATABASE_BACKEND} "
+          f"in {time.perf_counter() - started:.1f}s")
+
+    planner = Planner(college, args.seed)
+    plan = build_plan(planner, args.warmup + args.requests)
+    planner.prepare()
+    latencies, errors, elapsed = asyncio.run(replay(plan, args.warmup, args.concurrency))
+
+    everything = [sample for samples in latencies.values() for sample in samples]
+    results = {
+        "meta": {
+            "started_at": datetime.now().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "backend": settings.DATABASE_BACKEND,
+            "response_mode": settings.RESPONSE_MODE,
+            "auth_password_hashing": settings.AUTH_PASSWORD_HASHING,
+            "args": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+            "seconds": elapsed,
+        },
+        "endpoints": {endpoint: summarize(samples, errors.get(endpoint, 0), elapsed)
+                      for endpoint, samples in latencies.items()},
+        "total": summarize(everything, sum(errors.values()), elapsed),
+    }
+    print_table(results)
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=2)
+    if args.compare:
+        with open(args.compare) as baseline:
+            print_comparison(results, json.load(baseline))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Load test: request latency with data-layer calls run inline on the event
+loop vs offloaded to the bounded worker pool (DB_MAX_CONCURRENCY).
+
+Each query is given an artificial round-trip delay (--latency-ms) to stand
+in for the network I/O of a real database. Requests for a mix of student
+endpoints arrive on a fixed open-loop schedule (--rate) through an
+in-process ASGI client; latency is measured from each request's scheduled
+start, so time spent queued behind a blocked event loop is counted.
+
+    python -m benchmarks.async_db_load --rate 300 --requests 1500 --latency-ms 5
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+from app.database import async_supabase, supabase
+from app.main import app
+from app.mock_database import MockTable
+
+ENDPOINTS = ["/student/marks", "/student/attendance", "/student/resources", "/student/assignments"]
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def seed(student_id: str):
+    subjects = [f"subject-{n}" for n in range(8)]
+    supabase.table("marks").insert([
+        {"student_id": student_id, "subject": s, "marks_obtained": 70, "total_marks": 100} for s in subjects
+    ]).execute()
+    supabase.table("attendance").insert([
+        {"student_id": student_id, "subject": s, "present_days": 40, "total_days": 45} for s in subjects
+    ]).execute()
+
+
+async def run(rate: float, requests: int, max_concurrency: int) -> dict:
+    async_supabase.max_concurrency = max_concurrency
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        login = await client.post("/auth/login", json={"email": "student@demo.com", "password": "admin123"})
+        headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+        latencies = []
+        start = time.perf_counter()
+
+        async def send(n: int):
+            scheduled = start + n / rate
+            await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+            response = await client.get(ENDPOINTS[n % len(ENDPOINTS)], headers=headers)
+            latencies.append(time.perf_counter() - scheduled)
+            assert response.status_code == 200, response.text
+
+        await asyncio.gather(*(send(n) for n in range(requests)))
+        elapsed = time.perf_counter() - start
+
+    return {
+        "max_concurrency": max_concurrency,
+        "requests": len(latencies),
+        "rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rate", type=float, default=300, help="request arrivals per second")
+    parser.add_argument("--requests", type=int, default=1500)
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="simulated round trip per query")
+    parser.add_argument("--max-concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    student = supabase.table("users").select("id").eq("email", "student@demo.com").execute().data[0]
+    seed(student["id"])
+
+    execute = MockTable.execute
+
+    def slow_execute(self):
+        time.sleep(args.latency_ms / 1000)
+        return execute(self)
+
+    MockTable.execute = slow_execute
+    try:
+        results = [asyncio.run(run(args.rate, args.requests, n)) for n in (0, args.max_concurrency)]
+    finally:
+        MockTable.execute = execute
+
+    for result in results:
+        mode = "inline" if result["max_concurrency"] <= 0 else f"offload({result['max_concurrency']})"
+        print(f"{mode:13} {result['rps']:8.0f} req/s  p50={result['p50_ms']:7.1f}ms  "
+              f"p95={result['p95_ms']:7.1f}ms  p99={result['p99_ms']:7.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+A synthetic college, seeded through the data layer of the configured backend
+(DATABASE_BACKEND), for the load benchmarks.
+
+The same --seed always produces the same users, ids and values, so two runs
+(e.g. before and after a change) measure the same data.
+"""
+import random
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from uuid import UUID
+
+from app.auth import create_access_token
+from app.config import settings
+from app.database import supabase
+from app.passwords import get_password_hash
+
+PASSWORD = "bench-password"
+INSERT_BATCH = 5000
+
+
+@dataclass
+class CollegeSize:
+    students: int = 2000
+    teachers: int = 40
+    class_teachers: int = 5
+    admins: int = 2
+    subjects: int = 8
+    assignments: int = 20
+    resources: int = 200
+    notifications_per_student: int = 5
+
+
+@dataclass
+class College:
+    """Ids and tokens of the seeded users, for building requests"""
+
+    size: CollegeSize
+    subjects: list
+    students: list = field(default_factory=list)
+    teachers: list = field(default_factory=list)
+    class_teachers: list = field(default_factory=list)
+    admins: list = field(default_factory=list)
+    assignments: dict = field(default_factory=dict)  # assignment id -> creating teacher id
+    resources: list = field(default_factory=list)
+    tokens: dict = field(default_factory=dict)  # user id -> bearer token
+    emails: dict = field(default_factory=dict)  # user id -> email
+
+    def headers(self, user_id: str) -> dict:
+        return {"Authorization": f"Bearer {self.tokens[user_id]}"}
+
+
+def _insert(table_name: str, rows: list):
+    for start in range(0, len(rows), INSERT_BATCH):
+        supabase.table(table_name).insert(rows[start:start + INSERT_BATCH], returning="minimal").execute()
+
+
+def seed_college(size: CollegeSize, seed: int = 42) -> College:
+    rng = random.Random(seed)
+
+    def new_id() -> str:
+        return str(UUID(int=rng.getrandbits(128), version=4))
+
+    # Emails are unique per seed, so a persistent store can hold several runs
+    college = College(size=size, subjects=[f"Subject {n}" for n in range(size.subjects)])
+    created_at = datetime(2024, 1, 1)
+    # Stored the way the active auth router checks it; one bcrypt hash is shared, as hashing is deliberately slow
+    password = get_password_hash(PASSWORD) if settings.AUTH_PASSWORD_HASHING else PASSWORD
+    users = []
+    for role, count, ids in (("student", size.students, college.students),
+                             ("teacher", size.teachers, college.teachers),
+                             ("class_teacher", size.class_teachers, college.class_teachers),
+                             ("admin", size.admins, college.admins)):
+        for n in range(count):
+            user_id = new_id()
+            ids.append(user_id)
+            college.emails[user_id] = f"{role}-{n}-s{seed}@bench.edu"
+            users.append({"id": user_id, "email": college.emails[user_id], "password": password, "role": role,
+                          "name": f"{role.replace('_', ' ').title()} {n}", "department": "Computer Science",
+                          "created_at": created_at.isoformat()})
+    _insert("users", users)
+    college.tokens = {user["id"]: create_access_token({"sub": user["id"]}) for user in users}
+
+    _insert("teacher_assignments", [
+        {"teacher_id": teacher_id, "subject": college.subjects[n % size.subjects],
+         "assigned_by": college.class_teachers[n % size.class_teachers] if college.class_teachers else None}
+        for n, teacher_id in enumerate(college.teachers)
+    ])
+
+    resources = []
+    for n in range(size.resources):
+        resource_id = new_id()
+        college.resources.append(resource_id)
+        resources.append({"id": resource_id, "title": f"Lecture notes {n}", "resource_type": rng.choice(["pdf", "video"]),
+                          "link": f"https://example.edu/resources/{n}", "uploaded_by": rng.choice(college.admins),
+                          "created_at": (created_at + timedelta(minutes=n)).isoformat()})
+    _insert("resources", resources)
+
+    # Due dates spread from a week ago to a month ahead, so "upcoming" and the reminders find some
+    today = date.today()
+    assignments = []
+    for n in range(size.assignments):
+        assignment_id = new_id()
+        teacher_id = rng.choice(college.teachers)
+        college.assignments[assignment_id] = teacher_id
+        assignments.append({"id": assignment_id, "title": f"Assignment {n}", "description": "Exercises",
+                            "due_date": (today + timedelta(days=rng.randint(-7, 30))).isoformat(),
+                            "meet_link": None, "created_by": teacher_id, "created_at": created_at.isoformat()})
+    _insert("assignments", assignments)
+
+    _insert("student_assignments", [
+        {"id": new_id(), "assignment_id": assignment_id, "student_id": student_id, "submitted": rng.random() < 0.3}
+        for assignment_id in college.assignments for student_id in college.students
+    ])
+    _insert("marks", [
+        {"id": new_id(), "student_id": student_id, "subject": subject, "marks_obtained": rng.randint(20, 100),
+         "total_marks": 100}
+        for student_id in college.students for subject in college.subjects
+    ])
+    _insert("attendance", [
+        {"id": new_id(), "student_id": student_id, "subject": subject, "present_days": rng.randint(20, 45),
+         "total_days": 45}
+        for student_id in college.students for subject in college.subjects
+    ])
+    assignment_ids = list(college.assignments)
+    _insert("notifications", [
+        {"id": new_id(), "student_id": student_id, "assignment_id": rng.choice(assignment_ids) if assignment_ids else None,
+         "message": f"Reminder {n}", "read": rng.random() < 0.5,
+         "created_at": (created_at + timedelta(hours=n)).isoformat()}
+        for student_id in college.students for n in range(size.notifications_per_student)
+    ])
+    return college
@@ -0,0 +1,92 @@
+"""
+Memory and query cost of the marks table as dict rows vs columnar buffers.
+
+Builds the same --rows marks rows (10 subjects per student) in a dict-row
+MockStore, with its usual indexes, and in a ColumnarTable, and reports the
+memory each holds (tracemalloc) and the time of a few typical queries.
+
+    python -m benchmarks.columnar_memory --rows 1000000
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+from uuid import uuid4
+
+from app import mock_database
+from app.columnar_store import ColumnarTable
+from app.mock_database import COLUMNAR_TABLES, INDEXED_COLUMNS, SORTED_COLUMNS, UNIQUE_COLUMNS, MockStore, MockTable
+
+SUBJECTS = [f"subject-{n}" for n in range(10)]
+
+
+def generate(rows: int) -> list[dict]:
+    students = [str(uuid4()) for _ in range(max(rows // len(SUBJECTS), 1))]
+    return [
+        {"student_id": students[n // len(SUBJECTS) % len(students)], "subject": SUBJECTS[n % len(SUBJECTS)],
+         "marks_obtained": n % 101, "total_marks": 100}
+        for n in range(rows)
+    ]
+
+
+def build(layout: str, rows: list[dict]):
+    """Load the rows into a fresh "bench_marks" table and return (bytes held, seconds)"""
+    mock_database.stores.pop("bench_marks", None)
+    if layout == "columnar":
+        mock_database.mock_data["bench_marks"] = ColumnarTable("bench_marks", COLUMNAR_TABLES["marks"], ["student_id"],
+                                                                 UNIQUE_COLUMNS["marks"])
+    else:
+        mock_database.mock_data["bench_marks"] = []
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    for offset in range(0, len(rows), 50000):
+        MockTable("bench_marks").insert(rows[offset:offset + 50000], returning="minimal").execute()
+    mock_database.get_store("bench_marks")
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return held, elapsed
+
+
+def time_queries(student_id: str, repeat: int = 20) -> dict:
+    queries = {
+        "student marks": lambda: MockTable("bench_marks").select("*").eq("student_id", student_id).execute(),
+        "first page by id": lambda: MockTable("bench_marks").select("*").order("id").limit(100).execute(),
+    }
+    results = {}
+    for name, query in queries.items():
+        query()
+        start = time.perf_counter()
+        for _ in range(repeat):
+            query()
+        results[name] = (time.perf_counter() - start) / repeat * 1000
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1000000)
+    args = parser.parse_args()
+
+    INDEXED_COLUMNS["bench_marks"] = INDEXED_COLUMNS["marks"]
+    UNIQUE_COLUMNS["bench_marks"] = UNIQUE_COLUMNS["marks"]
+    SORTED_COLUMNS["bench_marks"] = SORTED_COLUMNS["marks"]
+    rows = generate(args.rows)
+    student_id = rows[len(rows) // 2]["student_id"]
+
+    for layout in ("dict rows", "columnar"):
+        held, elapsed = build(layout, rows)
+        timings = time_queries(student_id)
+        print(f"{layout:10} {held / 2 ** 20:9.1f} MiB  {held / args.rows:7.1f} B/row  load {elapsed:6.1f}s  "
+              + "  ".join(f"{name} {ms:.2f}ms" for name, ms in timings.items()))
+        if layout == "columnar":
+            usage = mock_database.mock_data["bench_marks"].memory_usage()
+            print("           " + "  ".join(f"{name}={size / 2 ** 20:.1f}MiB" for name, size in usage.items()))
+        del mock_database.mock_data["bench_marks"]
+        mock_database.stores.pop("bench_marks", None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Compare decode_token throughput with the verified-token cache on and off.
+
+The token mix models a busy dashboard: a pool of active sessions whose
+tokens are presented repeatedly (Zipf-weighted, so a few users poll a lot),
+with a share of requests coming from freshly issued tokens.
+
+    python -m benchmarks.jwt_decode --requests 50000 --sessions 500
+"""
+import argparse
+import random
+import time
+from uuid import uuid4
+
+from app import auth
+
+
+def build_workload(requests: int, sessions: int, fresh_ratio: float, seed: int) -> list[str]:
+    rng = random.Random(seed)
+    pool = [auth.create_access_token({"sub": str(uuid4())}) for _ in range(sessions)]
+    weights = [1 / (rank + 1) for rank in range(sessions)]
+    workload = []
+    for token in rng.choices(pool, weights=weights, k=requests):
+        if rng.random() < fresh_ratio:
+            token = auth.create_access_token({"sub": str(uuid4())})
+        workload.append(token)
+    return workload
+
+
+def run(workload: list[str], cache_size: int) -> dict:
+    auth.token_cache = auth.VerifiedTokenCache(cache_size)
+    start = time.perf_counter()
+    for token in workload:
+        auth.decode_token(token)
+    elapsed = time.perf_counter() - start
+    result = {"cache_size": cache_size, "seconds": elapsed, "decodes_per_sec": len(workload) / elapsed}
+    result.update(auth.token_cache.stats())
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=50000)
+    parser.add_argument("--sessions", type=int, default=500)
+    parser.add_argument("--fresh-ratio", type=float, default=0.02)
+    parser.add_argument("--cache-size", type=int, default=4096)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    workload = build_workload(args.requests, args.sessions, args.fresh_ratio, args.seed)
+    original = auth.token_cache
+    try:
+        off = run(workload, 0)
+        on = run(workload, args.cache_size)
+    finally:
+        auth.token_cache = original
+
+    for label, result in (("cache off", off), ("cache on", on)):
+        print(f"{label:9} {result['decodes_per_sec']:>12,.0f} decodes/s  "
+              f"hits={result['hits']} misses={result['misses']} hit_ratio={result['hit_ratio']:.2%}")
+    print(f"speedup   {on['decodes_per_sec'] / off['decodes_per_sec']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Load test: a burst of concurrent logins against /auth/login (the bcrypt
+router, AUTH_PASSWORD_HASHING=true) with password checks run inline on the
+event loop vs in the hashing pool (threads or processes).
+
+While the burst runs, /health is probed on a fixed schedule (every
+--probe-ms) through the same in-process ASGI client; its latency, measured
+from each probe's scheduled start, shows how long other endpoints stall
+behind the logins. Logins beyond the workers and PASSWORD_HASH_MAX_PENDING
+are rejected with 503 and counted.
+
+    BCRYPT_ROUNDS=10 python -m benchmarks.login_load --logins 200
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import time
+
+os.environ.setdefault("AUTH_PASSWORD_HASHING", "true")
+# A lower cost than production keeps the run short; worker processes read it from the environment too
+os.environ.setdefault("BCRYPT_ROUNDS", "10")
+
+import httpx
+
+from app.config import settings
+from app.main import app
+from app.mock_database import MockTable
+from app.passwords import get_password_hash, verify_and_update
+from app.routers import auth as auth_router
+
+PASSWORD = "semester-start"
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def seed(count: int) -> list[str]:
+    hashed = get_password_hash(PASSWORD)
+    emails = [f"login-{n}@bench.edu" for n in range(count)]
+    MockTable("users").insert([
+        {"email": email, "password": hashed, "role": "student", "name": f"Student {n}"}
+        for n, email in enumerate(emails)
+    ]).execute()
+    return emails
+
+
+async def check_inline(plain_password: str, hashed_password: str, upgrade: bool = False):
+    return verify_and_update(plain_password, hashed_password, upgrade)
+
+
+async def burst(emails: list[str], probe_ms: float) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        login_latencies = []
+        probe_latencies = []
+        statuses = {}
+        done = asyncio.Event()
+
+        async def login(email: str):
+            started = time.perf_counter()
+            response = await client.post("/auth/login", json={"email": email, "password": PASSWORD})
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            if response.status_code == 200:
+                login_latencies.append(time.perf_counter() - started)
+
+        async def probe():
+            n = 0
+            while not done.is_set():
+                scheduled = start + n * probe_ms / 1000
+                await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+                await client.get("/health")
+                probe_latencies.append(time.perf_counter() - scheduled)
+                n += 1
+
+        start = time.perf_counter()
+        prober = asyncio.create_task(probe())
+        await asyncio.gather(*(login(email) for email in emails))
+        elapsed = time.perf_counter() - start
+        done.set()
+        await prober
+
+    return {
+        "logins/s": statuses.get(200, 0) / elapsed,
+        "login p50 ms": percentile(login_latencies, 50) * 1000 if login_latencies else 0.0,
+        "login p99 ms": percentile(login_latencies, 99) * 1000 if login_latencies else 0.0,
+        "health p50 ms": statistics.median(probe_latencies) * 1000,
+        "health p99 ms": percentile(probe_latencies, 99) * 1000,
+        "rejected": statuses.get(503, 0),
+        "failed": sum(count for status, count in statuses.items() if status not in (200, 503)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=settings.PASSWORD_HASH_WORKERS)
+    parser.add_argument("--max-pending", type=int, default=settings.PASSWORD_HASH_MAX_PENDING)
+    parser.add_argument("--probe-ms", type=float, default=10.0)
+    args = parser.parse_args()
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    settings.PASSWORD_HASH_WORKERS = args.workers
+    settings.PASSWORD_HASH_MAX_PENDING = args.max_pending
+    emails = seed(args.logins)
+
+    pooled = auth_router.check_password
+    for mode in ("inline", "thread", "process"):
+        auth_router.check_password = check_inline if mode == "inline" else pooled
+        settings.PASSWORD_HASH_EXECUTOR = mode
+        results = asyncio.run(burst(emails, args.probe_ms))
+        print(f"{mode:8} " + "  ".join(
+            f"{name} {value:.0f}" if isinstance(value, int) else f"{name} {value:.1f}"
+            for name, value in results.items()
+        ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Microbenchmarks: mock store queries, JWT decoding and list response rendering.
+
+Seeds the synthetic college (benchmarks.college) in the mock store, then
+times each operation with timeit (auto-ranged loops, median of --repeat
+runs) and reports operations per second and microseconds per operation.
+--only runs the benchmarks whose name contains the given text; --output
+saves the results as JSON and --compare prints the change against a saved
+run.
+
+    python -m benchmarks.micro --students 2000 --output before.json
+    python -m benchmarks.micro --students 2000 --compare before.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import timeit
+from datetime import datetime
+
+# MockTable is what is measured, whatever the environment configures
+os.environ["DATABASE_BACKEND"] = "mock"
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app import auth
+from app.config import settings
+from app.mock_database import MockTable
+from app.models import MarksResponse
+from app.responses import list_adapter, render_rows
+from benchmarks.college import CollegeSize, seed_college
+
+RESPONSE_MODES = ["standard", "validated", "trusted"]
+
+
+def query_benchmarks(college) -> dict:
+    students = college.students
+    subject = college.subjects[0]
+    batch = students[:200]
+    # A keyset page from the middle of the table, as GET /class-teacher/marks?cursor= fetches it
+    middle = MockTable("marks").select("id").order("id").range(len(students), len(students)).execute().data[0]["id"]
+    return {
+        "mock: marks eq student_id (hash index)":
+            lambda: MockTable("marks").select("*").eq("student_id", students[7]).execute(),
+        "mock: marks eq student_id, subject":
+            lambda: MockTable("marks").select("*").eq("student_id", students[7]).eq("subject", subject).execute(),
+        "mock: marks in_ student_id x200":
+            lambda: MockTable("marks").select("student_id,marks_obtained").in_("student_id", batch).execute(),
+        "mock: marks gt id, order id, limit 100 (sorted index)":
+            lambda: MockTable("marks").select("*").gt("id", middle).order("id").limit(100).execute(),
+        "mock: marks gte marks_obtained (full scan)":
+            lambda: MockTable("marks").select("id").gte("marks_obtained", 99).execute(),
+        "mock: student_assignments eq student_id (row store)":
+            lambda: MockTable("student_assignments").select("assignment_id").eq("student_id", students[7]).execute(),
+        "mock: notifications eq student_id, order created_at desc, limit 20":
+            lambda: MockTable("notifications").select("*").eq("student_id", students[7])
+            .order("created_at", desc=True).limit(20).execute(),
+    }
+
+
+def jwt_benchmarks(college) -> dict:
+    token = college.tokens[college.students[0]]
+    caches = {"miss": auth.VerifiedTokenCache(0), "hit": auth.VerifiedTokenCache(settings.JWT_DECODE_CACHE_SIZE)}
+
+    def decode(cache):
+        def run():
+            auth.token_cache = cache
+            auth.decode_token(token)
+        return run
+
+    return {f"jwt: decode_token, cache {name}": decode(cache) for name, cache in caches.items()}
+
+
+def serialization_benchmarks(rows: list) -> dict:
+    def render(mode):
+        def run():
+            settings.RESPONSE_MODE = mode
+            result = render_rows(rows, MarksResponse)
+            if mode == "standard":
+                # What FastAPI does with the plain rows: response_model validation, jsonable_encoder, json
+                adapter = list_adapter(MarksResponse)
+                JSONResponse(jsonable_encoder(adapter.dump_python(adapter.validate_python(result), mode="json")))
+        return run
+
+    return {f"render: {len(rows)} marks rows, {mode}": render(mode) for mode in RESPONSE_MODES}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def measure(func, repeat: int) -> dict:
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    per_op = statistics.median(elapsed / number for elapsed in timer.repeat(repeat, number))
+    return {"ops_per_sec": 1 / per_op, "us_per_op": per_op * 1e6, "loops": number * repeat}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--students", type=int, default=CollegeSize.students)
+    parser.add_argument("--subjects", type=int, default=CollegeSize.subjects)
+    parser.add_argument("--rows", type=int, default=1000, help="rows per rendered response")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--only", default="", help="run the benchmarks whose name contains this")
+    parser.add_argument("--output", help="save the results as JSON")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare against")
+    args = parser.parse_args()
+
+    # Per-query metrics are part of what a query costs in the app, but not of these numbers
+    settings.METRICS_ENABLED = False
+    college = seed_college(CollegeSize(students=args.students, subjects=args.subjects), args.seed)
+    rows = MockTable("marks").select("*").order("id").limit(args.rows).execute().data
+    benchmarks = {**query_benchmarks(college), **jwt_benchmarks(college), **serialization_benchmarks(rows)}
+
+    original_cache, original_mode = auth.token_cache, settings.RESPONSE_MODE
+    results = {}
+    try:
+        for name, func in benchmarks.items():
+            if args.only in name:
+                results[name] = measure(func, args.repeat)
+                print(f"{name:68} {results[name]['ops_per_sec']:12,.0f} ops/s {results[name]['us_per_op']:10.1f} µs/op")
+    finally:
+        auth.token_cache, settings.RESPONSE_MODE = original_cache, original_mode
+
+    # --only is left out of the recorded args, so a partial run still compares with a full one
+    meta = {"started_at": datetime.now().isoformat(timespec="seconds"), "commit": git_commit(),
+            "python": platform.python_version(),
+            "args": {key: value for key, value in vars(args).items()
+                     if key not in ("output", "compare", "only")}}
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump({"meta": meta, "benchmarks": results}, output, indent=2)
+    if args.compare:
+        with open(args.compare) as saved:
+            baseline = json.load(saved)
+        if baseline["meta"].get("args") != meta["args"]:
+            print(f"note: args differ from the baseline ({baseline['meta'].get('args')})")
+        print(f"\nagainst {baseline['meta'].get('commit') or 'baseline'} ({baseline['meta']['started_at']})")
+        for name, result in results.items():
+            old = baseline["benchmarks"].get(name)
+            change = f"{(result['us_per_op'] - old['us_per_op']) / old['us_per_op'] * 100:+7.1f}% µs/op" if old \
+                else "(not in baseline)"
+            print(f"{name:68} {change}")
+
+
+if __name__ == "__main__":
+    main()
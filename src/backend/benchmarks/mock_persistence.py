@@ -0,0 +1,120 @@
+"""
+Write throughput and startup time of the persistent mock database.
+
+Loads --rows marks rows in batches with the write-ahead log off and on,
+measures single-row upserts from one and from --writers threads (group
+commit lets concurrent writers share an fsync), then restarts the table from
+the log alone and from a snapshot.
+
+    python -m benchmarks.mock_persistence --rows 1000000
+"""
+import argparse
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from uuid import uuid4
+
+from app import mock_database
+from app.config import settings
+from app.mock_database import MockTable, empty_table, get_store, mock_data, store_lock
+from app.mock_persistence import Persistence
+
+SUBJECTS = [f"subject-{n}" for n in range(10)]
+
+
+def generate(rows: int) -> list[dict]:
+    students = [str(uuid4()) for _ in range(max(rows // len(SUBJECTS), 1))]
+    return [
+        {"student_id": students[n // len(SUBJECTS) % len(students)], "subject": SUBJECTS[n % len(SUBJECTS)],
+         "marks_obtained": n % 101, "total_marks": 100}
+        for n in range(rows)
+    ]
+
+
+def open_persistence(directory: str, sync: str):
+    persistence = Persistence(directory, store_lock, mock_data, sync, settings.MOCK_WAL_FLUSH_INTERVAL_MS,
+                              max_log_bytes=2 ** 62)
+    stats = persistence.recover(get_store)
+    mock_database.persistence = persistence
+    return persistence, stats
+
+
+def reset():
+    mock_database.persistence = None
+    mock_data["marks"] = empty_table("marks")
+    mock_database.stores.pop("marks", None)
+
+
+def bulk_load(rows: list[dict], batch: int) -> float:
+    start = time.perf_counter()
+    for offset in range(0, len(rows), batch):
+        MockTable("marks").insert(rows[offset:offset + batch], returning="minimal").execute()
+    return time.perf_counter() - start
+
+
+def single_writes(count: int, writers: int) -> float:
+    student_id = str(uuid4())
+
+    def write(n):
+        MockTable("marks").upsert({"student_id": student_id, "subject": f"single-{n % 50}", "marks_obtained": n,
+                                   "total_marks": 100}, on_conflict="student_id,subject").execute()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(writers) as pool:
+        list(pool.map(write, range(count)))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--batch", type=int, default=1000)
+    parser.add_argument("--single", type=int, default=2000, help="single-row upserts per run")
+    parser.add_argument("--writers", type=int, default=16)
+    parser.add_argument("--dir", help="data directory (default: a temporary one)")
+    args = parser.parse_args()
+
+    directory = args.dir or tempfile.mkdtemp(prefix="mock-wal-")
+    rows = generate(args.rows)
+    try:
+        reset()
+        elapsed = bulk_load(rows, args.batch)
+        print(f"bulk load, no log     {args.rows / elapsed:10.0f} rows/s  ({elapsed:.1f}s)")
+        reset()
+
+        persistence, _ = open_persistence(directory, "group")
+        elapsed = bulk_load(rows, args.batch)
+        print(f"bulk load, group sync {args.rows / elapsed:10.0f} rows/s  ({elapsed:.1f}s, "
+              f"{persistence.log_bytes / 2 ** 20:.0f} MiB log)")
+        for sync in ("group", "interval"):
+            persistence.sync = sync
+            for writers in (1, args.writers):
+                before = dict(persistence.stats)
+                elapsed = single_writes(args.single, writers)
+                records = persistence.stats["records"] - before["records"]
+                flushes = persistence.stats["flushes"] - before["flushes"]
+                print(f"single upserts, {sync:8} sync, {writers:2} writers {args.single / elapsed:8.0f} writes/s  "
+                      f"({records / max(flushes, 1):.1f} records per fsync)")
+        persistence.close(checkpoint=False)
+
+        reset()
+        _, stats = open_persistence(directory, "group")
+        print(f"startup from log      {stats['seconds']:6.2f}s  ({stats['replayed']} records replayed)")
+        start = time.perf_counter()
+        mock_database.persistence.checkpoint()
+        print(f"checkpoint            {time.perf_counter() - start:6.2f}s")
+        mock_database.persistence.close(checkpoint=False)
+
+        reset()
+        persistence, stats = open_persistence(directory, "group")
+        print(f"startup from snapshot {stats['seconds']:6.2f}s  ({len(mock_data['marks'])} rows)")
+        persistence.close(checkpoint=False)
+    finally:
+        reset()
+        if args.dir is None:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Throughput of GET /class-teacher/marks with each RESPONSE_MODE.
+
+The marks table is seeded with --rows rows and the whole list is fetched
+--requests times per mode through an in-process ASGI client, so the numbers
+reflect query + serialization cost without network overhead.
+
+    python -m benchmarks.response_serialization --rows 10000 --requests 50
+"""
+import argparse
+import asyncio
+import time
+from uuid import uuid4
+
+import httpx
+
+from app import responses
+from app.auth import create_access_token
+from app.config import settings
+from app.database import supabase
+from app.main import app
+
+MODES = ["standard", "validated", "trusted"]
+
+
+def seed(rows: int) -> str:
+    run_id = uuid4().hex[:8]
+    class_teacher = supabase.table("users").insert({
+        "email": f"bench-{run_id}@demo.com",
+        "password": "",
+        "role": "class_teacher",
+        "name": "Benchmark Class Teacher",
+    }).execute().data[0]
+    # 10 subjects per student, so every (student_id, subject) pair is unique
+    students = supabase.table("users").insert([
+        {"email": f"bench-{run_id}-student-{n}@demo.com", "password": "", "role": "student", "name": f"Student {n}"}
+        for n in range(-(-rows // 10))
+    ]).execute().data
+    supabase.table("marks").insert([
+        {"student_id": students[n // 10]["id"], "subject": f"subject-{n % 10}",
+         "marks_obtained": n % 101, "total_marks": 100}
+        for n in range(rows)
+    ], returning="minimal").execute()
+    return create_access_token({"sub": class_teacher["id"]})
+
+
+async def run(mode: str, requests: int, token: str) -> dict:
+    settings.RESPONSE_MODE = mode
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        headers = {"Authorization": f"Bearer {token}"}
+        response = await client.get("/class-teacher/marks", headers=headers)
+        assert response.status_code == 200, response.text
+        start = time.perf_counter()
+        for _ in range(requests):
+            response = await client.get("/class-teacher/marks", headers=headers)
+        elapsed = time.perf_counter() - start
+    return {"mode": mode, "rps": requests / elapsed, "ms_per_request": elapsed / requests * 1000,
+            "bytes": len(response.content)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--requests", type=int, default=50)
+    args = parser.parse_args()
+
+    token = seed(args.rows)
+    original = settings.RESPONSE_MODE
+    try:
+        results = [asyncio.run(run(mode, args.requests, token)) for mode in MODES]
+    finally:
+        settings.RESPONSE_MODE = original
+
+    print(f"encoder: {'orjson' if responses.orjson is not None else 'json'}")
+    for result in results:
+        print(f"{result['mode']:10} {result['rps']:8.1f} req/s  {result['ms_per_request']:7.1f} ms/request  "
+              f"{result['bytes']:,} bytes")
+
+
+if __name__ == "__main__":
+    main()
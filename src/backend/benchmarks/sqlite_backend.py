@@ -0,0 +1,140 @@
+"""
+The SQLite backend against the in-memory mock store, through the same query chain.
+
+Seeds --students students with --subjects marks each, then times bulk
+loading, point reads (one student's marks), batched in_() reads and
+single-row upserts on both backends. Finally runs a mixed workload (90%
+reads, 10% upserts) on the SQLite file from 1 and from --processes worker
+processes at once, which the in-memory store cannot do: each process would
+hold its own copy of the data.
+
+    python -m benchmarks.sqlite_backend --students 20000 --processes 4
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import time
+from uuid import uuid4
+
+from app import mock_database
+from app.sqlite_database import SqliteDatabase
+
+
+def generate(students: int, subjects: int):
+    student_ids = [str(uuid4()) for _ in range(students)]
+    users = [{"id": student_id, "email": f"bench-{n}@bench.edu", "password": "x", "role": "student",
+              "name": f"Student {n}"} for n, student_id in enumerate(student_ids)]
+    marks = [{"student_id": student_id, "subject": f"subject-{s}", "marks_obtained": (n + s) % 101,
+              "total_marks": 100}
+             for n, student_id in enumerate(student_ids) for s in range(subjects)]
+    return student_ids, users, marks
+
+
+def rate(count: int, func) -> float:
+    start = time.perf_counter()
+    func()
+    return count / (time.perf_counter() - start)
+
+
+def run_backend(client, student_ids, users, marks, args) -> dict:
+    batch = args.batch
+    results = {}
+
+    def load():
+        for offset in range(0, len(users), batch):
+            client.table("users").insert(users[offset:offset + batch], returning="minimal").execute()
+        for offset in range(0, len(marks), batch):
+            client.table("marks").insert(marks[offset:offset + batch], returning="minimal").execute()
+
+    results["bulk load rows/s"] = rate(len(users) + len(marks), load)
+
+    picks = random.Random(1).choices(student_ids, k=args.reads)
+
+    def point_reads():
+        for student_id in picks:
+            client.table("marks").select("*").eq("student_id", student_id).execute()
+
+    results["point reads/s"] = rate(args.reads, point_reads)
+
+    chunks = [picks[offset:offset + 200] for offset in range(0, len(picks), 200)]
+
+    def batched_reads():
+        for chunk in chunks:
+            client.table("marks").select("student_id,marks_obtained").in_("student_id", chunk).execute()
+
+    results["in_(200) reads/s"] = rate(len(chunks), batched_reads)
+
+    def upserts():
+        for n, student_id in enumerate(picks[:args.writes]):
+            client.table("marks").upsert({"student_id": student_id, "subject": f"subject-{n % args.subjects}",
+                                          "marks_obtained": n % 101, "total_marks": 100},
+                                         on_conflict="student_id,subject").execute()
+
+    results["single upserts/s"] = rate(args.writes, upserts)
+    return results
+
+
+def mixed_worker(path: str, student_ids: list, subjects: int, seconds: float, seed: int, counts):
+    client = SqliteDatabase(path)
+    rng = random.Random(seed)
+    operations = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        student_id = rng.choice(student_ids)
+        if rng.random() < 0.1:
+            client.table("marks").upsert({"student_id": student_id, "subject": f"subject-{rng.randrange(subjects)}",
+                                          "marks_obtained": rng.randrange(101), "total_marks": 100},
+                                         on_conflict="student_id,subject").execute()
+        else:
+            client.table("marks").select("*").eq("student_id", student_id).execute()
+        operations += 1
+    counts.put(operations)
+
+
+def mixed(path: str, student_ids: list, args, processes: int) -> float:
+    context = multiprocessing.get_context("spawn")
+    counts = context.Queue()
+    workers = [context.Process(target=mixed_worker,
+                               args=(path, student_ids, args.subjects, args.seconds, seed, counts))
+               for seed in range(processes)]
+    for worker in workers:
+        worker.start()
+    total = sum(counts.get() for _ in workers)
+    for worker in workers:
+        worker.join()
+    return total / args.seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--students", type=int, default=20000)
+    parser.add_argument("--subjects", type=int, default=8)
+    parser.add_argument("--batch", type=int, default=1000)
+    parser.add_argument("--reads", type=int, default=20000)
+    parser.add_argument("--writes", type=int, default=5000)
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    student_ids, users, marks = generate(args.students, args.subjects)
+    directory = tempfile.mkdtemp(prefix="sqlite-bench-")
+    path = os.path.join(directory, "campus.db")
+    try:
+        backends = {"mock": mock_database.supabase, "sqlite": SqliteDatabase(path)}
+        results = {name: run_backend(client, student_ids, users, marks, args) for name, client in backends.items()}
+        print(f"{'':20}" + "".join(f"{name:>12}" for name in results))
+        for metric in results["mock"]:
+            print(f"{metric:20}" + "".join(f"{results[name][metric]:12.0f}" for name in results))
+        backends["sqlite"].close()
+
+        for processes in sorted({1, args.processes}):
+            print(f"sqlite mixed 90/10, {processes} process(es): {mixed(path, student_ids, args, processes):.0f} ops/s")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
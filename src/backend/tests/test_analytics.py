@@ -0,0 +1,94 @@
+from array import array
+from functools import partial
+
+import pytest
+
+from app import analytics
+from app.async_database import AsyncClient
+from app.columnar_store import NULL_INT
+from app.sqlite_database import SqliteDatabase
+from app.table_versions import table_versions
+
+
+class Report:
+    """compute() for _cached, counting how often the report is built"""
+
+    def __init__(self):
+        self.computed = 0
+
+    async def __call__(self):
+        self.computed += 1
+        return {"computed": self.computed}
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(monkeypatch):
+    monkeypatch.setattr(analytics, "_reports", type(analytics._reports)())
+
+
+@pytest.mark.anyio
+async def test_report_is_rebuilt_after_another_process_writes(tmp_path, monkeypatch):
+    path = str(tmp_path / "campus.db")
+    first, second = SqliteDatabase(path).connect(), SqliteDatabase(path).connect()
+    monkeypatch.setattr(table_versions, "reader", partial(AsyncClient(first, 0).run, first.table_versions))
+    compute = Report()
+    try:
+        assert await analytics._cached("marks", (10,), "marks", compute) == {"computed": 1}
+        assert await analytics._cached("marks", (10,), "marks", compute) == {"computed": 1}
+
+        student = second.table("users").insert({"email": "alice@demo.com", "password": "", "role": "student",
+                                                "name": "Alice"}).execute().data[0]["id"]
+        second.table("marks").insert({"student_id": student, "subject": "Maths", "marks_obtained": 40,
+                                      "total_marks": 100}).execute()
+
+        assert await analytics._cached("marks", (10,), "marks", compute) == {"computed": 2}
+    finally:
+        first.close()
+        second.close()
+
+
+def expire(report_name: str):
+    """Move the expiry of the cached reports called report_name into the past"""
+    for key, (report, _) in list(analytics._reports.items()):
+        if key[0] == report_name:
+            analytics._reports[key] = (report, 0.0)
+
+
+@pytest.mark.anyio
+async def test_report_expires_when_versions_miss_outside_writes(monkeypatch):
+    monkeypatch.setattr(table_versions, "complete", False)
+    compute = Report()
+
+    await analytics._cached("attendance", (75.0,), "attendance", compute)
+    assert await analytics._cached("attendance", (75.0,), "attendance", compute) == {"computed": 1}
+    expire("attendance")
+    assert await analytics._cached("attendance", (75.0,), "attendance", compute) == {"computed": 2}
+
+
+@pytest.mark.anyio
+async def test_report_is_kept_while_complete_versions_are_unchanged():
+    compute = Report()
+
+    await analytics._cached("attendance", (75.0,), "attendance", compute)
+    expire("attendance")
+    assert await analytics._cached("attendance", (75.0,), "attendance", compute) == {"computed": 1}
+
+
+def test_overall_average_counts_the_same_rows_as_records():
+    columns = {
+        "subject": (array("I", [0, 0, 1, 1, 0, 0]), ["Maths", None]),
+        "student_id": (array("I", [0, 1, 0, 1, 1, 0]), ["s1", "s2"]),
+        "marks_obtained": array("i", [50, 100, 30, 90, NULL_INT, 10]),
+        "total_marks": array("i", [100, 100, 100, 100, 100, 0]),
+    }
+
+    report = analytics.marks_report(columns, 10)
+
+    # The unmarked row and the one out of 0 are skipped; rows without a subject still count
+    assert report["records"] == 4
+    assert report["average_percent"] == 67.5
+    assert report["subjects"][0] | {"percentiles": None} == {
+        "subject": "Maths", "records": 2, "average_percent": 75.0, "min_percent": 50.0, "max_percent": 100.0,
+        "percentiles": None}
+    assert report["top_students"] == [{"student_id": "s2", "average_percent": 95.0, "subjects": 2},
+                                      {"student_id": "s1", "average_percent": 40.0, "subjects": 2}]
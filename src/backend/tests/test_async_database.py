@@ -0,0 +1,86 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.async_database import AsyncClient, AsyncQuery
+from app.mock_database import supabase
+
+
+class Blocking:
+    """A blocking call that records how many copies of it run at once"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = 0
+        self.peak = 0
+        self.threads = set()
+
+    def __call__(self, value):
+        with self.lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+            self.threads.add(threading.get_ident())
+        time.sleep(0.02)
+        with self.lock:
+            self.running -= 1
+        return value
+
+
+@pytest.mark.anyio
+async def test_at_most_max_concurrency_calls_run_at_once():
+    client = AsyncClient(supabase, 3)
+    call = Blocking()
+
+    results = await asyncio.gather(*(client.run(call, n) for n in range(12)))
+
+    assert results == list(range(12))
+    assert call.peak == 3
+    assert threading.get_ident() not in call.threads
+
+
+@pytest.mark.anyio
+async def test_limit_follows_a_changed_setting():
+    client = AsyncClient(supabase, 2)
+    await client.run(Blocking(), None)
+    client.max_concurrency = 5
+    call = Blocking()
+
+    await asyncio.gather(*(client.run(call, n) for n in range(10)))
+
+    assert call.peak == 5
+
+
+@pytest.mark.anyio
+async def test_zero_concurrency_runs_inline():
+    call = Blocking()
+
+    assert await AsyncClient(supabase, 0).run(call, 1) == 1
+    assert call.threads == {threading.get_ident()}
+
+
+@pytest.mark.anyio
+async def test_event_loop_keeps_running_during_a_query():
+    client = AsyncClient(supabase, 1)
+    ticks = 0
+
+    async def tick():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.001)
+
+    ticker = asyncio.ensure_future(tick())
+    await client.run(time.sleep, 0.05)
+    ticker.cancel()
+
+    assert ticks > 5
+
+
+@pytest.mark.anyio
+async def test_chained_builder_calls_stay_awaitable():
+    query = AsyncClient(supabase, 2).table("users").select("email").eq("email", "teacher@demo.com")
+
+    assert isinstance(query, AsyncQuery)
+    assert (await query.execute()).data == [{"email": "teacher@demo.com"}]
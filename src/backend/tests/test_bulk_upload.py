@@ -0,0 +1,92 @@
+from uuid import uuid4
+
+import httpx
+import pytest
+
+from app.bulk_upload import iter_records
+from app.main import app
+from app.mock_database import MockTable
+
+pytestmark = pytest.mark.anyio
+
+FIELDS = ["student_id", "subject", "marks_obtained", "total_marks"]
+
+
+async def lines_of(text: str):
+    for number, line in enumerate(text.split("\n"), start=1):
+        yield number, line
+
+
+async def records(text: str, upload_format: str = "csv") -> list:
+    return [item async for item in iter_records(lines_of(text), upload_format, FIELDS)]
+
+
+async def test_quoted_csv_field_may_span_lines():
+    parsed = await records('student_id,subject,marks_obtained,total_marks\n'
+                           's1,"Physics\nlab ""A""",70,100\n'
+                           '\n'
+                           's2,Math,80,100')
+
+    assert parsed == [
+        (2, {"student_id": "s1", "subject": 'Physics\nlab "A"', "marks_obtained": "70", "total_marks": "100"}, None),
+        (5, {"student_id": "s2", "subject": "Math", "marks_obtained": "80", "total_marks": "100"}, None),
+    ]
+
+
+async def test_unterminated_quote_is_reported_at_its_first_line():
+    parsed = await records('student_id,subject,marks_obtained,total_marks\ns1,Math,70,100\ns2,"Math,80,100\ns3,Bio')
+
+    assert parsed[0][0] == 2
+    assert parsed[1] == (3, None, "unterminated quoted field")
+
+
+async def test_field_count_mismatch_is_reported():
+    parsed = await records("student_id,subject,marks_obtained,total_marks\ns1,Math,70")
+
+    assert parsed == [(2, None, "expected 4 fields, got 3")]
+
+
+async def test_database_rejection_reports_only_the_bad_row():
+    students = [str(uuid4()) for _ in range(3)]
+    body = ("student_id,subject,marks_obtained,total_marks\n"
+            f'{students[0]},"Lab\nwork",70,100\n'
+            f"{students[1]},Math,{2 ** 40},100\n"
+            f"{students[2]},Math,90,100\n")
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        login = await client.post("/auth/login", json={"email": "teacher@demo.com", "password": "admin123"})
+        headers = {"Authorization": f"Bearer {login.json()['access_token']}", "Content-Type": "text/csv"}
+        response = await client.post("/teacher/marks/bulk", headers=headers, content=body)
+
+    assert response.status_code == 200
+    report = response.json()
+    assert (report["received"], report["upserted"], report["failed"]) == (3, 2, 1)
+    assert report["errors"] == [{"line": 4, "errors": ["not saved: integer out of range"]}]
+    saved = MockTable("marks").select("student_id,subject").in_("student_id", students).execute().data
+    assert sorted(saved, key=lambda row: students.index(row["student_id"])) == [
+        {"student_id": students[0], "subject": "Lab\nwork"},
+        {"student_id": students[2], "subject": "Math"},
+    ]
+    # Only the students whose rows were saved are notified, once each
+    notified = MockTable("notifications").select("student_id,message").in_("student_id", students).execute().data
+    assert sorted(notified, key=lambda row: students.index(row["student_id"])) == [
+        {"student_id": students[0], "message": "Your marks were updated"},
+        {"student_id": students[2], "message": "Your marks were updated"},
+    ]
+
+
+async def test_attendance_upload_notifies_each_student_once():
+    student = str(uuid4())
+    body = "".join(f'{{"student_id": "{student}", "subject": "{subject}", "present_days": 8, "total_days": 10}}\n'
+                   for subject in ("Math", "Physics"))
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        login = await client.post("/auth/login", json={"email": "teacher@demo.com", "password": "admin123"})
+        headers = {"Authorization": f"Bearer {login.json()['access_token']}", "Content-Type": "application/x-ndjson"}
+        response = await client.post("/teacher/attendance/bulk", headers=headers, content=body)
+
+    assert response.json()["upserted"] == 2
+    notified = MockTable("notifications").select("message").eq("student_id", student).execute().data
+    assert notified == [{"message": "Your attendance was updated"}]
@@ -0,0 +1,127 @@
+from uuid import uuid4
+
+import httpx
+import pytest
+from postgrest.exceptions import APIError
+
+from app.columnar_store import ColumnarTable
+from app.main import app
+from app.mock_database import COLUMNAR_TABLES, MockTable
+
+MARKS = COLUMNAR_TABLES["marks"]
+
+
+def marks_table():
+    return ColumnarTable("marks", MARKS, indexed=["student_id"], unique=[("student_id", "subject")])
+
+
+def buffer_lengths(table):
+    lengths = {"id": len(table.ids.hi)}
+    for name, column in table.columns.items():
+        lengths[name] = len(column.data if hasattr(column, "data") else column.codes)
+    return lengths
+
+
+def test_out_of_range_insert_leaves_table_unchanged():
+    table = marks_table()
+    table.insert([{"student_id": "s0", "subject": "Bio", "marks_obtained": 70, "total_marks": 100}])
+
+    with pytest.raises(APIError) as raised:
+        table.insert([{"student_id": "s1", "subject": "Math", "marks_obtained": 2 ** 40, "total_marks": 100}])
+
+    assert raised.value.code == "22003"
+    assert len(table) == 1
+    assert set(buffer_lengths(table).values()) == {1}
+    [row] = table.insert([{"student_id": "s2", "subject": "Chem", "marks_obtained": 80, "total_marks": 100}])
+    assert (row["student_id"], row["subject"], row["marks_obtained"]) == ("s2", "Chem", 80)
+    assert table.find(("student_id", "subject"), ("s1", "Math")) is None
+
+
+def test_bad_row_rejects_the_whole_batch():
+    table = marks_table()
+
+    with pytest.raises(APIError) as raised:
+        table.insert([
+            {"student_id": "s1", "subject": "Math", "marks_obtained": 90, "total_marks": 100},
+            {"student_id": "s2", "subject": "Math", "marks_obtained": "ninety", "total_marks": 100},
+        ])
+
+    assert raised.value.code == "22P02"
+    assert len(table) == 0
+    assert set(buffer_lengths(table).values()) == {0}
+
+
+def test_int_range_bounds():
+    table = marks_table()
+    table.insert([{"student_id": "s1", "subject": "Math", "marks_obtained": 2 ** 31 - 1, "total_marks": None}])
+
+    with pytest.raises(APIError):
+        table.insert([{"student_id": "s2", "subject": "Math", "marks_obtained": 2 ** 31, "total_marks": 100}])
+    # The lowest INTEGER is the NULL marker here
+    with pytest.raises(APIError):
+        table.insert([{"student_id": "s2", "subject": "Math", "marks_obtained": -2 ** 31, "total_marks": 100}])
+    assert table.row(0)["marks_obtained"] == 2 ** 31 - 1
+    assert table.row(0)["total_marks"] is None
+
+
+def test_reserved_null_value_and_bools_are_rejected():
+    table = marks_table()
+    table.insert([{"student_id": "s1", "subject": "Math", "marks_obtained": -2 ** 31 + 1, "total_marks": 100}])
+
+    with pytest.raises(APIError) as reserved:
+        table.insert([{"student_id": "s2", "subject": "Math", "marks_obtained": -2 ** 31, "total_marks": 100}])
+    assert reserved.value.code == "22003"
+    for flag in (True, False):
+        with pytest.raises(APIError) as error:
+            table.insert([{"student_id": "s2", "subject": "Math", "marks_obtained": flag, "total_marks": 100}])
+        assert error.value.code == "22P02"
+        with pytest.raises(APIError):
+            table.update([table.row(0)], {"total_marks": flag})
+    assert len(table) == 1
+    assert table.row(0)["marks_obtained"] == -2 ** 31 + 1
+    assert table.row(0)["total_marks"] == 100
+
+
+def test_out_of_range_update_changes_no_field():
+    table = marks_table()
+    [row] = table.insert([{"student_id": "s1", "subject": "Math", "marks_obtained": 70, "total_marks": 100}])
+
+    with pytest.raises(APIError):
+        table.update([row], {"subject": "Chem", "marks_obtained": 2 ** 40})
+
+    assert table.row(0) == row
+
+
+def test_upsert_is_all_or_nothing():
+    student_id = str(uuid4())
+    MockTable("marks").insert({"student_id": student_id, "subject": "Math", "marks_obtained": 50,
+                               "total_marks": 100}).execute()
+
+    with pytest.raises(APIError):
+        MockTable("marks").upsert([
+            {"student_id": student_id, "subject": "Math", "marks_obtained": 60, "total_marks": 100},
+            {"student_id": student_id, "subject": "Chem", "marks_obtained": 2 ** 40, "total_marks": 100},
+        ], on_conflict="student_id,subject").execute()
+
+    rows = MockTable("marks").select("subject,marks_obtained").eq("student_id", student_id).execute().data
+    assert rows == [{"subject": "Math", "marks_obtained": 50}]
+
+
+@pytest.mark.anyio
+async def test_api_rejects_out_of_range_marks_and_keeps_serving():
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        login = await client.post("/auth/login", json={"email": "teacher@demo.com", "password": "admin123"})
+        headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+        first, second = str(uuid4()), str(uuid4())
+
+        rejected = await client.post("/teacher/marks", headers=headers, json={
+            "student_id": first, "subject": "Math", "marks_obtained": 2 ** 40, "total_marks": 100})
+        stored = await client.post("/teacher/marks", headers=headers, json={
+            "student_id": second, "subject": "Chem", "marks_obtained": 80, "total_marks": 100})
+
+    assert rejected.status_code == 400
+    assert rejected.json()["detail"] == "integer out of range"
+    assert stored.status_code == 200
+    data = stored.json()["data"]
+    assert (data["student_id"], data["subject"], data["marks_obtained"]) == (second, "Chem", 80)
@@ -0,0 +1,84 @@
+import httpx
+import pytest
+
+from app.config import settings
+from app.main import app
+from app.mock_database import MockTable
+
+
+async def login(client, email: str) -> tuple:
+    response = await client.post("/auth/login", json={"email": email, "password": "admin123"})
+    return response.json()["user"]["id"], {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.fixture
+async def client():
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+
+
+def add_mark(student: str, subject: str) -> str:
+    return MockTable("marks").insert({"student_id": student, "subject": subject, "marks_obtained": 40,
+                                      "total_marks": 100}).execute().data[0]["id"]
+
+
+@pytest.mark.anyio
+async def test_unchanged_data_is_answered_with_304(client):
+    _, headers = await login(client, "student@demo.com")
+    response = await client.get("/student/marks", headers=headers)
+    etag = response.headers["ETag"]
+
+    for if_none_match in (etag, f"W/{etag}", f'"other", {etag}', "*"):
+        again = await client.get("/student/marks", headers={**headers, "If-None-Match": if_none_match})
+        assert again.status_code == 304
+        assert again.content == b""
+        assert again.headers["ETag"] == etag
+        assert again.headers["Cache-Control"] == "private, no-cache"
+    stale = await client.get("/student/marks", headers={**headers, "If-None-Match": '"other"'})
+    assert stale.status_code == 200
+    assert stale.json() == response.json()
+
+
+@pytest.mark.anyio
+async def test_etag_changes_with_the_students_own_rows_only(client):
+    student, headers = await login(client, "student@demo.com")
+    etag = (await client.get("/student/marks", headers=headers)).headers["ETag"]
+
+    # Another student's mark leaves this student's version alone
+    mark = add_mark("22222222-2222-4222-8222-222222222222", "Conditional")
+    MockTable("marks").delete().eq("id", mark).execute()
+    assert (await client.get("/student/marks", headers={**headers, "If-None-Match": etag})).status_code == 304
+
+    mark = add_mark(student, "Conditional")
+    try:
+        response = await client.get("/student/marks", headers={**headers, "If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+        assert "Conditional" in {row["subject"] for row in response.json()}
+    finally:
+        MockTable("marks").delete().eq("id", mark).execute()
+
+
+@pytest.mark.anyio
+async def test_etag_depends_on_the_query_string(client):
+    _, headers = await login(client, "student@demo.com")
+
+    first = await client.get("/student/notifications", params={"limit": 5}, headers=headers)
+    second = await client.get("/student/notifications", params={"limit": 6}, headers=headers)
+
+    assert first.headers["ETag"] != second.headers["ETag"]
+    response = await client.get("/student/notifications", params={"limit": 6},
+                                headers={**headers, "If-None-Match": first.headers["ETag"]})
+    assert response.status_code == 200
+
+
+@pytest.mark.anyio
+async def test_no_etag_when_disabled(client, monkeypatch):
+    monkeypatch.setattr(settings, "CONDITIONAL_GET", False)
+    _, headers = await login(client, "student@demo.com")
+
+    response = await client.get("/student/marks", headers={**headers, "If-None-Match": "*"})
+
+    assert response.status_code == 200
+    assert "ETag" not in response.headers
@@ -0,0 +1,118 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.config import settings
+from app.dataloader import BatchLoader, Loaders, load_grouped
+
+ROWS = [{"id": n, "student_id": f"s{n % 7}", "read": n % 2 == 0} for n in range(40)]
+
+
+class Query:
+    """Just enough of an async query builder: select, in_, eq and an awaitable execute()"""
+
+    def __init__(self, client):
+        self.client = client
+        self.filters = []
+
+    def select(self, columns):
+        return self
+
+    def in_(self, column, values):
+        self.client.batches.append(list(values))
+        self.filters.append((column, set(values)))
+        return self
+
+    def eq(self, column, value):
+        self.filters.append((column, {value}))
+        return self
+
+    async def execute(self):
+        await asyncio.sleep(0)
+        if self.client.error is not None:
+            raise self.client.error
+        return SimpleNamespace(data=[row for row in ROWS
+                                     if all(row[column] in values for column, values in self.filters)])
+
+
+class Client:
+    def __init__(self, error=None):
+        self.batches = []
+        self.error = error
+
+    def table(self, table_name):
+        return Query(self)
+
+
+def expected(key, **filters) -> list:
+    return [row for row in ROWS if row["student_id"] == key and all(row[c] == v for c, v in filters.items())]
+
+
+@pytest.mark.anyio
+async def test_loads_in_one_tick_share_one_query():
+    client = Client()
+    loader = BatchLoader(client, "notifications", "student_id")
+
+    results = await asyncio.gather(*(loader.load(f"s{n}") for n in (1, 2, 1, 3, 9)))
+
+    assert client.batches == [["s1", "s2", "s3", "s9"]]
+    assert results == [expected("s1"), expected("s2"), expected("s1"), expected("s3"), []]
+    # Answered keys come from the cache; new ones make the next batch
+    assert await loader.load_many(["s2", "s4"]) == expected("s2") + expected("s4")
+    assert client.batches[1:] == [["s4"]]
+
+
+@pytest.mark.anyio
+async def test_large_batches_are_split_at_max_keys(monkeypatch):
+    monkeypatch.setattr(settings, "BATCH_LOAD_MAX_KEYS", 3)
+    client = Client()
+    loader = Loaders(client).get("notifications", "student_id", read=True)
+
+    rows = await loader.load_many([f"s{n}" for n in range(7)])
+
+    assert client.batches == [["s0", "s1", "s2"], ["s3", "s4", "s5"], ["s6"]]
+    assert rows == [row for n in range(7) for row in expected(f"s{n}", read=True)]
+
+
+def test_load_grouped_splits_at_max_keys(monkeypatch):
+    monkeypatch.setattr(settings, "BATCH_LOAD_MAX_KEYS", 2)
+    calls = []
+
+    class SyncQuery(Query):
+        def execute(self):
+            return SimpleNamespace(data=[row for row in ROWS
+                                         if all(row[column] in values for column, values in self.filters)])
+
+    client = SimpleNamespace(batches=calls, table=lambda table_name: SyncQuery(client))
+
+    grouped = load_grouped(client, "notifications", "student_id", ["s1", "s2", "s1", "s3"])
+
+    assert calls == [["s1", "s2"], ["s3"]]
+    assert grouped == {key: expected(key) for key in ("s1", "s2", "s3")}
+
+
+@pytest.mark.anyio
+async def test_a_failed_query_fails_every_waiter_and_the_next_batch_runs():
+    client = Client(error=RuntimeError("database down"))
+    loader = BatchLoader(client, "notifications", "student_id")
+
+    results = await asyncio.gather(loader.load("s1"), loader.load("s2"), return_exceptions=True)
+
+    assert [str(result) for result in results] == ["database down", "database down"]
+    client.error = None
+    assert await loader.load("s1") == expected("s1")
+
+
+@pytest.mark.anyio
+async def test_a_cancelled_dispatch_cancels_its_waiters():
+    loader = BatchLoader(Client(), "notifications", "student_id")
+    waiter = asyncio.ensure_future(loader.load("s1"))
+    await asyncio.sleep(0)
+
+    loader._task.cancel()
+
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    assert loader.pending == {}
+    assert await loader.load("s1") == expected("s1")
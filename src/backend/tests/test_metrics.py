@@ -0,0 +1,86 @@
+import logging
+import re
+
+import httpx
+import pytest
+
+from app.config import settings
+from app.main import app
+from app.metrics import Histogram, REGISTRY
+
+MISSING = "5b1d5c9e-8c0a-4f5e-9a44-3f1c2b6d7e80"
+
+
+def samples(text: str) -> dict:
+    """Exposition lines as {name{labels}: value}"""
+    values = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            values[name] = float(value)
+    return values
+
+
+@pytest.mark.anyio
+async def test_requests_are_labelled_by_route_template():
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        login = await client.post("/auth/login", json={"email": "teacher@demo.com", "password": "admin123"})
+        headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+        before = samples((await client.get("/metrics")).text)
+        for _ in range(2):
+            assert (await client.get(f"/teacher/assignments/{MISSING}", headers=headers)).status_code == 404
+        await client.get("/no/such/path")
+        response = await client.get("/metrics")
+
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    # Ids stay out of the labels
+    assert MISSING not in response.text
+    after = samples(response.text)
+
+    def delta(name: str) -> float:
+        return after.get(name, 0) - before.get(name, 0)
+
+    route = 'method="GET",route="/teacher/assignments/{assignment_id}"'
+    assert delta(f'http_requests_total{{{route},status="404"}}') == 2
+    assert delta(f"http_request_db_queries_count{{{route}}}") == 2
+    # Queries made inside a request are counted against its route
+    assert delta(f"http_request_db_queries_sum{{{route}}}") >= 2
+    assert delta('http_requests_total{method="GET",route="unmatched",status="404"}') == 1
+    assert delta('db_queries_total{table="assignments",operation="select"}') >= 2
+    assert after["http_requests_in_flight"] == 1
+
+
+def test_every_metric_has_help_and_type_lines():
+    headers = "\n".join(line for metric in REGISTRY for line in metric.header())
+
+    assert len(re.findall(r"^# HELP ", headers, re.M)) == len(REGISTRY)
+    assert len(re.findall(r"^# TYPE \w+ (counter|gauge|histogram)$", headers, re.M)) == len(REGISTRY)
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("test_seconds", "Test", ("route",), buckets=(0.1, 1.0))
+    REGISTRY.remove(histogram)
+    for value in (0.05, 0.5, 0.7, 3.0):
+        histogram.observe(value, "/x")
+
+    assert histogram.render()[2:] == [
+        'test_seconds_bucket{route="/x",le="0.1"} 1',
+        'test_seconds_bucket{route="/x",le="1.0"} 3',
+        'test_seconds_bucket{route="/x",le="+Inf"} 4',
+        'test_seconds_sum{route="/x"} 4.25',
+        'test_seconds_count{route="/x"} 4',
+    ]
+
+
+@pytest.mark.anyio
+async def test_slow_queries_are_logged_without_values(monkeypatch, caplog):
+    monkeypatch.setattr(settings, "SLOW_QUERY_LOG_MS", 0.000001)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        with caplog.at_level(logging.WARNING, logger="app.slow_query"):
+            await client.post("/auth/login", json={"email": "teacher@demo.com", "password": "admin123"})
+
+    messages = [record.getMessage() for record in caplog.records if record.name == "app.slow_query"]
+    assert any("select on users: eq(email)" in message for message in messages)
+    assert not any("teacher@demo.com" in message for message in messages)
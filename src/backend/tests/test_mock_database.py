@@ -0,0 +1,390 @@
+import random
+from datetime import date, timedelta
+from uuid import UUID, uuid4
+
+import httpx
+import pytest
+from postgrest.exceptions import APIError
+
+from app.config import settings
+from app.main import app
+from app.mock_database import HashIndex, MockStore, MockTable, empty_table, get_store, mock_data
+from app.query_filters import FILTERS, sort_key
+
+
+@pytest.fixture
+def tables(monkeypatch):
+    """Empty dict-row tables for one test; the demo data comes back afterwards"""
+    for table_name in ("assignments", "student_assignments"):
+        monkeypatch.setitem(mock_data, table_name, [])
+
+
+def scan(table_name: str, filters: list) -> list:
+    """What the indexes must give: every row checked against every filter"""
+    return [row for row in mock_data[table_name]
+            if all(FILTERS[op](row.get(column), value) for op, column, value in filters)]
+
+
+def ids(rows) -> set:
+    return {row["id"] for row in rows}
+
+
+def check_lookups(students: list, assignments: list):
+    """eq, in_ and composite lookups on student_assignments agree with a full scan"""
+    for student in students:
+        filters = [("eq", "student_id", student)]
+        assert ids(MockTable("student_assignments").select("*").eq("student_id", student).execute().data) == \
+            ids(scan("student_assignments", filters))
+    for assignment in assignments:
+        assert ids(MockTable("student_assignments").select("*").eq("assignment_id", assignment).execute().data) == \
+            ids(scan("student_assignments", [("eq", "assignment_id", assignment)]))
+        for student in students:
+            query = MockTable("student_assignments").select("*").eq("assignment_id", assignment).eq("student_id", student)
+            assert ids(query.execute().data) == \
+                ids(scan("student_assignments", [("eq", "assignment_id", assignment), ("eq", "student_id", student)]))
+    some = frozenset(students[::2])
+    assert ids(MockTable("student_assignments").select("*").in_("student_id", some).execute().data) == \
+        ids(scan("student_assignments", [("in", "student_id", some)]))
+    # Every row sits in exactly one bucket of each index, so no index holds a stale copy
+    store = get_store("student_assignments")
+    for index in store.indexes.values():
+        assert sum(len(bucket) for bucket in index.buckets.values()) == len(store.rows)
+        assert all(index.key(row) == key for key, bucket in index.buckets.items() for row in bucket.values())
+
+
+def test_indexes_follow_inserts_updates_and_deletes(tables):
+    rng = random.Random(7)
+    students = [str(uuid4()) for _ in range(8)]
+    assignments = [str(uuid4()) for _ in range(5)]
+    MockTable("student_assignments").insert([
+        {"assignment_id": assignment, "student_id": student, "submitted": False}
+        for assignment in assignments for student in students if rng.random() < 0.7
+    ]).execute()
+    check_lookups(students, assignments)
+
+    # An indexed column changes: the rows move to another student's buckets
+    moved = str(uuid4())
+    students.append(moved)
+    MockTable("student_assignments").update({"student_id": moved}).eq("student_id", students[0]).execute()
+    check_lookups(students, assignments)
+    assert MockTable("student_assignments").select("*").eq("student_id", students[0]).execute().data == []
+
+    # Part of the composite key changes on one row
+    row = MockTable("student_assignments").select("*").eq("student_id", students[1]).limit(1).execute().data[0]
+    free = next(assignment for assignment in assignments
+                if not scan("student_assignments", [("eq", "assignment_id", assignment),
+                                                    ("eq", "student_id", students[1])]))
+    MockTable("student_assignments").update({"assignment_id": free}).eq("id", row["id"]).execute()
+    check_lookups(students, assignments)
+
+    # An unindexed column changes: the indexes are left alone
+    MockTable("student_assignments").update({"submitted": True}).eq("assignment_id", assignments[2]).execute()
+    check_lookups(students, assignments)
+
+    MockTable("student_assignments").delete().eq("assignment_id", assignments[3]).execute()
+    MockTable("student_assignments").delete().in_("student_id", [students[4], students[5]]).execute()
+    check_lookups(students, assignments)
+    assert not scan("student_assignments", [("eq", "assignment_id", assignments[3])])
+
+
+def test_unique_index_follows_a_moved_key(tables):
+    student, other, assignment = str(uuid4()), str(uuid4()), str(uuid4())
+    MockTable("student_assignments").insert({"assignment_id": assignment, "student_id": student}).execute()
+    MockTable("student_assignments").update({"student_id": other}).eq("student_id", student).execute()
+
+    # The old key is free again and the new one is taken
+    MockTable("student_assignments").insert({"assignment_id": assignment, "student_id": student}).execute()
+    with pytest.raises(APIError) as duplicate:
+        MockTable("student_assignments").insert({"assignment_id": assignment, "student_id": other}).execute()
+    assert duplicate.value.code == "23505"
+    assert len(mock_data["student_assignments"]) == 2
+
+
+def test_hash_index_keeps_equal_rows_apart():
+    index = HashIndex(("student_id",))
+    first, second = {"student_id": "s1"}, {"student_id": "s1"}
+    index.add_many([first, second])
+
+    index.remove(first)
+
+    assert index.lookup(("s1",)) == [second]
+    assert index.lookup(("s1",))[0] is second
+
+
+TEACHERS = ("t1", "t2", "t3")
+
+
+@pytest.fixture
+def assignments(tables):
+    """300 assignments, one per day, split between three teachers"""
+    start = date(2024, 1, 1)
+    order = list(range(300))
+    random.Random(3).shuffle(order)
+    MockTable("assignments").insert([
+        {"title": f"Assignment {day}", "created_by": TEACHERS[day % 3],
+         "due_date": (start + timedelta(days=day)).isoformat()}
+        for day in order
+    ]).execute()
+
+
+def day(number: int) -> str:
+    return (date(2024, 1, 1) + timedelta(days=number)).isoformat()
+
+
+def plan(table_name: str, filters: list):
+    return get_store(table_name).best_plan(filters)[1]
+
+
+@pytest.mark.parametrize("filters, index_columns, method", [
+    # A teacher's 100 rows beat 250 due dates
+    ([("eq", "created_by", "t1"), ("gte", "due_date", day(50))], ("created_by",), "lookup"),
+    ([("in", "created_by", ("t2", "t3")), ("neq", "title", "Assignment 4")], ("created_by",), "lookup_many"),
+    # Ten due dates beat a teacher's 100 rows
+    ([("eq", "created_by", "t1"), ("gt", "due_date", day(20)), ("lt", "due_date", day(31))], "due_date", "scan"),
+    ([("lte", "due_date", day(4))], "due_date", "scan"),
+    ([("neq", "created_by", "t1")], None, None),
+])
+def test_best_plan_picks_the_cheapest_index(assignments, filters, index_columns, method):
+    store = get_store("assignments")
+    chosen = plan("assignments", filters)
+
+    if method is None:
+        assert chosen() is store.rows
+    else:
+        index = store.sorted_indexes[index_columns] if method == "scan" else store.indexes[index_columns]
+        assert chosen.func.__name__ == method
+        assert chosen.func.__self__ is index
+    query = MockTable("assignments").select("*")
+    for op, column, value in filters:
+        query = getattr(query, "in_" if op == "in" else op)(column, value)
+    assert ids(query.execute().data) == ids(scan("assignments", filters))
+
+
+def test_composite_unique_index_beats_single_column_indexes(tables):
+    student, assignment = str(uuid4()), str(uuid4())
+    MockTable("student_assignments").insert(
+        [{"assignment_id": assignment, "student_id": str(uuid4())} for _ in range(5)]
+        + [{"assignment_id": str(uuid4()), "student_id": student} for _ in range(5)]
+        + [{"assignment_id": assignment, "student_id": student}]
+    ).execute()
+    filters = [("eq", "student_id", student), ("eq", "assignment_id", assignment)]
+
+    chosen = plan("student_assignments", filters)
+
+    assert chosen.func.__self__ is get_store("student_assignments").indexes[("assignment_id", "student_id")]
+    assert chosen() == scan("student_assignments", filters)
+
+
+def expected(filters: list, desc: bool, offset: int, limit: int) -> list:
+    rows = sorted(scan("assignments", filters), key=lambda row: sort_key(row.get("due_date")), reverse=desc)
+    return [row["id"] for row in rows[offset:offset + limit]]
+
+
+@pytest.mark.parametrize("desc", [False, True])
+@pytest.mark.parametrize("filters", [
+    [],
+    [("gt", "due_date", day(100)), ("lt", "due_date", day(200))],
+    [("eq", "created_by", "t2"), ("gte", "due_date", day(30))],
+    [("neq", "created_by", "t3"), ("lte", "due_date", day(120))],
+])
+def test_ordered_limits_match_a_sorted_scan(assignments, monkeypatch, filters, desc):
+    store = get_store("assignments")
+    presorted = []
+    ordered_candidates = store.ordered_candidates
+    monkeypatch.setattr(store, "ordered_candidates",
+                        lambda *args: presorted.append(ordered_candidates(*args)) or presorted[-1])
+
+    def query():
+        query = MockTable("assignments").select("*").order("due_date", desc=desc)
+        for op, column, value in filters:
+            getattr(query, op)(column, value)
+        return query
+
+    assert [row["id"] for row in query().limit(7).execute().data] == expected(filters, desc, 0, 7)
+    assert [row["id"] for row in query().range(5, 14).execute().data] == expected(filters, desc, 5, 10)
+    assert [row["id"] for row in query().execute().data] == expected(filters, desc, 0, 300)
+    # The index supplies rows in order for the limited queries; the unlimited one sorts
+    assert len(presorted) == 2 and None not in presorted
+
+
+def test_null_due_dates_fall_back_to_sorting(assignments, monkeypatch):
+    MockTable("assignments").insert([{"title": "Undated", "created_by": "t1", "due_date": None}]).execute()
+    store = get_store("assignments")
+    presorted = []
+    ordered_candidates = store.ordered_candidates
+    monkeypatch.setattr(store, "ordered_candidates",
+                        lambda *args: presorted.append(ordered_candidates(*args)) or presorted[-1])
+
+    for desc in (False, True):
+        rows = MockTable("assignments").select("*").order("due_date", desc=desc).limit(3).execute().data
+        assert [row["id"] for row in rows] == expected([], desc, 0, 3)
+    # The index leaves out NULLs, so it cannot supply the rows in order
+    assert presorted == [None, None]
+    # NULLs sort last ascending and first descending, as in Postgres
+    assert MockTable("assignments").select("*").order("due_date", desc=True).limit(1).execute().data[0]["title"] == \
+        "Undated"
+
+
+STUDENT = "11111111-1111-4111-8111-111111111111"
+
+
+@pytest.fixture(params=["columnar", "rows"])
+def marks(request, monkeypatch):
+    """An empty marks table in either storage layout"""
+    monkeypatch.setattr(settings, "MOCK_COLUMNAR_STORAGE", request.param == "columnar")
+    monkeypatch.setitem(mock_data, "marks", empty_table("marks"))
+
+
+def mark(subject: str, obtained: int, **extra) -> dict:
+    return {"student_id": STUDENT, "subject": subject, "marks_obtained": obtained, "total_marks": 100, **extra}
+
+
+def upsert(records, **options):
+    return MockTable("marks").upsert(records, on_conflict="student_id,subject", **options).execute().data
+
+
+def stored() -> dict:
+    return {row["subject"]: row["marks_obtained"] for row in mock_data["marks"]}
+
+
+def test_upsert_inserts_then_updates_on_conflict(marks):
+    inserted = upsert([mark("Maths", 40), mark("Physics", 55)])
+    assert stored() == {"Maths": 40, "Physics": 55}
+
+    updated = upsert([mark("Maths", 62), mark("Chemistry", 70)])
+
+    assert stored() == {"Maths": 62, "Physics": 55, "Chemistry": 70}
+    # The conflicting row is updated in place and keeps its id
+    maths = next(row for row in updated if row["subject"] == "Maths")
+    assert maths["id"] == next(row["id"] for row in inserted if row["subject"] == "Maths")
+    assert len(mock_data["marks"]) == 3
+
+
+def test_upsert_ignoring_duplicates_leaves_existing_rows(marks):
+    upsert([mark("Maths", 40)])
+
+    written = upsert([mark("Maths", 99), mark("Physics", 55)], ignore_duplicates=True)
+
+    assert [row["subject"] for row in written] == ["Physics"]
+    assert stored() == {"Maths": 40, "Physics": 55}
+
+
+def test_upsert_rejects_duplicates_within_one_batch(marks):
+    upsert([mark("Maths", 40)])
+
+    with pytest.raises(APIError) as error:
+        upsert([mark("Physics", 55), mark("Maths", 60), mark("Maths", 70)])
+
+    assert error.value.code == "21000"
+    assert stored() == {"Maths": 40}
+    # DO NOTHING keeps the first of the batch's duplicates and skips the rest
+    upsert([mark("Physics", 55), mark("Physics", 70)], ignore_duplicates=True)
+    assert stored() == {"Maths": 40, "Physics": 55}
+
+
+def test_upsert_on_another_key_raises_unique_violation(marks):
+    maths = upsert([mark("Maths", 40)])[0]
+    physics = upsert([mark("Physics", 55)])[0]
+
+    # A new id, but the (student_id, subject) of an existing row
+    with pytest.raises(APIError) as error:
+        MockTable("marks").upsert([mark("Chemistry", 70), mark("Maths", 80, id=str(uuid4()))]).execute()
+    assert error.value.code == "23505"
+    # An existing id updated onto another row's (student_id, subject)
+    with pytest.raises(APIError) as error:
+        MockTable("marks").upsert(mark("Maths", 80, id=physics["id"])).execute()
+    assert error.value.code == "23505"
+
+    assert stored() == {"Maths": 40, "Physics": 55}
+    assert {row["id"] for row in mock_data["marks"]} == {maths["id"], physics["id"]}
+
+
+def test_upsert_needs_a_matching_constraint(marks):
+    with pytest.raises(APIError) as error:
+        MockTable("marks").upsert(mark("Maths", 40), on_conflict="subject").execute()
+
+    assert error.value.code == "42P10"
+    assert stored() == {}
+
+
+def test_query_pipeline_orders_pages_and_filters_like_postgrest(assignments):
+    MockTable("assignments").insert([{"title": "Unowned", "created_by": None, "due_date": day(n)}
+                                     for n in (3, 150)]).execute()
+    rows = scan("assignments", [("neq", "created_by", "t2")])
+    rows.sort(key=lambda row: sort_key(row["due_date"]), reverse=True)
+    rows.sort(key=lambda row: sort_key(row["created_by"]))
+
+    query = MockTable("assignments").select("id, created_by").neq("created_by", "t2")
+    page = query.order("created_by").order("due_date", desc=True).range(95, 104).execute().data
+
+    # neq leaves out NULLs; the second order() breaks ties within a teacher
+    assert [row["id"] for row in page] == [row["id"] for row in rows[95:105]]
+    assert {row["created_by"] for row in page} == {"t1", "t3"}
+    assert all(set(row) == {"id", "created_by"} for row in page)
+    assert len(MockTable("assignments").select("id").neq("created_by", "t2").execute().data) == 200
+    # execute() resets the builder for the next statement
+    assert len(query.select("*").execute().data) == 302
+
+
+def test_range_past_the_end_is_empty(assignments):
+    assert MockTable("assignments").select("*").order("due_date").range(300, 309).execute().data == []
+    assert len(MockTable("assignments").select("*").order("due_date").range(295, 309).execute().data) == 5
+
+
+def test_bulk_insert_fills_ids_and_one_created_at(tables):
+    given = str(uuid4())
+    rows = [{"title": f"Assignment {n}", "created_by": "t1", "due_date": day(n % 40) if n % 5 else None}
+            for n in range(100)]
+    rows[0]["id"] = given
+    rows[1]["created_at"] = "2024-01-01T00:00:00"
+
+    inserted = MockTable("assignments").insert(rows).execute().data
+
+    assert inserted[0]["id"] == given
+    assert len({row["id"] for row in inserted}) == 100
+    assert all(UUID(row["id"]).version == 4 for row in inserted[1:])
+    assert inserted[1]["created_at"] == "2024-01-01T00:00:00"
+    assert len({row["created_at"] for row in inserted[2:]}) == 1
+    # A large batch is merged into the sorted index in one sort, leaving out NULLs
+    index = get_store("assignments").sorted_indexes["due_date"]
+    assert index.keys == sorted(row["due_date"] for row in inserted if row["due_date"] is not None)
+    assert all(record["due_date"] == key for key, record in zip(index.keys, index.records))
+
+
+def test_minimal_insert_returns_nothing_but_stores_the_rows(tables):
+    rows = [{"assignment_id": str(uuid4()), "student_id": str(uuid4())} for _ in range(3)]
+
+    assert MockTable("student_assignments").insert(rows, returning="minimal").execute().data == []
+    assert len(mock_data["student_assignments"]) == 3
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("threshold", [0, 1000])
+async def test_assignment_fans_out_in_batches(tables, monkeypatch, threshold):
+    students = [{"id": str(uuid4()), "email": f"s{n}@demo.com", "password": "", "role": "student",
+                 "name": f"Student {n}"} for n in range(5)]
+    monkeypatch.setitem(mock_data, "users", mock_data["users"] + students)
+    monkeypatch.setitem(mock_data, "notifications", [])
+    monkeypatch.setattr(settings, "ASSIGNMENT_FANOUT_BATCH_SIZE", 2)
+    # Below the threshold the fan-out runs in the request, above it in a background task
+    monkeypatch.setattr(settings, "ASSIGNMENT_FANOUT_BACKGROUND_THRESHOLD", threshold)
+    batches = []
+    insert = MockStore.insert
+    monkeypatch.setattr(MockStore, "insert", lambda store, records, *args, **kwargs: (
+        batches.append((store.table_name, len(records))) or insert(store, records, *args, **kwargs)))
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        login = await client.post("/auth/login", json={"email": "teacher@demo.com", "password": "admin123"})
+        headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+        response = await client.post("/teacher/assignments", headers=headers, json={
+            "title": "Essay", "description": "Two pages", "due_date": "2030-01-01"})
+    assert response.status_code == 200
+
+    everyone = {row["id"] for row in mock_data["users"] if row["role"] == "student"}
+    assignment = response.json()["id"]
+    assert {row["student_id"] for row in scan("student_assignments", [("eq", "assignment_id", assignment)])} == \
+        everyone
+    assert {row["student_id"] for row in mock_data["notifications"]} == everyone
+    sizes = [size for table_name, size in batches if table_name == "student_assignments"]
+    assert sum(sizes) == len(everyone) and max(sizes) == 2
@@ -0,0 +1,144 @@
+import threading
+
+import pytest
+
+from app.columnar_store import ColumnarTable
+from app.mock_database import COLUMNAR_TABLES
+from app.mock_persistence import SNAPSHOT_FILE, Persistence, encode_record
+
+STUDENT = "11111111-1111-4111-8111-111111111111"
+
+
+class Node:
+    """The tables of one process using a data directory"""
+
+    def __init__(self, directory, **options):
+        self.lock = threading.Lock()
+        self.tables = {"marks": ColumnarTable("marks", COLUMNAR_TABLES["marks"]),
+                       "users": [{"id": STUDENT, "email": "student@demo.com"}]}
+        self.persistence = Persistence(directory, self.lock, self.tables, **options)
+        self.recovered = self.persistence.recover(self.tables.__getitem__)
+        self.marks = self.persistence.journal("marks", self.tables["marks"])
+
+    def write(self, operation, *args):
+        """Apply and log one write as MockTable.execute() does, waiting until it is durable"""
+        with self.lock:
+            rows = getattr(self.marks, operation)(*args)
+        self.persistence.wait(self.marks.lsn)
+        return rows
+
+    def insert(self, subject: str, obtained: int) -> dict:
+        return self.write("insert", [{"student_id": STUDENT, "subject": subject, "marks_obtained": obtained,
+                                      "total_marks": 100}])[0]
+
+    def rows(self) -> dict:
+        return {row["subject"]: row["marks_obtained"] for row in self.tables["marks"]}
+
+    def crash(self):
+        """Stop as a killed process would: nothing queued is written, and no checkpoint"""
+        persistence = self.persistence
+        with persistence.condition:
+            persistence.pending.clear()
+            persistence.closing = True
+            persistence.condition.notify_all()
+        persistence.thread.join()
+        persistence.log.close()
+        persistence._lock_file.close()
+
+
+def test_log_is_replayed_after_a_crash(tmp_path):
+    node = Node(tmp_path)
+    maths = node.insert("Maths", 40)
+    physics = node.insert("Physics", 55)
+    node.insert("Chemistry", 70)
+    node.write("update", [node.marks.find(("id",), (maths["id"],))], {"marks_obtained": 45})
+    node.write("delete", [node.marks.find(("id",), (physics["id"],))])
+    node.crash()
+
+    restarted = Node(tmp_path)
+
+    assert restarted.recovered["snapshot_lsn"] == 0
+    assert restarted.recovered["replayed"] == 5
+    assert restarted.rows() == {"Maths": 45, "Chemistry": 70}
+    assert {row["id"] for row in restarted.tables["marks"]} == {row["id"] for row in node.tables["marks"]}
+    restarted.persistence.close()
+
+
+@pytest.mark.parametrize("damage", ["torn", "corrupt"])
+def test_damaged_final_record_is_cut_off(tmp_path, damage):
+    node = Node(tmp_path)
+    node.insert("Maths", 40)
+    node.insert("Physics", 55)
+    node.crash()
+    segment = node.persistence.segments()[-1]
+    intact = segment.stat().st_size
+    record = encode_record(3, b'["marks","insert",[]]')
+    with open(segment, "ab") as log:
+        # A crash mid-write leaves part of a record; a lost sector leaves one that fails its checksum
+        log.write(record[:-4] if damage == "torn" else record[:-1] + b"!")
+
+    restarted = Node(tmp_path)
+
+    assert restarted.recovered["replayed"] == 2
+    assert restarted.rows() == {"Maths": 40, "Physics": 55}
+    assert segment.stat().st_size == intact
+    # Logging continues after the last intact record, so the next start replays it too
+    restarted.insert("Chemistry", 70)
+    restarted.crash()
+    again = Node(tmp_path)
+    assert again.recovered["replayed"] == 3
+    assert again.rows() == {"Maths": 40, "Physics": 55, "Chemistry": 70}
+    again.persistence.close()
+
+
+def test_checkpoint_writes_the_snapshot_before_dropping_the_log(tmp_path):
+    node = Node(tmp_path)
+    node.insert("Maths", 40)
+    node.insert("Physics", 55)
+    covered = node.persistence.segments()
+    saved = {path: path.read_bytes() for path in covered}
+    node.persistence.checkpoint()
+
+    assert (tmp_path / SNAPSHOT_FILE).exists()
+    assert not any(path.exists() for path in covered)
+    node.insert("Chemistry", 70)
+    node.crash()
+
+    # Dropping the covered segments is the last step: a crash just before it leaves them
+    # next to the snapshot, and their records must not be applied a second time
+    for path, data in saved.items():
+        path.write_bytes(data)
+    restarted = Node(tmp_path)
+
+    assert restarted.recovered["snapshot_lsn"] == 2
+    assert restarted.recovered["replayed"] == 1
+    assert restarted.rows() == {"Maths": 40, "Physics": 55, "Chemistry": 70}
+    assert len(restarted.tables["marks"]) == 3
+    assert restarted.tables["users"] == [{"id": STUDENT, "email": "student@demo.com"}]
+    restarted.persistence.close()
+
+
+def test_unfinished_snapshot_is_ignored(tmp_path):
+    node = Node(tmp_path)
+    node.insert("Maths", 40)
+    node.crash()
+    # A crash while the snapshot was being written leaves only its temporary file
+    (tmp_path / SNAPSHOT_FILE).with_suffix(".tmp").write_bytes(b"SCCSNAP1\x00")
+
+    restarted = Node(tmp_path)
+
+    assert restarted.recovered["snapshot_lsn"] == 0
+    assert restarted.rows() == {"Maths": 40}
+    restarted.persistence.close()
+
+
+def test_close_checkpoints_so_the_next_start_only_loads_the_snapshot(tmp_path):
+    node = Node(tmp_path)
+    node.insert("Maths", 40)
+    node.persistence.close()
+
+    restarted = Node(tmp_path)
+
+    assert restarted.recovered == {"snapshot_lsn": 1, "replayed": 0, "seconds": restarted.recovered["seconds"]}
+    assert restarted.rows() == {"Maths": 40}
+    restarted.persistence.close()
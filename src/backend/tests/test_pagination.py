@@ -0,0 +1,70 @@
+import pytest
+from fastapi import HTTPException
+
+from app.mock_database import MockTable, mock_data
+from app.pagination import decode_cursor, encode_cursor, fetch_page
+
+STUDENT = "11111111-1111-4111-8111-111111111111"
+
+
+@pytest.fixture
+def notifications(monkeypatch):
+    """23 notifications whose created_at comes in runs of five equal values"""
+    monkeypatch.setitem(mock_data, "notifications", [])
+    MockTable("notifications").insert([
+        {"student_id": STUDENT if n % 4 else "someone else", "message": f"n{n}", "read": False,
+         "created_at": f"2024-01-01T00:00:{n // 5:02d}"}
+        for n in range(23)
+    ]).execute()
+
+
+def keyset(row: dict) -> tuple:
+    return row["created_at"], row["id"]
+
+
+async def walk(limit: int, descending: bool, filters: dict = None) -> list:
+    pages = []
+    cursor = None
+    while True:
+        rows, cursor = await fetch_page("notifications", limit, cursor, ["message"], filters, descending)
+        pages.append(rows)
+        assert len(rows) <= limit
+        if cursor is None:
+            return pages
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("descending", [False, True])
+@pytest.mark.parametrize("limit", [1, 4, 5, 7, 23])
+async def test_pages_cover_every_row_once_across_created_at_ties(notifications, descending, limit):
+    pages = await walk(limit, descending)
+
+    served = [row["id"] for rows in pages for row in rows]
+    assert served == [row["id"] for row in sorted(mock_data["notifications"], key=keyset, reverse=descending)]
+    assert all(len(rows) == limit for rows in pages[:-1])
+
+
+@pytest.mark.anyio
+async def test_filters_apply_on_every_page(notifications):
+    pages = await walk(3, True, {"student_id": STUDENT})
+
+    served = [row["id"] for rows in pages for row in rows]
+    mine = [row for row in mock_data["notifications"] if row["student_id"] == STUDENT]
+    assert served == [row["id"] for row in sorted(mine, key=keyset, reverse=True)]
+
+
+def test_cursor_holds_the_keyset_of_the_row():
+    row = {"created_at": "2024-01-01T00:00:00", "id": "a", "message": "ignored"}
+
+    cursor = encode_cursor(row, ("created_at", "id"))
+
+    assert "=" not in cursor
+    assert decode_cursor(cursor, ("created_at", "id")) == ["2024-01-01T00:00:00", "a"]
+
+
+@pytest.mark.parametrize("cursor", ["not base64!", encode_cursor({"id": "a"}, ("id",)), "bnVsbA"])
+def test_malformed_cursors_are_rejected(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor, ("created_at", "id"))
+
+    assert error.value.status_code == 400
@@ -0,0 +1,70 @@
+import logging
+from uuid import uuid4
+
+import pytest
+
+from app import passwords
+from app.mock_database import MockStore, MockTable
+from app.models import UserLogin
+from app.routers import auth as auth_router
+
+
+@pytest.fixture
+def no_hashing(monkeypatch):
+    def refuse(password):
+        raise AssertionError("hashed a password nobody stores")
+
+    monkeypatch.setattr(passwords, "get_password_hash", refuse)
+
+
+def test_plaintext_match_is_not_hashed_unless_asked(no_hashing):
+    assert passwords.verify_and_update("admin123", "admin123") == (True, None)
+    assert passwords.verify_and_update("wrong", "admin123") == (False, None)
+    assert passwords.verify_password("admin123", "admin123")
+
+
+def test_plaintext_match_is_hashed_for_a_caller_that_stores_it():
+    verified, new_hash = passwords.verify_and_update("admin123", "admin123", upgrade=True)
+
+    assert verified
+    assert new_hash.startswith(passwords.BCRYPT_PREFIXES)
+    assert passwords.verify_password("admin123", new_hash)
+
+
+def test_outdated_hash_is_only_replaced_when_asked():
+    outdated = passwords.pwd_context.hash("admin123", rounds=4)
+
+    assert passwords.verify_and_update("admin123", outdated) == (True, None)
+    verified, new_hash = passwords.verify_and_update("admin123", outdated, upgrade=True)
+    assert verified and new_hash != outdated
+
+
+@pytest.mark.anyio
+async def test_login_replaces_a_plaintext_password_once():
+    email = f"plain-{uuid4().hex[:8]}@demo.com"
+    MockTable("users").insert({"email": email, "password": "admin123", "role": "student", "name": "Plain"}).execute()
+
+    await auth_router.login(UserLogin(email=email, password="admin123"))
+    stored = MockTable("users").select("password").eq("email", email).execute().data[0]["password"]
+    assert stored.startswith(passwords.BCRYPT_PREFIXES)
+
+    await auth_router.login(UserLogin(email=email, password="admin123"))
+    assert MockTable("users").select("password").eq("email", email).execute().data[0]["password"] == stored
+
+
+@pytest.mark.anyio
+async def test_failed_rehash_is_logged_and_login_goes_ahead(monkeypatch, caplog):
+    email = f"plain-{uuid4().hex[:8]}@demo.com"
+    MockTable("users").insert({"email": email, "password": "admin123", "role": "student", "name": "Plain"}).execute()
+
+    def unavailable(store, records, data):
+        raise RuntimeError("database unavailable")
+
+    monkeypatch.setattr(MockStore, "update", unavailable)
+    with caplog.at_level(logging.ERROR, logger="app.routers.auth"):
+        token = await auth_router.login(UserLogin(email=email, password="admin123"))
+
+    assert token.access_token
+    assert [record.getMessage().startswith("Password rehash failed") for record in caplog.records] == [True]
+    assert "database unavailable" in caplog.text
+    assert MockTable("users").select("password").eq("email", email).execute().data[0]["password"] == "admin123"
@@ -0,0 +1,66 @@
+from functools import partial
+
+import pytest
+
+from app.async_database import AsyncClient
+from app.auth import PrincipalCache, authenticate, create_access_token, principal_cache
+from app.mock_database import mock_data
+from app.sqlite_database import SqliteDatabase
+from app.table_versions import table_versions
+
+
+@pytest.fixture
+def teacher(monkeypatch):
+    """The demo teacher in a private copy of the users table, so the test can change it unseen"""
+    monkeypatch.setitem(mock_data, "users", [dict(row) for row in mock_data["users"]])
+    principal_cache.clear()
+    yield next(row for row in mock_data["users"] if row["email"] == "teacher@demo.com")
+    principal_cache.clear()
+
+
+def rename_elsewhere(monkeypatch, user: dict, name: str):
+    # A write by another process: this one's table events never hear of it
+    monkeypatch.setitem(mock_data, "users", [dict(row, name=name) if row["id"] == user["id"] else row
+                                             for row in mock_data["users"]])
+
+
+@pytest.mark.anyio
+async def test_cached_principal_is_dropped_after_another_process_writes_users(teacher, tmp_path, monkeypatch):
+    path = str(tmp_path / "campus.db")
+    first, second = SqliteDatabase(path).connect(), SqliteDatabase(path).connect()
+    monkeypatch.setattr(table_versions, "reader", partial(AsyncClient(first, 0).run, first.table_versions))
+    token = create_access_token({"sub": teacher["id"]})
+    try:
+        assert (await authenticate(token))["name"] == "Demo Teacher"
+        rename_elsewhere(monkeypatch, teacher, "Renamed Teacher")
+        # Nothing in the shared versions says the user changed yet
+        assert (await authenticate(token))["name"] == "Demo Teacher"
+
+        second.table("users").insert({"email": "alice@demo.com", "password": "", "role": "student",
+                                      "name": "Alice"}).execute()
+
+        assert (await authenticate(token))["name"] == "Renamed Teacher"
+    finally:
+        first.close()
+        second.close()
+
+
+@pytest.mark.anyio
+async def test_versions_are_not_read_when_they_are_per_process(teacher):
+    token = create_access_token({"sub": teacher["id"]})
+
+    await authenticate(token)
+
+    assert table_versions.reader is None
+    assert principal_cache.entries[token][3] is None
+
+
+def test_entry_is_only_served_for_the_version_it_was_cached_at():
+    cache = PrincipalCache(10, 60)
+    cache.put("token", {"id": "u1"}, version=("epoch", "1"))
+
+    assert cache.get("token", ("epoch", "1")) == {"id": "u1"}
+    assert cache.get("token", ("epoch", "2")) is None
+    # The stale entry is gone, not just skipped
+    assert cache.get("token", ("epoch", "1")) is None
+    assert cache.tokens_by_user == {}
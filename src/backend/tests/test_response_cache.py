@@ -0,0 +1,153 @@
+import pytest
+from fastapi import Request, Response
+
+from app.models import ResourceResponse
+from app.response_cache import RedisBackend, ResponseCache
+
+pytestmark = pytest.mark.anyio
+
+
+class FakeRedis:
+    """The redis.asyncio methods RedisBackend uses, with a clock the test moves by hand"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.values = {}  # key -> (value, expires at or None)
+        self.closed = False
+
+    def _live(self, key):
+        entry = self.values.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= self.now:
+            del self.values[key]
+            return None
+        return entry
+
+    async def get(self, key):
+        entry = self._live(key)
+        return None if entry is None else entry[0]
+
+    async def set(self, key, value, ex=None):
+        self.values[key] = (value, None if ex is None else self.now + ex)
+
+    async def incr(self, key):
+        entry = self._live(key)
+        value = int(entry[0]) + 1 if entry else 1
+        self.values[key] = (str(value).encode(), entry[1] if entry else None)
+        return value
+
+    async def info(self, section):
+        return {"used_memory": sum(len(value) for value, _ in self.values.values())}
+
+    async def aclose(self):
+        self.closed = True
+
+
+def request(path: str, query: bytes = b"") -> Request:
+    return Request({"type": "http", "method": "GET", "scheme": "http", "server": ("test", 80),
+                    "path": path, "query_string": query, "headers": []})
+
+
+ROWS = [{"id": "6a4ed0a2-3f9c-4d41-9e43-2f0f6d6e1c11", "title": "Notes", "resource_type": "pdf",
+         "link": "https://example.edu/notes", "uploaded_by": "1c9e2b8e-3b8a-4f57-9a51-7b4d9b7f0e22",
+         "created_at": "2024-01-01T00:00:00"}]
+
+
+class Producer:
+    def __init__(self):
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        return ROWS
+
+
+async def test_set_then_get_round_trips_body_and_headers():
+    client = FakeRedis()
+    backend = RedisBackend(client)
+
+    await backend.set("resources:0:student:/student/resources?", b'[{"id":1}]', {"x-next-cursor": "abc"}, 30)
+
+    assert await backend.get("resources:0:student:/student/resources?") == (b'[{"id":1}]', {"x-next-cursor": "abc"})
+    assert all(key.startswith("scc:cache:") for key in client.values)
+    assert await backend.get("resources:0:student:/other?") is None
+
+
+async def test_entries_expire_after_ttl():
+    client = FakeRedis()
+    backend = RedisBackend(client)
+    await backend.set("k", b"[]", {}, 30)
+
+    client.now = 29.9
+    assert await backend.get("k") is not None
+    client.now = 30.0
+    assert await backend.get("k") is None
+
+
+async def test_serve_hits_until_invalidated():
+    cache = ResponseCache(RedisBackend(FakeRedis()), ttl_seconds=300)
+    produce = Producer()
+
+    first = await cache.serve("resources", "student", ResourceResponse, request("/student/resources"), Response(),
+                              produce)
+    hit = await cache.serve("resources", "student", ResourceResponse, request("/student/resources"), Response(),
+                            produce)
+
+    assert first == ROWS
+    assert produce.calls == 1
+    assert hit.body.startswith(b'[{"id":"6a4ed0a2')
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    await cache.invalidate("resources")
+    await cache.serve("resources", "student", ResourceResponse, request("/student/resources"), Response(), produce)
+    assert produce.calls == 2
+
+
+async def test_query_string_and_role_are_part_of_the_key():
+    cache = ResponseCache(RedisBackend(FakeRedis()), ttl_seconds=300)
+    produce = Producer()
+
+    for role, query in (("student", b"limit=10"), ("student", b"limit=20"), ("admin", b"limit=10")):
+        await cache.serve("resources", role, ResourceResponse, request("/student/resources", query), Response(),
+                          produce)
+
+    assert produce.calls == 3
+
+
+async def test_workers_sharing_redis_share_invalidations():
+    client = FakeRedis()
+    worker_a = ResponseCache(RedisBackend(client), ttl_seconds=300)
+    worker_b = ResponseCache(RedisBackend(client), ttl_seconds=300)
+    produce = Producer()
+
+    await worker_a.serve("resources", "student", ResourceResponse, request("/student/resources"), Response(), produce)
+    await worker_b.serve("resources", "student", ResourceResponse, request("/student/resources"), Response(), produce)
+    assert produce.calls == 1
+
+    await worker_b.invalidate("resources")
+    await worker_a.serve("resources", "student", ResourceResponse, request("/student/resources"), Response(), produce)
+    assert produce.calls == 2
+
+
+async def test_expired_entry_is_produced_again():
+    client = FakeRedis()
+    cache = ResponseCache(RedisBackend(client), ttl_seconds=60)
+    produce = Producer()
+
+    await cache.serve("resources", "student", ResourceResponse, request("/student/resources"), Response(), produce)
+    client.now = 61
+    await cache.serve("resources", "student", ResourceResponse, request("/student/resources"), Response(), produce)
+
+    assert produce.calls == 2
+
+
+async def test_stats_and_close():
+    client = FakeRedis()
+    cache = ResponseCache(RedisBackend(client), ttl_seconds=60)
+    await cache.serve("resources", "student", ResourceResponse, request("/student/resources"), Response(), Producer())
+
+    stats = await cache.stats()
+    assert stats["backend"] == "RedisBackend"
+    assert stats["used_memory"] > 0
+
+    await cache.close()
+    assert client.closed
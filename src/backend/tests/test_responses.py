@@ -0,0 +1,83 @@
+import json
+
+import httpx
+import pytest
+from fastapi import Response
+from pydantic import ValidationError
+
+from app.config import settings
+from app.main import app
+from app.mock_database import MockTable, mock_data
+from app.models import AssignmentResponse, MarksResponse
+from app.responses import render_rows
+
+MODES = ["standard", "validated", "trusted"]
+ROWS = [{"id": "5b1d5c9e-8c0a-4f5e-9a44-3f1c2b6d7e80", "student_id": "11111111-1111-4111-8111-111111111111",
+         "subject": "Maths", "marks_obtained": 40, "total_marks": 100, "created_at": "2024-01-01T00:00:00"}]
+
+
+def body(rendered) -> list:
+    return rendered if isinstance(rendered, list) else json.loads(rendered.body)
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_every_mode_renders_the_model_fields(monkeypatch, mode):
+    monkeypatch.setattr(settings, "RESPONSE_MODE", mode)
+
+    rendered = render_rows(ROWS, MarksResponse)
+
+    if mode == "standard":
+        # FastAPI validates and filters through response_model
+        assert rendered is ROWS
+    else:
+        assert rendered.media_type == "application/json"
+        assert body(rendered) == [{field: ROWS[0][field] for field in MarksResponse.model_fields}]
+
+
+@pytest.mark.parametrize("mode", ["validated", "trusted"])
+def test_headers_set_on_the_endpoint_response_are_kept(monkeypatch, mode):
+    monkeypatch.setattr(settings, "RESPONSE_MODE", mode)
+    response = Response()
+    response.headers["X-Next-Cursor"] = "abc"
+
+    rendered = render_rows(ROWS, MarksResponse, response)
+
+    assert rendered.headers["X-Next-Cursor"] == "abc"
+    assert int(rendered.headers["content-length"]) == len(rendered.body)
+
+
+def test_only_validated_mode_rejects_bad_rows(monkeypatch):
+    bad = [dict(ROWS[0], marks_obtained="forty")]
+
+    monkeypatch.setattr(settings, "RESPONSE_MODE", "validated")
+    with pytest.raises(ValidationError):
+        render_rows(bad, MarksResponse)
+    # Trusted mode takes the store's word for it
+    monkeypatch.setattr(settings, "RESPONSE_MODE", "trusted")
+    assert body(render_rows(bad, MarksResponse))[0]["marks_obtained"] == "forty"
+
+
+@pytest.mark.anyio
+async def test_endpoint_output_is_the_same_in_every_mode(monkeypatch):
+    monkeypatch.setitem(mock_data, "assignments", [])
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        login = await client.post("/auth/login", json={"email": "teacher@demo.com", "password": "admin123"})
+        headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+        MockTable("assignments").insert([
+            {"title": f"Essay {n}", "description": "Two pages", "due_date": f"2030-01-0{n}", "meet_link": None,
+             "created_by": login.json()["user"]["id"], "internal_note": "not in the model"}
+            for n in range(1, 4)
+        ]).execute()
+
+        bodies = {}
+        for mode in MODES:
+            monkeypatch.setattr(settings, "RESPONSE_MODE", mode)
+            response = await client.get("/teacher/assignments", headers=headers)
+            assert response.status_code == 200
+            bodies[mode] = response.json()
+
+    assert len(bodies["standard"]) == 3
+    assert bodies["validated"] == bodies["standard"]
+    assert bodies["trusted"] == bodies["standard"]
+    assert all(set(row) == set(AssignmentResponse.model_fields) for row in bodies["trusted"])
@@ -0,0 +1,25 @@
+from datetime import timedelta
+
+import pytest
+from apscheduler.schedulers.background import BackgroundScheduler
+
+from app import scheduler as scheduler_module
+from app.config import settings
+
+
+@pytest.fixture
+def kolkata_scheduler(monkeypatch):
+    # Not the host's timezone (UTC in CI), and not a whole number of hours away from it
+    scheduler = BackgroundScheduler(timezone="Asia/Kolkata")
+    monkeypatch.setattr(scheduler_module, "scheduler", scheduler)
+    yield scheduler
+    if scheduler.running:
+        scheduler.shutdown(wait=False)
+
+
+def test_reminder_runs_at_the_configured_hour_in_the_scheduler_timezone(kolkata_scheduler):
+    scheduler_module.start_scheduler("leader")
+
+    next_run = kolkata_scheduler.get_job(scheduler_module.REMINDER_JOB_ID).next_run_time
+    assert next_run.utcoffset() == timedelta(hours=5, minutes=30)
+    assert (next_run.hour, next_run.minute) == (settings.REMINDER_HOUR, settings.REMINDER_MINUTE)
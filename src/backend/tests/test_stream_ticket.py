@@ -0,0 +1,58 @@
+from datetime import timedelta
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from app.auth import STREAM_TICKET_PURPOSE, create_access_token, decode_token, get_stream_user
+from app.main import app
+
+
+@pytest.fixture
+async def student():
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        login = await client.post("/auth/login", json={"email": "student@demo.com", "password": "admin123"})
+        headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+        ticket = (await client.post("/student/notifications/stream-ticket", headers=headers)).json()
+        yield client, login.json(), headers, ticket
+
+
+@pytest.mark.anyio
+async def test_ticket_is_short_lived_and_only_for_streams(student):
+    _, login, _, ticket = student
+    payload = decode_token(ticket["ticket"])
+
+    assert ticket["expires_in"] == 60
+    assert payload["purpose"] == STREAM_TICKET_PURPOSE
+    assert payload["sub"] == login["user"]["id"]
+    assert (await get_stream_user(None, ticket["ticket"]))["email"] == "student@demo.com"
+
+
+@pytest.mark.anyio
+async def test_ticket_is_not_an_access_token(student):
+    client, _, _, ticket = student
+
+    response = await client.get("/student/marks", headers={"Authorization": f"Bearer {ticket['ticket']}"})
+
+    assert response.status_code == 401
+
+
+@pytest.mark.anyio
+async def test_access_token_is_refused_in_the_url(student):
+    client, login, _, _ = student
+    token = login["access_token"]
+
+    assert (await client.get(f"/student/notifications/stream?ticket={token}")).status_code == 401
+    assert (await client.get(f"/student/notifications/stream?access_token={token}")).status_code == 401
+
+
+@pytest.mark.anyio
+async def test_expired_ticket_is_refused(student):
+    _, login, _, _ = student
+    expired = create_access_token({"sub": login["user"]["id"], "purpose": STREAM_TICKET_PURPOSE},
+                                  timedelta(seconds=-1))
+
+    with pytest.raises(HTTPException) as refused:
+        await get_stream_user(None, expired)
+    assert refused.value.status_code == 401
@@ -0,0 +1,97 @@
+import json
+
+import httpx
+import pytest
+
+from app.config import settings
+from app.supabase_database import SupabaseDatabase
+
+# supabase-py only accepts keys shaped like a JWT
+KEY = "test.anon.key"
+
+
+@pytest.fixture
+def postgrest():
+    """A SupabaseDatabase on a fake PostgREST that records every request and echoes writes back"""
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if request.method == "GET":
+            return httpx.Response(200, json=[{"id": "m1", "student_id": "s1"}])
+        body = json.loads(request.content)
+        return httpx.Response(201, json=body if isinstance(body, list) else [body])
+
+    database = SupabaseDatabase("http://supabase.test", KEY, transport=httpx.MockTransport(handler))
+    yield database, requests
+    database.close()
+
+
+def test_select_builds_filter_url(postgrest):
+    database, requests = postgrest
+
+    result = database.table("marks").select("*").eq("student_id", "s1").execute()
+
+    assert result.data == [{"id": "m1", "student_id": "s1"}]
+    request = requests[-1]
+    assert request.method == "GET"
+    assert request.url.path == "/rest/v1/marks"
+    assert request.url.params["select"] == "*"
+    assert request.url.params["student_id"] == "eq.s1"
+
+
+def test_insert_posts_rows(postgrest):
+    database, requests = postgrest
+    row = {"student_id": "s1", "subject": "Math", "marks_obtained": 80, "total_marks": 100}
+
+    result = database.table("marks").insert(row).execute()
+
+    assert result.data == [row]
+    request = requests[-1]
+    assert request.method == "POST"
+    assert request.url.path == "/rest/v1/marks"
+    assert not request.url.params
+    assert json.loads(request.content) == row
+    assert "return=representation" in request.headers["prefer"]
+
+
+def test_upsert_sends_conflict_target_and_merge(postgrest):
+    database, requests = postgrest
+    row = {"student_id": "s1", "subject": "Math", "marks_obtained": 90, "total_marks": 100}
+
+    database.table("marks").upsert(row, on_conflict="student_id,subject").execute()
+
+    request = requests[-1]
+    assert request.method == "POST"
+    assert request.url.params["on_conflict"] == "student_id,subject"
+    assert "resolution=merge-duplicates" in request.headers["prefer"]
+
+
+def test_requests_carry_api_key(postgrest):
+    database, requests = postgrest
+
+    database.table("users").select("id").execute()
+
+    headers = requests[-1].headers
+    assert headers["apikey"] == KEY
+    assert headers["authorization"] == f"Bearer {KEY}"
+    assert headers["accept-profile"] == "public"
+
+
+def test_client_and_session_are_reused_until_close(postgrest):
+    database, requests = postgrest
+
+    client = database.connect()
+    database.table("marks").select("*").execute()
+    database.table("users").select("*").execute()
+
+    assert database.connect() is client
+    session = client.postgrest.session
+    assert client.postgrest.session is session
+    assert session._transport is database.transport
+    assert client.postgrest.limits.max_connections == settings.SUPABASE_POOL_MAX_CONNECTIONS
+    assert client.postgrest.limits.max_keepalive_connections == settings.SUPABASE_POOL_MAX_KEEPALIVE
+    assert len(requests) == 2
+
+    database.close()
+    assert database.connect() is not client
@@ -0,0 +1,136 @@
+import asyncio
+from functools import partial
+
+import httpx
+import pytest
+
+from app.async_database import AsyncClient
+from app.main import app
+from app.notifications import NotificationHub
+from app.sqlite_database import SqliteDatabase
+from app.table_versions import table_versions
+
+
+@pytest.fixture
+def workers(tmp_path):
+    """Two clients of one database file, as two worker processes hold them"""
+    path = str(tmp_path / "campus.db")
+    first, second = SqliteDatabase(path).connect(), SqliteDatabase(path).connect()
+    yield first, second
+    first.close()
+    second.close()
+
+
+def add_student(database, name: str) -> str:
+    return database.table("users").insert({"email": f"{name}@demo.com", "password": "", "role": "student",
+                                           "name": name}).execute().data[0]["id"]
+
+
+def test_writes_by_another_process_change_the_versions(workers):
+    first, second = workers
+    alice, bob = add_student(second, "alice"), add_student(second, "bob")
+    before = {student: first.table_versions(["marks"], student) for student in (alice, bob)}
+    table_before = first.table_versions(["marks"])
+
+    second.table("marks").insert({"student_id": alice, "subject": "Maths", "marks_obtained": 40,
+                                  "total_marks": 100}).execute()
+
+    assert first.table_versions(["marks"], alice) != before[alice]
+    assert first.table_versions(["marks"], bob) == before[bob]
+    assert first.table_versions(["marks"]) != table_before
+
+
+def test_cascaded_deletes_change_the_versions(workers):
+    first, second = workers
+    alice = add_student(second, "alice")
+    second.table("marks").insert({"student_id": alice, "subject": "Maths", "marks_obtained": 40,
+                                  "total_marks": 100}).execute()
+    before = first.table_versions(["marks"], alice)
+
+    second.table("users").delete().eq("id", alice).execute()
+
+    assert first.table_versions(["marks"], alice) != before
+
+
+def test_epoch_is_per_database_file(tmp_path, workers):
+    first, second = workers
+    other = SqliteDatabase(str(tmp_path / "other.db")).connect()
+    try:
+        assert first.table_versions([])[0] == second.table_versions([])[0]
+        assert other.table_versions([])[0] != first.table_versions([])[0]
+    finally:
+        other.close()
+
+
+@pytest.mark.anyio
+async def test_etag_changes_after_another_process_updates_a_mark(workers, monkeypatch):
+    first, second = workers
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        login = await client.post("/auth/login", json={"email": "student@demo.com", "password": "admin123"})
+        student = login.json()["user"]["id"]
+        headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+        # The demo student in the shared file too, whose versions the app's ETags now read
+        second.table("users").insert({"id": student, "email": "shared-student@demo.com", "password": "",
+                                      "role": "student", "name": "Demo Student"}).execute()
+        monkeypatch.setattr(table_versions, "reader", partial(AsyncClient(first, 0).run, first.table_versions))
+
+        response = await client.get("/student/marks", headers=headers)
+        etag = response.headers["ETag"]
+        assert (await client.get("/student/marks", headers={**headers, "If-None-Match": etag})).status_code == 304
+
+        second.table("marks").insert({"student_id": student, "subject": "Maths", "marks_obtained": 40,
+                                      "total_marks": 100}).execute()
+
+        response = await client.get("/student/marks", headers={**headers, "If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+
+
+@pytest.mark.anyio
+async def test_hub_pushes_notifications_inserted_by_another_process(workers):
+    first, second = workers
+    alice, bob = add_student(second, "alice"), add_student(second, "bob")
+    hub = NotificationHub(10, partial(first.feed, "notifications"), poll_seconds=0.01)
+    subscription = hub.subscribe(alice)
+    await asyncio.sleep(0.05)
+
+    second.table("notifications").insert([{"student_id": bob, "message": "not yours"},
+                                          {"student_id": alice, "message": "Assignment due"}]).execute()
+
+    row = await asyncio.wait_for(subscription.queue.get(), 2)
+    assert row["message"] == "Assignment due"
+    assert row["read"] is False
+    assert subscription.queue.empty()
+    hub.unsubscribe(subscription)
+
+
+@pytest.mark.anyio
+async def test_hub_asks_for_a_resync_when_the_last_row_seen_is_deleted(workers):
+    first, second = workers
+    alice = add_student(second, "alice")
+    hub = NotificationHub(10, partial(first.feed, "notifications"), poll_seconds=0.01)
+    subscription = hub.subscribe(alice)
+    await asyncio.sleep(0.05)
+    second.table("notifications").insert({"student_id": alice, "message": "first"}).execute()
+    assert (await asyncio.wait_for(subscription.queue.get(), 2))["message"] == "first"
+
+    # The next insert may now reuse the deleted row's rowid, so the feed cannot tell what is new
+    second.table("notifications").delete().eq("student_id", alice).execute()
+
+    assert await asyncio.wait_for(subscription.queue.get(), 2) is None
+    assert subscription.overflowed
+    hub.unsubscribe(subscription)
+
+
+@pytest.mark.anyio
+async def test_hub_stops_following_once_the_last_connection_closes(workers):
+    first, _ = workers
+    hub = NotificationHub(10, partial(first.feed, "notifications"), poll_seconds=0.01)
+    subscription = hub.subscribe("alice")
+    poller = hub.poller
+    hub.unsubscribe(subscription)
+
+    poller.join(2)
+    assert not poller.is_alive()
+    assert hub.poller is None